@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict
+
+from app.clients.llm_errors import CircuitOpenError
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one model.
+
+    closed ─(N failures)→ open ─(reset timeout)→ half_open ─(probe ok)→ closed
+                                                     └──(probe fails)→ open
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` unless a call may go through now."""
+        if self.state == CLOSED:
+            return
+        retry_after = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == OPEN and retry_after <= 0:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        raise CircuitOpenError(
+            f'Circuit for {self.name} is open',
+            retry_after=max(retry_after, 1.0),
+        )
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info('Circuit for %s closed', self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning('Circuit for %s opened after %d failures', self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (e.g. cancelled) – allow another."""
+        self._probe_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    if model not in _breakers:
+        settings = get_settings()
+        _breakers[model] = CircuitBreaker(
+            model,
+            failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+        )
+    return _breakers[model]
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from openai.types.chat import ChatCompletion
+from redis.asyncio import Redis
+
+from app.clients.redis import get_session_redis
+from app.settings import get_settings
+from app.utils import codec
+
+logger = logging.getLogger(__name__)
+
+# request parameters that don't change the answer
+_IGNORED_PARAMS = {'timeout', 'extra_headers', 'user'}
+DEFAULT_SOURCE = 'app'  # the service's own portfolio (PORTFOLIO_DATA_DIR)
+_WS_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s%£$€.-]|(?<!\d)\.|\.(?!\d)')
+
+
+def normalise_text(text: str) -> str:
+    """Case-, whitespace- and punctuation-insensitive form of `text`."""
+    return _WS_RE.sub(' ', _PUNCT_RE.sub(' ', text.lower())).strip()
+
+
+class CompletionCache:
+    """
+    Redis cache of whole chat completions, keyed by a canonical hash of the
+    request (model, messages, tool schema, …).
+
+    • optional normalisation of message text (case / whitespace / punctuation)
+      so “What are my fees?” and “what are my fees” share an entry
+    • keys are namespaced by the portfolio snapshot version; when a data
+      source (the app's portfolio, a named job portfolio) moves to a new
+      version, that source's previous entries are deleted – other sources
+      are left alone and their stale versions expire with the TTL
+    • size-bounded: at most `max_entries` per version (oldest evicted, via a
+      sorted-set index) and entries above `max_entry_bytes` are not stored
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            ttl: int,
+            max_entries: int,
+            max_entry_bytes: int,
+            normalise: bool,
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.normalise = normalise
+        self._seen_versions: Dict[str, str] = {}  # source → version last switched to
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request: Dict[str, Any], version: str) -> str:
+        canonical = {k: v for k, v in request.items() if k not in _IGNORED_PARAMS}
+        if self.normalise:
+            canonical['messages'] = [
+                {**m, 'content': normalise_text(m['content'])} if isinstance(m.get('content'), str) else m
+                for m in canonical.get('messages', [])
+            ]
+        blob = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+        return f'completion_cache:{version}:{hashlib.sha256(blob.encode("utf-8")).hexdigest()}'
+
+    async def get(self, key: str, record: bool = True) -> Optional[ChatCompletion]:
+        """Cached completion for `key`; `record=False` skips hit/miss stats (polling)."""
+        raw = await self.redis.get(key)
+        if raw is None:
+            self.misses += record
+            return None
+        self.hits += record
+        return ChatCompletion.model_validate(codec.decode(raw))
+
+    async def put(self, key: str, version: str, completion: ChatCompletion, source: str = DEFAULT_SOURCE) -> None:
+        raw = codec.encode(completion.model_dump(mode='json'))
+        if len(raw) > self.max_entry_bytes:
+            return
+        await self._switch_version(source, version)
+
+        index = self._index_key(version)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(key, raw, ex=self.ttl)
+        pipe.zadd(index, {key: time.time()})
+        pipe.expire(index, self.ttl)
+        pipe.zcard(index)
+        *_, size = await pipe.execute()
+
+        if size > self.max_entries:
+            evicted = await self.redis.zpopmin(index, size - self.max_entries)
+            if evicted:
+                await self.redis.delete(*(member for member, _score in evicted))
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    async def _switch_version(self, source: str, version: str) -> None:
+        """Drop `source`'s previous snapshot entries the first time `version` is used for it."""
+        if self._seen_versions.get(source) == version:
+            return
+        self._seen_versions[source] = version
+        previous = await self.redis.getset(f'completion_cache:current_version:{source}', version)
+        if previous is None:
+            return
+        previous = previous.decode('utf-8') if isinstance(previous, bytes) else previous
+        if previous == version:
+            return
+        index = self._index_key(previous)
+        stale = await self.redis.zrange(index, 0, -1)
+        await self.redis.delete(index, *stale)
+        logger.info('Snapshot of %s changed %s → %s, dropped %d cached completions',
+                    source, previous, version, len(stale))
+
+    @staticmethod
+    def _index_key(version: str) -> str:
+        return f'completion_cache:{version}:index'
+
+
+@lru_cache
+def get_completion_cache() -> Optional[CompletionCache]:
+    settings = get_settings()
+    if not settings.COMPLETION_CACHE_ENABLED:
+        return None
+    return CompletionCache(
+        get_session_redis(),
+        ttl=settings.COMPLETION_CACHE_TTL_SECONDS,
+        max_entries=settings.COMPLETION_CACHE_MAX_ENTRIES,
+        max_entry_bytes=settings.COMPLETION_CACHE_MAX_ENTRY_BYTES,
+        normalise=settings.COMPLETION_CACHE_NORMALISE,
+    )
@@ -0,0 +1,36 @@
+"""
+Per-request time budget, propagated implicitly through a context variable so
+every `safe_chat_completion` in the same request draws from the same budget.
+"""
+from __future__ import annotations
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar('llm_deadline', default=None)
+
+
+@contextlib.contextmanager
+def time_budget(seconds: float) -> Iterator[None]:
+    """
+    Run the block with a deadline `seconds` from now.  A nested budget can
+    only shorten, never extend, an enclosing one.
+    """
+    deadline = time.monotonic() + seconds
+    if (outer := _deadline.get()) is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when there is no budget."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
@@ -0,0 +1,36 @@
+class LLMError(Exception):
+    """Base for every failure `safe_chat_completion` surfaces."""
+
+
+class LLMUnavailableError(LLMError):
+    """
+    The LLM can’t be called right now.  Surfaced to clients as HTTP 503
+    with a `Retry-After` header.
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """The client-side rate limiter queue is full or the wait timed out."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The model’s circuit breaker is open after sustained failures."""
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    """The request’s time budget ran out before the LLM answered."""
+
+
+class LLMRequestError(LLMError):
+    """
+    OpenAI rejected the request itself (bad request, auth, unknown model…).
+    Retrying won’t help; surfaced to clients as HTTP 502.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
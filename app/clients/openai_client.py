@@ -1,11 +1,164 @@
+from typing import Optional
+
+import openai
 from openai import AsyncOpenAI
-from tenacity import retry, wait_exponential, stop_after_attempt
+from tenacity import AsyncRetrying, retry_if_exception_type, wait_exponential, stop_after_attempt
 
+from app.clients import deadline
+from app.clients.circuit_breaker import get_circuit_breaker
+from app.clients.completion_cache import DEFAULT_SOURCE, get_completion_cache
+from app.clients.llm_errors import DeadlineExceededError, LLMRequestError, LLMUnavailableError
+from app.clients.rate_limiter import estimate_request_tokens, get_rate_limiter
+from app.services.single_flight import get_single_flight
 from app.settings import get_settings
+from app.utils.metrics import LLM_TOKENS
+from app.utils.profiling import await_span
+from app.utils.tracing import span
+
+# retries are owned by `safe_chat_completion`, so the limiter sees every attempt
+client = AsyncOpenAI(
+    api_key=get_settings().OPENAI_API_KEY,
+    base_url=get_settings().OPENAI_BASE_URL,
+    max_retries=0,
+)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+# errors that count against the circuit breaker (429s are the limiter’s job)
+BREAKER_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def _budget_exhausted(retry_state) -> bool:
+    """Tenacity stop condition: don’t sleep past the request deadline."""
+    left = deadline.remaining()
+    return left is not None and left <= (retry_state.upcoming_sleep or 0)
+
+
+async def safe_chat_completion(
+        *args,
+        cache_version: Optional[str] = None,
+        cache_source: str = DEFAULT_SOURCE,
+        **kwargs,
+):
+    """
+    Resilient chat completion:
+      • served from the completion cache when `cache_version` (the portfolio
+        snapshot version the answer depends on) is given and the cache is on
+        (`cache_source` names the data the version belongs to);
+        identical uncached requests in flight are coalesced
+      • fails fast with `CircuitOpenError` while the model’s breaker is open
+      • waits for a slot on the per-model rate limiter
+      • retries transient errors, but never beyond the current `time_budget`
+
+    Any final failure surfaces as an `LLMError`: an `LLMUnavailableError`
+    subclass when the model can’t be reached in time, `LLMRequestError` when
+    OpenAI rejects the request outright.
+    """
+    with span('completion', model=kwargs.get('model')):
+        return await _cached_chat_completion(*args, cache_version=cache_version, cache_source=cache_source, **kwargs)
+
+
+async def _cached_chat_completion(*args, cache_version: Optional[str], cache_source: str, **kwargs):
+    cache = get_completion_cache() if cache_version else None
+    if cache is None:
+        return await _chat_completion_with_retries(*args, **kwargs)
+
+    key = cache.key(kwargs, cache_version)
+    if (cached := await cache.get(key)) is not None:
+        return cached
+
+    async def compute():
+        completion = await _chat_completion_with_retries(*args, **kwargs)
+        await cache.put(key, cache_version, completion, source=cache_source)
+        return completion
+
+    # identical requests already in flight (any session, any worker) are joined
+    return await get_single_flight().do(
+        key,
+        compute,
+        load=lambda: cache.get(key, record=False),
+        lock_ttl=deadline.remaining() or get_settings().CHAT_DEADLINE_SECONDS,
+    )
+
+
+async def _chat_completion_with_retries(*args, **kwargs):
+    try:
+        async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                wait=wait_exponential(min=0.5, max=4),
+                stop=stop_after_attempt(3) | _budget_exhausted,
+                reraise=True,
+        ):
+            with attempt:
+                return await _chat_completion_once(*args, **kwargs)
+    except RETRYABLE_ERRORS as exc:
+        if deadline.remaining() == 0:
+            raise DeadlineExceededError('Request time budget exhausted') from exc
+        raise LLMUnavailableError(f'OpenAI request failed: {exc}') from exc
+    except openai.OpenAIError as exc:
+        raise LLMRequestError(
+            f'OpenAI rejected the request: {exc}',
+            status_code=getattr(exc, 'status_code', None),
+        ) from exc
+
+
+async def _chat_completion_once(*args, **kwargs):
+    model = kwargs['model']
+    settings = get_settings()
+
+    left = deadline.remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError('Request time budget exhausted')
+
+    breaker = get_circuit_breaker(model)
+    breaker.before_call()
 
-client = AsyncOpenAI(api_key=get_settings().OPENAI_API_KEY)
+    limiter = get_rate_limiter(model)
+    queue_timeout = settings.LLM_QUEUE_TIMEOUT_SECONDS
+    try:
+        await limiter.acquire(
+            estimate_request_tokens(kwargs),
+            timeout=queue_timeout if left is None else min(queue_timeout, left),
+        )
+    except BaseException:
+        breaker.release_probe()
+        raise
 
+    if (left := deadline.remaining()) is not None:
+        kwargs = {**kwargs, 'timeout': max(left, 0.1)}
 
-@retry(wait=wait_exponential(min=1, max=20), stop=stop_after_attempt(5))
-async def safe_chat_completion(*args, **kwargs):
-    return await client.chat.completions.create(*args, **kwargs)
+    headers, throttled = None, False
+    try:
+        with await_span(f'openai.{model}'):
+            raw = await client.chat.completions.with_raw_response.create(*args, **kwargs)
+        headers = raw.headers
+        breaker.record_success()
+        completion = raw.parse()
+        if usage := completion.usage:
+            LLM_TOKENS.inc(usage.prompt_tokens, model=model, kind='prompt')
+            LLM_TOKENS.inc(usage.completion_tokens, model=model, kind='completion')
+        return completion
+    except openai.APIStatusError as exc:
+        headers = exc.response.headers
+        throttled = exc.status_code == 429
+        if isinstance(exc, BREAKER_ERRORS):
+            breaker.record_failure()
+        else:
+            breaker.release_probe()
+        raise
+    except BREAKER_ERRORS:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release_probe()
+        raise
+    finally:
+        await limiter.release(headers, throttled=throttled)
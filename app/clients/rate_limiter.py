@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from app.clients.llm_errors import LLMOverloadedError
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_UNIT_SECONDS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Parse OpenAI’s reset durations (``"1s"``, ``"6m0s"``, ``"250ms"``) to seconds.
+    """
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """
+    Cheap upper-bound guess of what a completion request will count against
+    the token budget (≈4 chars per prompt token + requested completion).
+    """
+    prompt_chars = len(json.dumps(kwargs.get('messages', []), ensure_ascii=False))
+    if tools := kwargs.get('tools'):
+        prompt_chars += len(json.dumps(tools))
+    return prompt_chars // 4 + (kwargs.get('max_tokens') or 512)
+
+
+class ModelRateLimiter:
+    """
+    Client-side limiter shared by every completion for one model.
+
+    • Caps concurrent in-flight completions.  The effective cap shrinks on
+      429s and grows back one slot per success (AIMD) up to `max_in_flight`.
+    • Tracks the request / token budget reported by OpenAI’s
+      ``x-ratelimit-*`` response headers and holds requests until the
+      budget resets instead of letting them fail.
+    • Waiting requests queue up to `max_queue`; beyond that, or past their
+      deadline, they fail fast with `LLMOverloadedError`.
+    """
+
+    def __init__(self, model: str, max_in_flight: int, max_queue: int) -> None:
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+
+        self.limit = max_in_flight  # adaptive concurrency cap
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0  # 429s seen
+
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+
+        self._cond = asyncio.Condition()
+
+    # ───────────────────────── public API ──────────────────────────────
+    async def acquire(self, tokens: int, timeout: float) -> None:
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError(
+                f'Too many queued requests for {self.model}',
+                retry_after=max(self._budget_wait(tokens), 1.0),
+            )
+
+        deadline = time.monotonic() + timeout
+        self.queued += 1
+        try:
+            async with self._cond:
+                while not self._can_start(tokens):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise LLMOverloadedError(
+                            f'Timed out waiting for {self.model} capacity',
+                            retry_after=max(self._budget_wait(tokens), 1.0),
+                        )
+                    wake = remaining
+                    if budget_wait := self._budget_wait(tokens):
+                        wake = min(remaining, budget_wait)
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), wake)
+                    except asyncio.TimeoutError:
+                        pass
+
+                self.in_flight += 1
+                if self.remaining_requests is not None:
+                    self.remaining_requests -= 1
+                if self.remaining_tokens is not None:
+                    self.remaining_tokens -= tokens
+        finally:
+            self.queued -= 1
+
+    async def release(self, headers: Optional[Mapping[str, str]] = None, throttled: bool = False) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if headers is not None:
+                self._update_budget(headers)
+            if throttled:
+                self.throttled += 1
+                self.limit = max(1, self.limit // 2)
+                retry_after = _retry_after(headers) if headers is not None else None
+                pause_until = time.monotonic() + (retry_after or 1.0)
+                self.remaining_requests = 0
+                self.requests_reset_at = max(self.requests_reset_at, pause_until)
+            elif self.limit < self.max_in_flight:
+                self.limit += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queued,
+            'concurrency_limit': self.limit,
+            'remaining_requests': self.remaining_requests,
+            'remaining_tokens': self.remaining_tokens,
+            'rejected': self.rejected,
+            'throttled': self.throttled,
+        }
+
+    # ───────────────────────── internals ───────────────────────────────
+    def _can_start(self, tokens: int) -> bool:
+        return self.in_flight < self.limit and not self._budget_wait(tokens)
+
+    def _budget_wait(self, tokens: int) -> float:
+        """Seconds until the known budget allows `tokens` more (0 = now)."""
+        now = time.monotonic()
+        wait = 0.0
+        if self.remaining_requests is not None and self.remaining_requests <= 0:
+            if now < self.requests_reset_at:
+                wait = max(wait, self.requests_reset_at - now)
+            else:
+                self.remaining_requests = None
+        if self.remaining_tokens is not None and self.remaining_tokens < tokens:
+            if now < self.tokens_reset_at:
+                wait = max(wait, self.tokens_reset_at - now)
+            else:
+                self.remaining_tokens = None
+        return wait
+
+    def _update_budget(self, headers: Mapping[str, str]) -> None:
+        now = time.monotonic()
+        if (value := headers.get('x-ratelimit-remaining-requests')) is not None:
+            self.remaining_requests = int(value)
+            self.requests_reset_at = now + (parse_reset(headers.get('x-ratelimit-reset-requests')) or 0.0)
+        if (value := headers.get('x-ratelimit-remaining-tokens')) is not None:
+            self.remaining_tokens = int(value)
+            self.tokens_reset_at = now + (parse_reset(headers.get('x-ratelimit-reset-tokens')) or 0.0)
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    if value := headers.get('retry-after-ms'):
+        return float(value) / 1000
+    return parse_reset(headers.get('retry-after'))
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    if model not in _limiters:
+        settings = get_settings()
+        _limiters[model] = ModelRateLimiter(
+            model,
+            max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+            max_queue=settings.LLM_MAX_QUEUE,
+        )
+    return _limiters[model]
+
+
+def all_limiter_stats() -> list[Dict[str, Any]]:
+    return [limiter.stats() for limiter in _limiters.values()]
@@ -1,10 +1,38 @@
 from functools import lru_cache
 
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 
 from app.settings import get_settings
+from app.utils.profiling import await_span
+
+
+class ProfiledPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with await_span(f'redis.PIPELINE[{len(self.command_stack)}]'):
+            return await super().execute(raise_on_error)
+
+
+class ProfiledRedis(Redis):
+    """Redis client whose round trips show up as awaits in request profiles."""
+
+    async def execute_command(self, *args, **options):
+        with await_span(f'redis.{args[0]}'):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> ProfiledPipeline:
+        return ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
 
 @lru_cache
 def get_redis() -> Redis:
-    return Redis.from_url(str(get_settings().REDIS_URL), decode_responses=True)
\ No newline at end of file
+    return ProfiledRedis.from_url(str(get_settings().REDIS_URL), decode_responses=True)
+
+
+@lru_cache
+def get_session_redis() -> Redis:
+    """
+    Binary-safe client for session storage (values are written by
+    `app.utils.codec` and may be compressed).
+    """
+    return ProfiledRedis.from_url(str(get_settings().REDIS_URL), decode_responses=False)
@@ -1,16 +1,26 @@
 from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List
 
-from app.data.load import load_portfolio_data
+from app.data.load import load_portfolio_snapshot, portfolio_snapshot_version
 
-latest_seen = defaultdict(lambda: ('1970-01-01T00:00:00', 0.0))
 
-portfolio_data = load_portfolio_data()
+def compute_latest_prices(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+    """ISIN → price of its most recent transaction."""
+    latest_seen = defaultdict(lambda: ('1970-01-01T00:00:00', 0.0))
+    for tx in transactions:
+        isin = tx['isin']
+        ts = tx['timestamp']
+        price = tx['price']
+        if ts > latest_seen[isin][0]:
+            latest_seen[isin] = (ts, price)
+    return {isin: price for isin, (ts, price) in latest_seen.items()}
 
-for tx in portfolio_data['transactions']:
-    isin = tx['isin']
-    ts = tx['timestamp']
-    price = tx['price']
-    if ts > latest_seen[isin][0]:
-        latest_seen[isin] = (ts, price)
 
-latest_prices = {isin: price for isin, (ts, price) in latest_seen.items()}
+def get_latest_prices() -> Dict[str, float]:
+    return _latest_prices(portfolio_snapshot_version())
+
+
+@lru_cache(maxsize=1)
+def _latest_prices(version: str) -> Dict[str, float]:
+    return compute_latest_prices(load_portfolio_snapshot(version)['transactions'])
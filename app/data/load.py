@@ -1,20 +1,63 @@
+import hashlib
 import json
+from functools import lru_cache
 from pathlib import Path
 
+from app.settings import get_settings
+
 BASE_DIR = Path(__file__).resolve().parent.parent  # points to `app/`
 
+# portfolio key → file name inside the data directory
+PORTFOLIO_FILES = {
+    'holdings': 'holdings.json',
+    'cash_balances': 'cash_balances.json',
+    'accounts': 'accounts.json',
+    'fund_metadata': 'fund_metadata.json',
+    'transactions': 'mock_transactions.json',
+}
+
 
-def load_json(relative_path: str):
+def load_json(relative_path: str | Path):
+    """Parse a JSON file; relative paths are resolved against `app/`."""
     file_path = BASE_DIR / relative_path
     with open(file_path, 'r') as f:
         return json.load(f)
 
 
+def portfolio_data_dir() -> Path:
+    """PORTFOLIO_DATA_DIR if set (e.g. a generated benchmark portfolio), else `app/data`."""
+    return Path(get_settings().PORTFOLIO_DATA_DIR or BASE_DIR / 'data')
+
+
 def load_portfolio_data():
-    return {
-        "holdings": load_json('data/holdings.json'),
-        "cash_balances": load_json('data/cash_balances.json'),
-        "accounts": load_json('data/accounts.json'),
-        "fund_metadata": load_json('data/fund_metadata.json'),
-        "transactions": load_json('data/mock_transactions.json'),
-    }
+    """Portfolio data for the current snapshot (cached; treat as read-only)."""
+    return load_portfolio_snapshot(portfolio_snapshot_version())
+
+
+@lru_cache(maxsize=1)
+def load_portfolio_snapshot(version: str):
+    """Files are parsed once per snapshot `version`, not per request."""
+    return load_portfolio_dir(portfolio_data_dir())
+
+
+def load_portfolio_dir(data_dir: Path):
+    """Parse every portfolio file in `data_dir` (uncached)."""
+    return {key: load_json(data_dir / name) for key, name in PORTFOLIO_FILES.items()}
+
+
+def portfolio_snapshot_version() -> str:
+    return snapshot_version_of(portfolio_data_dir())
+
+
+def snapshot_version_of(data_dir: Path) -> str:
+    """
+    Short fingerprint of the portfolio data files (path, size, mtime).
+    Changes whenever any file is rewritten or the data directory changes,
+    so caches keyed by it are invalidated automatically.  Costs only a few
+    `stat` calls.
+    """
+    digest = hashlib.sha1()
+    for path in (data_dir / name for name in PORTFOLIO_FILES.values()):
+        stat = path.stat()
+        digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
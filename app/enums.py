@@ -10,3 +10,12 @@ class ModelName(str, enum.Enum):
     GPT_4_32K = "gpt-4-32k"
     GPT_4_TURBO = "gpt-4-turbo"
     GPT_4_TURBO_32K = "gpt-4-turbo-32k"
+
+
+class ResponseMode(str, enum.Enum):
+    """
+    How a tool result is turned into the user-facing answer.
+    """
+    TEMPLATE = "template"  # tool.render() only, no LLM call
+    REPHRASE = "rephrase"  # tool.render() polished by the cheaper REPHRASE_MODEL
+    LLM = "llm"  # full second completion with the conversation context
@@ -7,5 +7,5 @@ class ToolCallRecord(BaseModel):
     tool_call_id: str
     name: str
     arguments: str  # JSON string
-    content: str  # Result (as JSON string summary)
+    content: str  # Result, compact JSON (see encode_tool_result)
     summary: Optional[str] = None  # Summary of the tool call result
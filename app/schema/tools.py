@@ -20,6 +20,13 @@ system_prompt = (
     "Instead, explain insights, suggestions, or next steps in a friendly, helpful tone."
 )
 
+rephrase_prompt = (
+    "You are a friendly financial assistant. Rewrite the following portfolio analysis "
+    "for the user in plain English. Keep every number, fund name and action exactly as given, "
+    "keep it concise, and do not add advice that is not in the text. "
+    "Never mention internal tool names or implementation details."
+)
+
 
 class RebalanceSuggestion(BaseModel):
     current_allocation: Dict[str, float]
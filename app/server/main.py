@@ -1,14 +1,98 @@
+import asyncio
+import contextlib
 import logging
+import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
+from app.clients.llm_errors import LLMRequestError, LLMUnavailableError
+from app.clients.redis import get_session_redis
 from app.server.routes.chat import router as chat_router
+from app.server.routes.jobs import router as jobs_router
+from app.server.routes.ops import router as ops_router
+from app.server.warmup import warm_up
+from app.services.concurrency import RetryLaterError
+from app.services.session_cache import get_session_cache
 from app.settings import get_settings
+from app.utils.metrics import HTTP_REQUEST_SECONDS
+from app.utils.profiling import profile_request, request_id, should_profile
+from app.utils.tracing import start_trace
 
 logging.basicConfig(
     level=get_settings().LOGGING_LEVEL,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: FastAPI):
+    tasks = [asyncio.create_task(warm_up())]  # /ready reports 503 until this finishes
+    if cache := get_session_cache():
+        tasks.append(asyncio.create_task(cache.listen(get_session_redis())))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(chat_router)
+app.include_router(jobs_router)
+app.include_router(ops_router)
+
+
+@app.middleware('http')
+async def timing_middleware(request: Request, call_next):
+    """
+    Collect per-stage spans for the request; export them as a Server-Timing
+    header and a log line (with the session id, which is kept out of metric
+    labels) and observe the request latency per route.  Selected requests
+    are also profiled (see `app.utils.profiling`).
+    """
+    started = time.perf_counter()
+    status = 500
+    profile_id = request_id(request.headers)
+    profiling = profile_request(profile_id) if should_profile(request.headers) else contextlib.nullcontext()
+    with start_trace(session=request.headers.get('session-id', '-')) as trace, profiling as profile:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            route = request.scope.get('route')
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=getattr(route, 'path', 'unmatched'),
+                status=str(status),
+            )
+    response.headers['Server-Timing'] = trace.server_timing()
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile_id
+    if trace.spans:
+        logger.info('timings %s', trace.log_line())
+    return response
+
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(_request: Request, exc: LLMUnavailableError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={'detail': str(exc)},
+        headers={'Retry-After': str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(LLMRequestError)
+async def llm_request_handler(_request: Request, exc: LLMRequestError) -> JSONResponse:
+    return JSONResponse(status_code=502, content={'detail': str(exc)})
+
+
+@app.exception_handler(RetryLaterError)
+async def retry_later_handler(_request: Request, exc: RetryLaterError) -> JSONResponse:
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={'detail': str(exc)},
+        headers={'Retry-After': str(max(1, round(exc.retry_after)))},
+    )
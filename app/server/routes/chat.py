@@ -1,30 +1,92 @@
+import hashlib
 import logging
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Header, Depends
-from redis.asyncio.client import Redis
+from fastapi import APIRouter, Header, Depends, HTTPException, Query
 from starlette.responses import Response
 
-from app.clients.redis import get_redis
-from app.server.schemes.chat import Prompt, ChatResponse, SelectModelRequest
-from app.services.agent_manager import AgentManager
+from app.clients.redis import get_session_redis
+from app.server.schemes.chat import Prompt, ChatResponse, SelectModelRequest, HistoryMessage, HistoryPage
+from app.services.agent_manager import get_agent_manager
+from app.services.concurrency import admit_turn
+from app.services.history import MessageHistory, StaleCursorError
 from app.services.llm_agent import LLMPortfolioAgent
+from app.services.session_cache import get_session_cache
+from app.services.single_flight import get_single_flight
+from app.settings import get_settings
+from app.utils.tracing import set_labels
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MAX_HISTORY_PAGE = 200
+CURSOR_PATTERN = r'^[0-9a-f]+:\d+$'  # "{generation}:{index}"
 
-def get_agent(session_id: UUID = Header(...), redis_client: Redis = Depends(get_redis)) -> LLMPortfolioAgent:
-    return AgentManager(redis_client).get_agent(session_id=session_id)
+
+async def get_agent(session_id: UUID = Header(...)) -> LLMPortfolioAgent:
+    return await get_agent_manager().get_agent(session_id)
 
 
 @router.post("/model")
-async def select_model(req: SelectModelRequest, agent: LLMPortfolioAgent = Depends(get_agent)) -> Response:
-    agent.set_model(req.model_name)
+async def select_model(req: SelectModelRequest, session_id: UUID = Header(...)) -> Response:
+    await get_agent_manager().set_model(session_id, req.model_name)
     return Response(status_code=200)
 
 
 @router.post('/chat', response_model=ChatResponse)
-async def chat(prompt: Prompt, agent: LLMPortfolioAgent = Depends(get_agent)):
+async def chat(
+        prompt: Prompt,
+        session_id: UUID = Header(...),
+        agent: LLMPortfolioAgent = Depends(get_agent),
+):
     logger.info(f"prompt: {prompt}")
-    return await agent.process_prompt(prompt)
+    set_labels(model=agent.model)
+
+    async def run_turn() -> dict:
+        # one turn per session at a time; history would interleave otherwise
+        async with admit_turn(str(session_id)):
+            return (await agent.process_prompt(prompt)).model_dump()
+
+    # double-submits of the same prompt in the same session run only once (and hold no slot)
+    settings = get_settings()
+    prompt_hash = hashlib.sha1(prompt.text.encode('utf-8')).hexdigest()[:16]
+    key = f'chat:{session_id}:{prompt_hash}:{agent.model}:{agent.tool_dispatcher.snapshot_version}'
+    result = await get_single_flight().do_json(
+        key,
+        run_turn,
+        result_ttl=settings.CHAT_DEDUP_SECONDS,
+        lock_ttl=settings.ADMISSION_WAIT_SECONDS + settings.SESSION_LOCK_WAIT_SECONDS + settings.CHAT_DEADLINE_SECONDS + 5,
+    )
+    return ChatResponse.model_validate(result)
+
+
+@router.get('/history', response_model=HistoryPage)
+async def history(
+        session_id: UUID = Header(...),
+        cursor: Optional[str] = Query(None, pattern=CURSOR_PATTERN, description='`next_cursor` of the previous page'),
+        limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE),
+) -> HistoryPage:
+    """
+    The session's chat history, newest page first; each page is one ranged
+    read.  Cursors carry the session's generation: once the session was
+    reset or expired they get **409**, and the client starts again from the
+    latest page.
+    """
+    generation, before = None, None
+    if cursor is not None:
+        generation, _, index = cursor.rpartition(':')
+        before = int(index)
+    # read directly: building an agent (portfolio, tools) isn't needed to read history
+    messages = MessageHistory(get_session_redis(), str(session_id), cache=get_session_cache())
+    try:
+        generation, start, page = await messages.get_page(before, limit, generation=generation)
+    except StaleCursorError:
+        raise HTTPException(409, 'history was reset; reload the latest page') from None
+    return HistoryPage(
+        messages=[
+            HistoryMessage(index=start + i, role=m.get('role', ''), content=m.get('content'))
+            for i, m in enumerate(page)
+        ],
+        next_cursor=f'{generation}:{start}' if start > 0 and generation else None,
+    )
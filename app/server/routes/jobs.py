@@ -0,0 +1,97 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+
+from app.server.schemes.jobs import JobRequest, JobResults, JobStatus, JobSubmitted
+from app.services.jobs import get_job_queue
+from app.settings import get_settings
+from app.tools.registry import all_tools
+
+router = APIRouter()
+
+JOB_ID = Path(..., pattern=r'^[0-9a-f]{32}$')
+MAX_PAGE = 500
+EVENT_POLL_SECONDS = 0.5
+
+
+@router.post('/jobs', response_model=JobSubmitted, status_code=202)
+async def submit_job(req: JobRequest) -> JobSubmitted:
+    """Queue a batch of prompt / tool items; workers pick them up (see app.services.job_worker)."""
+    if len(req.items) > get_settings().JOB_MAX_ITEMS:
+        raise HTTPException(413, f'at most {get_settings().JOB_MAX_ITEMS} items per job')
+    unknown = sorted({i.tool.name for i in req.items if i.tool} - set(all_tools()))
+    if unknown:
+        raise HTTPException(422, f'unknown tool(s): {", ".join(unknown)}')
+    items = [item.model_dump(exclude_none=True) for item in req.items]
+    job_id = await get_job_queue().submit(items, req.model.value)
+    return JobSubmitted(job_id=job_id, total=len(items))
+
+
+@router.get('/jobs/backlog')
+async def job_backlog() -> dict:
+    """Items waiting in the stream / delivered but not yet acknowledged (all jobs)."""
+    return await get_job_queue().backlog()
+
+
+@router.get('/jobs/{job_id}', response_model=JobStatus)
+async def job_status(job_id: str = JOB_ID) -> JobStatus:
+    return JobStatus(**await _status_or_404(job_id))
+
+
+@router.get('/jobs/{job_id}/results', response_model=JobResults)
+async def job_results(
+        job_id: str = JOB_ID,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=MAX_PAGE),
+) -> JobResults:
+    """One page of results, in completion order; poll again from `next_offset` while not `complete`."""
+    status = await _status_or_404(job_id)
+    results = await get_job_queue().results(job_id, offset, limit)
+    next_offset = offset + len(results)
+    finished = status['status'] == 'completed'
+    return JobResults(results=results, next_offset=next_offset, complete=finished and next_offset >= status['total'])
+
+
+@router.get('/jobs/{job_id}/events')
+async def job_events(job_id: str = JOB_ID) -> StreamingResponse:
+    """
+    Server-sent events: ``progress`` whenever the counts change, one
+    ``result`` per finished item, and ``done`` once the job has completed.
+    """
+    await _status_or_404(job_id)
+    return StreamingResponse(_events(job_id), media_type='text/event-stream')
+
+
+async def _events(job_id: str) -> AsyncIterator[str]:
+    queue = get_job_queue()
+    offset, last = 0, None
+    while True:
+        status = await queue.status(job_id)
+        if status is None:  # expired meanwhile
+            yield _sse('error', {'detail': 'job not found'})
+            return
+        if (progress := (status['done'], status['failed'])) != last:
+            last = progress
+            yield _sse('progress', status)
+        # ranged reads: only the results not sent yet
+        while results := await queue.results(job_id, offset, MAX_PAGE):
+            offset += len(results)
+            for result in results:
+                yield _sse('result', result)
+        if status['status'] == 'completed' and offset >= status['total']:
+            yield _sse('done', status)
+            return
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _status_or_404(job_id: str) -> dict:
+    if (status := await get_job_queue().status(job_id)) is None:
+        raise HTTPException(404, 'job not found')
+    return status
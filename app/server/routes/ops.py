@@ -0,0 +1,81 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.clients.completion_cache import get_completion_cache
+from app.clients.rate_limiter import all_limiter_stats
+from app.server.warmup import readiness
+from app.services.agent_manager import get_agent_manager
+from app.services.concurrency import get_admission_controller, get_session_turn_lock
+from app.services.history_index import get_history_index_cache
+from app.services.session_cache import get_session_cache
+from app.services.single_flight import get_single_flight
+from app.services.speculation import speculation_stats
+from app.services.tool_cache import get_tool_cache
+from app.utils.metrics import REGISTRY, MetricFamily, Sample
+
+router = APIRouter()
+
+
+@router.get('/ready')
+async def ready() -> JSONResponse:
+    """Readiness probe: 200 once the startup warm-up has finished, 503 before."""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.snapshot())
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus exposition of this worker's metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+
+@router.get('/limits')
+async def llm_limits() -> list[dict]:
+    """Per-model OpenAI limiter state (queue depth, in-flight, budgets)."""
+    return all_limiter_stats()
+
+
+@router.get('/stats')
+async def stats() -> dict:
+    """Cache and speculation counters for this worker."""
+    cache = get_session_cache()
+    tool_cache = get_tool_cache()
+    completion_cache = get_completion_cache()
+    history_index = get_history_index_cache()
+    return {
+        'session_cache': cache.stats() if cache else None,
+        'tool_cache': tool_cache.stats() if tool_cache else None,
+        'completion_cache': completion_cache.stats() if completion_cache else None,
+        'history_index': history_index.stats() if history_index else None,
+        'speculation': speculation_stats.snapshot(),
+        'single_flight': get_single_flight().stats(),
+        'agents': get_agent_manager().stats(),
+        'admission': get_admission_controller().stats(),
+        'session_locks': get_session_turn_lock().stats(),
+    }
+
+
+def _cache_metrics() -> list[MetricFamily]:
+    """Cache hit/miss counters, read from the caches at scrape time."""
+    lookups = []
+    for cache_name, cache, hit_fields in (
+            ('session', get_session_cache(), ('hits',)),
+            ('tool', get_tool_cache(), ('local_hits', 'redis_hits')),
+            ('completion', get_completion_cache(), ('hits',)),
+    ):
+        if cache is None:
+            continue
+        counters = cache.stats()
+        hits = sum(counters[f] for f in hit_fields)
+        lookups.append(('cache_lookups_total', Sample({'cache': cache_name, 'result': 'hit'}, hits)))
+        lookups.append(('cache_lookups_total', Sample({'cache': cache_name, 'result': 'miss'}, counters['misses'])))
+    speculation = speculation_stats.snapshot()
+    return [
+        MetricFamily('cache_lookups', 'counter', 'Cache lookups by cache and result', lookups),
+        MetricFamily('speculative_tool_runs', 'counter', 'Speculative tool runs by outcome', [
+            ('speculative_tool_runs_total', Sample({'outcome': outcome}, speculation[outcome]))
+            for outcome in ('hits', 'wasted')
+        ]),
+    ]
+
+
+REGISTRY.register_collector(_cache_metrics)
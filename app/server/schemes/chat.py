@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 from app.enums import ModelName
@@ -13,3 +15,14 @@ class Prompt(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
+
+
+class HistoryMessage(BaseModel):
+    index: int  # position in the session's history
+    role: str
+    content: Optional[str] = None
+
+
+class HistoryPage(BaseModel):
+    messages: List[HistoryMessage]  # oldest first
+    next_cursor: Optional[str] = None  # pass as `cursor` for the page before this one; None at the start
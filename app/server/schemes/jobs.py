@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.enums import ModelName
+
+PORTFOLIO_NAME_PATTERN = r'^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$'  # a subdirectory of JOB_PORTFOLIOS_DIR
+
+
+class ToolCall(BaseModel):
+    name: str
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JobItem(BaseModel):
+    portfolio: Optional[str] = Field(default=None, pattern=PORTFOLIO_NAME_PATTERN)  # None = the default portfolio
+    prompt: Optional[str] = None
+    tool: Optional[ToolCall] = None
+
+    @model_validator(mode='after')
+    def _prompt_or_tool(self) -> 'JobItem':
+        if (self.prompt is None) == (self.tool is None):
+            raise ValueError('each item needs exactly one of "prompt" or "tool"')
+        return self
+
+
+class JobRequest(BaseModel):
+    items: List[JobItem] = Field(min_length=1)
+    model: ModelName = ModelName.GPT_4
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    total: int
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | completed
+    total: int
+    done: int
+    failed: int
+    model: str
+    created: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+class JobResults(BaseModel):
+    results: List[Dict[str, Any]]  # {index, status, response?, result?, error?, seconds}
+    next_offset: int  # pass as `offset` to continue
+    complete: bool  # job finished and every result returned
@@ -0,0 +1,128 @@
+"""
+Startup warm-up, run from the FastAPI lifespan before the worker reports
+ready (``GET /ready``).
+
+Everything that used to happen lazily on the first request is done here:
+portfolio data + latest prices, tool discovery and schemas, tokenizer
+loading, the intent router, and the Redis / OpenAI connection pools.
+Blocking steps (file loads, the tokenizer download) run in threads so
+``/health`` and ``/ready`` keep answering meanwhile.  Required steps are
+retried up to ``WARMUP_MAX_ATTEMPTS`` times, after which the worker stays
+unready and ``/ready`` reports ``failed``; OpenAI is best-effort (the agent
+degrades gracefully without it).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+from app.clients.openai_client import client as openai_client
+from app.clients.redis import get_redis, get_session_redis
+from app.data.latest_prices import get_latest_prices
+from app.data.load import load_portfolio_data
+from app.schema.tools import get_tool_schema
+from app.services.agent_manager import DEFAULT_MODEL
+from app.services.intent_router import get_intent_router
+from app.settings import get_settings
+from app.utils.token_estimate import get_encoding
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 5.0
+STEP_TIMEOUT_SECONDS = 60.0  # e.g. a stalled tokenizer download
+OPENAI_WARMUP_TIMEOUT_SECONDS = 5.0
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self.ready = False
+        self.failed = False  # gave up after WARMUP_MAX_ATTEMPTS
+        self.attempts = 0
+        self.steps: Dict[str, float] = {}  # step → seconds
+        self.errors: Dict[str, str] = {}
+
+    def snapshot(self) -> dict:
+        return {
+            'ready': self.ready,
+            'failed': self.failed,
+            'attempts': self.attempts,
+            'steps_ms': {k: round(v * 1000, 1) for k, v in self.steps.items()},
+            'errors': dict(self.errors),
+        }
+
+
+readiness = Readiness()
+
+
+async def warm_up() -> None:
+    """Run every warm-up step, retrying required ones, then mark the worker ready."""
+    max_attempts = get_settings().WARMUP_MAX_ATTEMPTS
+    for attempt in range(1, max_attempts + 1):
+        readiness.attempts = attempt
+        if await _run_steps():
+            readiness.ready = True
+            logger.info('Warm-up done in %.0f ms', sum(readiness.steps.values()) * 1000)
+            return
+        if attempt < max_attempts:
+            logger.warning('Warm-up attempt %d/%d incomplete (%s), retrying in %.0fs',
+                           attempt, max_attempts, ', '.join(readiness.errors), RETRY_SECONDS)
+            await asyncio.sleep(RETRY_SECONDS)
+    readiness.failed = True
+    logger.error('Warm-up failed after %d attempts, worker stays unready: %s', max_attempts, readiness.errors)
+
+
+async def _run_steps() -> bool:
+    required: Dict[str, Callable[[], Awaitable[None]]] = {
+        'portfolio_data': _load_data,
+        'tools': _discover_tools,
+        'tokenizers': _prime_tokenizers,
+        'redis': _connect_redis,
+    }
+    ok = True
+    for name, step in required.items():
+        ok &= await _timed(name, step)
+    await _timed('openai', _connect_openai)
+    return ok
+
+
+async def _timed(name: str, step: Callable[[], Awaitable[None]]) -> bool:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(step(), STEP_TIMEOUT_SECONDS)
+    except Exception as exc:
+        readiness.errors[name] = repr(exc)
+        return False
+    finally:
+        readiness.steps[name] = time.perf_counter() - started
+    readiness.errors.pop(name, None)
+    return True
+
+
+async def _load_data() -> None:
+    await asyncio.to_thread(load_portfolio_data)
+    await asyncio.to_thread(get_latest_prices)
+
+
+async def _discover_tools() -> None:
+    await asyncio.to_thread(get_tool_schema)  # imports every app.tools module
+    await asyncio.to_thread(get_intent_router)
+
+
+async def _prime_tokenizers() -> None:
+    for model in {DEFAULT_MODEL.value, get_settings().REPHRASE_MODEL}:
+        await asyncio.to_thread(_load_encoding, model)
+
+
+def _load_encoding(model: str) -> None:
+    get_encoding(model).encode('warm-up')  # downloads / loads the BPE ranks once
+
+
+async def _connect_redis() -> None:
+    await asyncio.gather(get_redis().ping(), get_session_redis().ping())
+
+
+async def _connect_openai() -> None:
+    # opens the HTTP/TLS connection pool; failures only delay the first request
+    await openai_client.models.list(timeout=OPENAI_WARMUP_TIMEOUT_SECONDS)
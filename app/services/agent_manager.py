@@ -1,28 +1,116 @@
+from collections import OrderedDict
+from functools import lru_cache
 from uuid import UUID
+
 from redis.asyncio import Redis
 
-from app.data.latest_prices import latest_prices
-from app.data.load import load_portfolio_data
+from app.clients.completion_cache import DEFAULT_SOURCE
+from app.clients.redis import get_session_redis
+from app.data.latest_prices import get_latest_prices
+from app.data.load import load_portfolio_snapshot, portfolio_snapshot_version
 from app.enums import ModelName
 from app.services.history import MessageHistory, ToolMemory
+from app.services.history_index import get_history_index_cache
 from app.services.llm_agent import LLMPortfolioAgent
+from app.services.session_cache import get_session_cache
+from app.services.tool_cache import get_tool_cache
+from app.settings import get_settings
+
+DEFAULT_MODEL = ModelName.GPT_4
 
 
 class AgentManager:
-    def __init__(self, redis: Redis):
+    """
+    Per-worker LRU of session agents.  Agents are rebuilt when evicted or
+    when the portfolio snapshot changes; per-session settings (the chosen
+    model) live in Redis under ``session_settings:{session}`` so every
+    worker sees them.
+    """
+
+    def __init__(self, redis: Redis, max_sessions: int) -> None:
         self.redis = redis
+        self.max_sessions = max_sessions
+        self._agents: OrderedDict[str, LLMPortfolioAgent] = OrderedDict()
+
+    async def get_agent(self, session_id: UUID) -> LLMPortfolioAgent:
+        key = str(session_id)
+        model = await self.get_model(session_id)
+        version = portfolio_snapshot_version()
+
+        agent = self._agents.pop(key, None)
+        if agent is None or agent.tool_dispatcher.snapshot_version != version:
+            agent = self._build_agent(key, model, version)
+        agent.set_model(model)
+
+        self._agents[key] = agent
+        while len(self._agents) > self.max_sessions:
+            self._agents.popitem(last=False)
+        return agent
+
+    async def get_model(self, session_id: UUID) -> ModelName:
+        raw = await self.redis.hget(self._settings_key(session_id), 'model')
+        if raw is None:
+            return DEFAULT_MODEL
+        return ModelName(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
+
+    async def set_model(self, session_id: UUID, model: ModelName) -> None:
+        key = self._settings_key(session_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(key, 'model', model.value)
+        pipe.expire(key, get_settings().SESSION_TTL_SECONDS)
+        await pipe.execute()
+        if agent := self._agents.get(str(session_id)):
+            agent.set_model(model)
+
+    def stats(self) -> dict:
+        return {'sessions': len(self._agents), 'max_sessions': self.max_sessions}
+
+    def _build_agent(self, session_id: str, model: ModelName, version: str) -> LLMPortfolioAgent:
+        return build_agent(
+            self.redis,
+            session_id,
+            model,
+            load_portfolio_snapshot(version),
+            get_latest_prices(),
+            version,
+        )
+
+    @staticmethod
+    def _settings_key(session_id: UUID) -> str:
+        return f'session_settings:{session_id}'
+
+
+def build_agent(
+        redis: Redis,
+        session_id: str,
+        model: ModelName,
+        portfolio: dict,
+        latest_prices: dict,
+        snapshot_version: str,
+        snapshot_source: str = DEFAULT_SOURCE,
+) -> LLMPortfolioAgent:
+    """
+    An agent for one session over `portfolio` (as returned by the loader);
+    `snapshot_source` names that portfolio for completion-cache invalidation.
+    """
+    cache = get_session_cache()
+    return LLMPortfolioAgent(
+        model=model.value,
+        history=MessageHistory(redis, session_id, cache=cache),
+        memory=ToolMemory(redis, session_id, cache=cache),
+        holdings=portfolio['holdings'],
+        cash_balances=portfolio['cash_balances'],
+        accounts=portfolio['accounts'],
+        fund_metadata=portfolio['fund_metadata'],
+        transactions=portfolio['transactions'],
+        latest_prices=latest_prices,
+        snapshot_version=snapshot_version,
+        tool_cache=get_tool_cache(),
+        history_index=get_history_index_cache(),
+        snapshot_source=snapshot_source,
+    )
+
 
-    def get_agent(self, session_id: UUID, model: ModelName = ModelName.GPT_4) -> LLMPortfolioAgent:
-        portfolio = load_portfolio_data()
-
-        return LLMPortfolioAgent(
-            model=model.value,
-            history=MessageHistory(self.redis, str(session_id)),
-            memory=ToolMemory(self.redis, session_id),
-            holdings=portfolio['holdings'],
-            cash_balances=portfolio['cash_balances'],
-            accounts=portfolio['accounts'],
-            fund_metadata=portfolio['fund_metadata'],
-            transactions=portfolio['transactions'],
-            latest_prices=latest_prices,
-        )
\ No newline at end of file
+@lru_cache
+def get_agent_manager() -> AgentManager:
+    return AgentManager(get_session_redis(), get_settings().AGENT_CACHE_MAX_SESSIONS)
@@ -0,0 +1,244 @@
+"""
+Turn-level concurrency control for /chat.
+
+  • `AdmissionController` – caps concurrent turns per worker; a short wait
+    queue absorbs bursts, beyond that requests are rejected with Retry-After
+  • `SessionTurnLock`     – one turn per session at a time, across workers
+    (local asyncio lock + Redis lock), with a bounded per-session wait queue;
+    the Redis lock is renewed for as long as the turn runs, however long
+    that is, and expires shortly after a worker dies holding it
+  • `admit_turn`          – both, in that order: turns queued behind another
+    turn of their session don't occupy a worker slot while they wait
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.clients.redis import get_session_redis
+from app.services.single_flight import EXTEND_LOCK_SCRIPT, RELEASE_LOCK_SCRIPT
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_SECONDS = 0.05
+LOCK_RENEWALS_PER_TTL = 3  # renew well before expiry, so a slow Redis round trip doesn't lose the lock
+MAX_TRACKED_SESSIONS = 1_000  # per-session metrics are kept for the most recent N sessions
+
+
+class RetryLaterError(Exception):
+    """The turn was not run; the client should retry after `retry_after` seconds."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServerOverloadedError(RetryLaterError):
+    status_code = 503
+
+
+class SessionBusyError(RetryLaterError):
+    status_code = 429
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._slots.locked():
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise ServerOverloadedError('Server is busy', retry_after=self.wait_timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise ServerOverloadedError('Server is busy', retry_after=self.wait_timeout) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'max_concurrent': self.max_concurrent,
+        }
+
+
+class _SessionSlot:
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.waiters = 0
+
+
+class SessionTurnLock:
+    def __init__(self, redis: Redis, max_waiters: int, wait_timeout: float, lock_ttl: float) -> None:
+        self.redis = redis
+        self.max_waiters = max_waiters
+        self.wait_timeout = wait_timeout
+        self.lock_ttl = lock_ttl
+        self._slots: Dict[str, _SessionSlot] = {}
+
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        # session → {'queued': n, 'rejected': n}, most recently touched last
+        self.per_session: OrderedDict[str, Dict[str, int]] = OrderedDict()
+
+    @contextlib.asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        slot = self._slots.setdefault(session_id, _SessionSlot())
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+
+        if slot.lock.locked():
+            if slot.waiters >= self.max_waiters:
+                self._reject(session_id)
+            self.queued += 1
+            self._session_stats(session_id)['queued'] += 1
+
+        slot.waiters += 1
+        try:
+            try:
+                await asyncio.wait_for(slot.lock.acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self._reject(session_id)
+        finally:
+            slot.waiters -= 1
+
+        token: Optional[str] = None
+        renewal: Optional[asyncio.Task] = None
+        try:
+            token = await self._acquire_distributed(session_id, deadline)
+            renewal = asyncio.create_task(self._keep_alive(session_id, token))
+            self.total_wait_seconds += time.monotonic() - started
+            yield
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+            if token is not None:
+                await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, self._lock_key(session_id), token)
+            slot.lock.release()
+            if slot.waiters == 0 and not slot.lock.locked():
+                self._slots.pop(session_id, None)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'total_wait_seconds': round(self.total_wait_seconds, 3),
+            'queue_depth': {sid: s.waiters for sid, s in self._slots.items() if s.waiters},
+            'per_session': dict(self.per_session),
+        }
+
+    async def _acquire_distributed(self, session_id: str, deadline: float) -> str:
+        token = uuid4().hex
+        key = self._lock_key(session_id)
+        while not await self.redis.set(key, token, nx=True, px=int(self.lock_ttl * 1000)):
+            if time.monotonic() >= deadline:
+                self._reject(session_id)
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        return token
+
+    async def _keep_alive(self, session_id: str, token: str) -> None:
+        """Renew the Redis lock until cancelled (the turn finished)."""
+        key, ttl_ms = self._lock_key(session_id), int(self.lock_ttl * 1000)
+        while True:
+            await asyncio.sleep(self.lock_ttl / LOCK_RENEWALS_PER_TTL)
+            try:
+                if not await self.redis.eval(EXTEND_LOCK_SCRIPT, 1, key, token, ttl_ms):
+                    logger.warning('Lost the turn lock of session %s; another turn may run concurrently', session_id)
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # keep trying while the lock hasn't expired yet
+                logger.warning('Could not renew the turn lock of session %s: %s', session_id, exc)
+
+    def _reject(self, session_id: str) -> None:
+        self.rejected += 1
+        self._session_stats(session_id)['rejected'] += 1
+        raise SessionBusyError('Another message in this session is still being processed',
+                               retry_after=self.wait_timeout)
+
+    def _session_stats(self, session_id: str) -> Dict[str, int]:
+        stats = self.per_session.pop(session_id, None) or {'queued': 0, 'rejected': 0}
+        self.per_session[session_id] = stats
+        while len(self.per_session) > MAX_TRACKED_SESSIONS:
+            self.per_session.popitem(last=False)
+        return stats
+
+    @staticmethod
+    def _lock_key(session_id: str) -> str:
+        return f'session_lock:{session_id}'
+
+
+@contextlib.asynccontextmanager
+async def admit_turn(
+        session_id: str,
+        turn_lock: Optional[SessionTurnLock] = None,
+        admission: Optional[AdmissionController] = None,
+) -> AsyncIterator[None]:
+    """
+    Run one turn of `session_id`: wait for the session's previous turn, then
+    for a worker slot.  A slot is taken only once the turn can actually run,
+    so one chatty session can't crowd other sessions out of the worker.
+    """
+    turn_lock = turn_lock or get_session_turn_lock()
+    admission = admission or get_admission_controller()
+    async with turn_lock.hold(session_id), admission.admit():
+        yield
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    return AdmissionController(
+        max_concurrent=settings.MAX_CONCURRENT_TURNS,
+        max_waiting=settings.MAX_WAITING_TURNS,
+        wait_timeout=settings.ADMISSION_WAIT_SECONDS,
+    )
+
+
+@lru_cache
+def get_session_turn_lock() -> SessionTurnLock:
+    settings = get_settings()
+    return SessionTurnLock(
+        get_session_redis(),
+        max_waiters=settings.SESSION_MAX_QUEUED_TURNS,
+        wait_timeout=settings.SESSION_LOCK_WAIT_SECONDS,
+        lock_ttl=settings.SESSION_LOCK_TTL_SECONDS,
+    )
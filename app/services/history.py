@@ -1,60 +1,241 @@
-import json
-from typing import Any, Optional, Dict, List
-from uuid import UUID
+from typing import Any, Optional, Dict, List, Tuple
+from uuid import UUID, uuid4
 from redis.asyncio.client import Redis
 
 from app.models.tool_memory import ToolCallRecord
+from app.services.session_cache import SessionCache, remaining_ttl
+from app.settings import get_settings
+from app.utils import codec
+
+
+class StaleCursorError(Exception):
+    """A page cursor from an earlier incarnation of the session (it was reset or expired)."""
 
 
 class MessageHistory:
-    def __init__(self, redis: Redis, session_id: str, ttl: int = 3600) -> None:
+    """
+    Per-session chat history (Redis list), optionally fronted by the
+    in-process `SessionCache`.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            session_id: str,
+            ttl: Optional[int] = None,
+            cache: Optional[SessionCache] = None,
+    ) -> None:
         self.redis = redis
         self.session_key = f'message_history:{session_id}'
-        self.ttl = ttl
+        # random token, created by the first append after a clear or expiry
+        self.generation_key = f'{self.session_key}:generation'
+        self.ttl = ttl or get_settings().SESSION_TTL_SECONDS
+        self.cache = cache
 
     async def append(self, message: Dict[str, Any]) -> None:
-        await self.redis.rpush(self.session_key, json.dumps(message))
-        await self.redis.expire(self.session_key, self.ttl)
+        raw = codec.encode(message)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(self.session_key, raw)
+        pipe.expire(self.session_key, self.ttl)
+        pipe.set(self.generation_key, uuid4().hex, nx=True)
+        pipe.expire(self.generation_key, self.ttl)
+        if self.cache:
+            self.cache.publish_invalidation(pipe, self.session_key)
+        await pipe.execute()
+        if self.cache:
+            self.cache.update(self.session_key, lambda msgs: msgs.append(message), len(raw), self.ttl)
 
     async def get(self) -> List[Dict[str, Any]]:
-        raw = await self.redis.lrange(self.session_key, 0, -1)
-        return [json.loads(m) for m in raw]
+        if self.cache and (cached := self.cache.get(self.session_key)) is not None:
+            return list(cached)
+        if not self.cache:
+            return [codec.decode(m) for m in await self.redis.lrange(self.session_key, 0, -1)]
+        epoch = self.cache.epoch()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(self.session_key, 0, -1)
+        pipe.pttl(self.session_key)  # the cached copy must expire with the key
+        raw, pttl = await pipe.execute()
+        messages = [codec.decode(m) for m in raw]
+        self.cache.put(self.session_key, list(messages), sum(map(len, raw)), remaining_ttl(pttl, self.ttl), epoch)
+        return messages
+
+    async def get_page(
+            self,
+            before: Optional[int] = None,
+            count: int = 50,
+            generation: Optional[str] = None,
+    ) -> Tuple[Optional[str], int, List[Dict[str, Any]]]:
+        """
+        Return up to `count` messages ending just before list index `before`
+        (the most recent ones when None), oldest first, together with the
+        session's `generation()` and the list index of the first one.
+
+        Indices are only stable within one generation: a reset or expiry
+        starts the list again.  Pass the generation a `before` index came
+        with; if the session has moved on since, `StaleCursorError` is
+        raised instead of serving messages of another conversation.
+        """
+        if self.cache and (cached := self.cache.get(self.session_key)) is not None:
+            current = await self.generation()
+            if before is not None and current != generation:
+                raise StaleCursorError(f'History of {self.session_key} was reset')
+            end = len(cached) if before is None else min(before, len(cached))
+            start = max(0, end - max(count, 0))
+            return current, start, list(cached[start:end])
+
+        # atomic, so the generation and length match the messages read
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.get(self.generation_key)
+        pipe.llen(self.session_key)
+        if count > 0 and before != 0:
+            if before is None:
+                pipe.lrange(self.session_key, -count, -1)
+            else:
+                pipe.lrange(self.session_key, max(0, before - count), before - 1)
+        current, total, *raw = await pipe.execute()
+        current = current.decode('utf-8') if isinstance(current, bytes) else current
+        if before is not None and current != generation:
+            raise StaleCursorError(f'History of {self.session_key} was reset')
+        raw = raw[0] if raw else []
+        start = total - len(raw) if before is None else max(0, before - max(count, 0))
+        return current, start, [codec.decode(m) for m in raw]
 
     async def clear(self) -> None:
-        await self.redis.delete(self.session_key)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self.session_key, self.generation_key)
+        if self.cache:
+            self.cache.publish_invalidation(pipe, self.session_key)
+            self.cache.invalidate(self.session_key)
+        await pipe.execute()
 
     async def length(self) -> int:
         return await self.redis.llen(self.session_key)
 
+    async def generation(self) -> Optional[str]:
+        """
+        Identifies this incarnation of the session: changes whenever the
+        session is cleared or expires and starts again (None while empty).
+        """
+        raw = await self.redis.get(self.generation_key)
+        return raw.decode('utf-8') if isinstance(raw, bytes) else raw
+
 
 class ToolMemory:
-    def __init__(self, redis: Redis, session_id: UUID, ttl: int = 3600) -> None:
+    """
+    Per-session tool-call memory.
+
+    Storage layout (all keys share the session TTL):
+      • ``tool_memory:{session}``        – list, append-only log of every record
+      • ``tool_memory:{session}:latest`` – hash, tool name → its most recent record
+
+    The global "last" record is the tail of the list (``LINDEX -1``) and the
+    last record for a named tool is a single ``HGET``, so per-turn lookups cost
+    one command no matter how many tools the session has run.  Records are
+    only parsed/validated when they are actually returned.  Values are stored
+    with `app.utils.codec`.
+
+    With a `SessionCache`, the last record and the per-tool hash are cached
+    together as ``{'last': raw, 'latest': {name: raw}}`` (one pipelined
+    LINDEX + HGETALL on a miss).
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            session_id: UUID,
+            ttl: Optional[int] = None,
+            cache: Optional[SessionCache] = None,
+    ) -> None:
         self.redis = redis
         self.session_key = f'tool_memory:{str(session_id)}'
-        self.ttl = ttl
+        self.latest_key = f'{self.session_key}:latest'
+        self.ttl = ttl or get_settings().SESSION_TTL_SECONDS
+        self.cache = cache
 
     async def set(self, records: list[ToolCallRecord]) -> None:
-        for record in records:
-            await self.redis.rpush(self.session_key, record.model_dump_json())
-        await self.redis.expire(self.session_key, self.ttl)
+        if not records:
+            return
+        encoded = [(record.name, codec.encode(record.model_dump())) for record in records]
+        pipe = self.redis.pipeline(transaction=True)
+        for name, raw in encoded:
+            pipe.rpush(self.session_key, raw)
+            pipe.hset(self.latest_key, name, raw)
+        pipe.expire(self.session_key, self.ttl)
+        pipe.expire(self.latest_key, self.ttl)
+        if self.cache:
+            self.cache.publish_invalidation(pipe, self.session_key)
+        await pipe.execute()
+
+        if self.cache:
+            def apply(state: Dict[str, Any]) -> None:
+                for name, raw in encoded:
+                    state['last'] = raw
+                    state['latest'][name] = raw
+
+            added = sum(len(raw) for _, raw in encoded)
+            self.cache.update(self.session_key, apply, added, self.ttl)
 
     async def get_last(self, tool_name: Optional[str] = None) -> Optional[ToolCallRecord]:
-        raw = await self.redis.lrange(self.session_key, 0, -1)
-        records = [ToolCallRecord.model_validate(json.loads(item)) for item in raw]
+        if self.cache:
+            state = await self._cached_state()
+            raw = state['latest'].get(tool_name) if tool_name else state['last']
+        elif tool_name:
+            raw = await self.redis.hget(self.latest_key, tool_name)
+        else:
+            raw = await self.redis.lindex(self.session_key, -1)
+        return self._decode(raw) if raw else None
 
-        if tool_name:
-            for record in reversed(records):
-                if record.name == tool_name:
-                    return record
-            return None  # No match found
-        return records[-1] if records else None
+    async def get_page(self, start: int = 0, count: int = 50) -> List[ToolCallRecord]:
+        """
+        Return up to `count` records beginning at list index `start`.
+        Negative `start` counts from the end, e.g. ``get_page(-20, 20)``
+        returns the 20 most recent records in chronological order.
+        """
+        if count <= 0:
+            return []
+        end = start + count - 1
+        if start < 0 <= end:
+            end = -1
+        raw = await self.redis.lrange(self.session_key, start, end)
+        return [self._decode(item) for item in raw]
 
     async def get_all(self) -> List[ToolCallRecord]:
         raw = await self.redis.lrange(self.session_key, 0, -1)
-        return [ToolCallRecord.model_validate(r.decode('utf-8')) for r in raw]
+        return [self._decode(item) for item in raw]
 
     async def clear(self) -> None:
-        await self.redis.delete(self.session_key)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self.session_key, self.latest_key)
+        if self.cache:
+            self.cache.publish_invalidation(pipe, self.session_key)
+            self.cache.invalidate(self.session_key)
+        await pipe.execute()
 
     async def length(self) -> int:
-        return await self.redis.llen(self.session_key)
\ No newline at end of file
+        return await self.redis.llen(self.session_key)
+
+    async def _cached_state(self) -> Dict[str, Any]:
+        if (state := self.cache.get(self.session_key)) is not None:
+            return state
+        epoch = self.cache.epoch()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lindex(self.session_key, -1)
+        pipe.hgetall(self.latest_key)
+        pipe.pttl(self.session_key)  # the cached copy must expire with the keys
+        pipe.pttl(self.latest_key)
+        last, latest, list_pttl, hash_pttl = await pipe.execute()
+        state = {
+            'last': last,
+            'latest': {
+                (k.decode('utf-8') if isinstance(k, bytes) else k): v
+                for k, v in latest.items()
+            },
+        }
+        size = len(last or b'') + sum(len(v) for v in latest.values())
+        ttl = min(remaining_ttl(list_pttl, self.ttl), remaining_ttl(hash_pttl, self.ttl))
+        self.cache.put(self.session_key, state, size, ttl, epoch)
+        return state
+
+    @staticmethod
+    def _decode(raw: str | bytes) -> ToolCallRecord:
+        return ToolCallRecord.model_validate(codec.decode(raw))
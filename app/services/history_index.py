@@ -0,0 +1,217 @@
+"""
+Relevance-based context selection for long sessions.
+
+Each session gets an in-process BM25 index over its chat messages and tool
+summaries.  The index is kept per worker in a bounded LRU and extended
+incrementally: every turn only the messages / tool records appended since
+the last sync are tokenised (from any worker – the Redis lists are the
+source of truth).  The index remembers the session's generation (see
+`MessageHistory.generation`); when the session was reset or expired since,
+on any worker, the index is rebuilt.
+
+When the whole history no longer fits the token budget, the context is the
+last few turns plus the older turns and tool summaries that score highest
+against the current prompt, instead of simply the most recent messages.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.models.tool_memory import ToolCallRecord
+from app.settings import get_settings
+
+_TOKEN_RE = re.compile(r'[a-z0-9£$%.]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be but by can do for from have how i if in is it me my '
+    'of on or so that the this to was we what when which will with you your'.split()
+)
+
+def index_terms(text: str) -> List[str]:
+    return [t.strip('.') for t in _TOKEN_RE.findall(text.lower()) if t.strip('.') not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an append-only document set.  Session indexes use
+    ``('m', message index)`` / ``('t', tool record index)`` as document ids.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[Hashable, Counter] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._df: Counter = Counter()
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: Hashable, text: str) -> None:
+        terms = Counter(index_terms(text))
+        self._docs[doc_id] = terms
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+        self._df.update(terms.keys())
+
+    def search(
+            self,
+            query: str,
+            k: int,
+            include: Callable[[Hashable], bool] = lambda _doc_id: True,
+    ) -> List[Tuple[Hashable, float]]:
+        terms = set(index_terms(query))
+        if not terms or not self._docs:
+            return []
+        n = len(self._docs)
+        avg_length = self._total_length / n or 1.0
+        idf = {t: math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in terms if self._df[t]}
+
+        scores = []
+        for doc_id, tf in self._docs.items():
+            if not include(doc_id):
+                continue
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+            score = sum(w * tf[t] * (self.k1 + 1) / (tf[t] + norm) for t, w in idf.items() if tf[t])
+            if score > 0:
+                scores.append((doc_id, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k]
+
+
+@dataclass
+class SessionIndex:
+    bm25: BM25Index = field(default_factory=BM25Index)
+    messages_indexed: int = 0
+    tools_indexed: int = 0
+    tool_summaries: Dict[int, str] = field(default_factory=dict)
+    generation: Optional[str] = None  # session generation the documents belong to
+
+    def sync_messages(self, messages: List[Dict[str, Any]]) -> None:
+        if len(messages) < self.messages_indexed:
+            self.reset()
+        for i in range(self.messages_indexed, len(messages)):
+            if isinstance(content := messages[i].get('content'), str):
+                self.bm25.add(('m', i), content)
+        self.messages_indexed = len(messages)
+
+    def add_tool_records(self, start: int, records: List[ToolCallRecord]) -> None:
+        for offset, record in enumerate(records):
+            summary = record.summary or record.content
+            self.tool_summaries[start + offset] = summary
+            self.bm25.add(('t', start + offset), f'{record.name.replace("_", " ")} {summary}')
+        self.tools_indexed = start + len(records)
+
+    def reset(self, generation: Optional[str] = None) -> None:
+        self.bm25 = BM25Index()
+        self.messages_indexed = self.tools_indexed = 0
+        self.tool_summaries.clear()
+        self.generation = generation
+
+
+class HistoryIndexCache:
+    """Bounded LRU of per-session indexes (per worker)."""
+
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions = max_sessions
+        self._indexes: OrderedDict[str, SessionIndex] = OrderedDict()
+
+    def get(self, session_key: str) -> SessionIndex:
+        index = self._indexes.pop(session_key, None) or SessionIndex()
+        self._indexes[session_key] = index
+        while len(self._indexes) > self.max_sessions:
+            self._indexes.popitem(last=False)
+        return index
+
+    def drop(self, session_key: str) -> None:
+        self._indexes.pop(session_key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'sessions': len(self._indexes),
+            'documents': sum(len(i.bm25) for i in self._indexes.values()),
+        }
+
+
+def select_context(
+        index: SessionIndex,
+        messages: List[Dict[str, Any]],
+        query: str,
+        budget: int,
+        recent_turns: int,
+        top_k: int,
+        count: Callable[[Dict[str, Any]], int],
+) -> List[Dict[str, Any]]:
+    """
+    Pick history for the prompt within `budget` tokens: the last
+    `recent_turns` user turns (newest first, as many as fit), then the
+    `top_k` most relevant older turns / tool summaries for `query`.
+    Returned in chronological order; tool summaries become one system note
+    placed before the recent turns.
+    """
+    turns = _split_turns(messages)
+    recent = turns[max(len(turns) - recent_turns, 0):]
+
+    used = 0
+    kept_recent: List[List[int]] = []
+    for turn in reversed(recent):
+        cost = sum(count(messages[i]) for i in turn)
+        if used + cost > budget:
+            break
+        kept_recent.insert(0, turn)
+        used += cost
+
+    first_recent = kept_recent[0][0] if kept_recent else len(messages)
+    turn_of = {i: turn for turn in turns for i in turn if turn[0] < first_recent}
+    hits = index.bm25.search(
+        query,
+        top_k,
+        include=lambda doc_id: doc_id[0] == 't' or doc_id[1] < first_recent,
+    )
+
+    picked_messages: set[int] = set()
+    notes: List[str] = []
+    for (kind, position), _score in hits:
+        if kind == 't':
+            note = f'- {index.tool_summaries[position]}'
+            cost = count({'role': 'system', 'content': note})
+            if used + cost <= budget:
+                notes.append(note)
+                used += cost
+            continue
+        turn = turn_of.get(position)
+        if turn is None or picked_messages.issuperset(turn):
+            continue
+        cost = sum(count(messages[i]) for i in turn if i not in picked_messages)
+        if used + cost <= budget:
+            picked_messages.update(turn)
+            used += cost
+
+    selected = [messages[i] for i in sorted(picked_messages)]
+    if notes:
+        selected.append({'role': 'system', 'content': 'Relevant earlier results:\n' + '\n'.join(notes)})
+    return selected + [messages[i] for turn in kept_recent for i in turn]
+
+
+def _split_turns(messages: List[Dict[str, Any]]) -> List[List[int]]:
+    """Group message indexes into turns, each starting at a user message."""
+    turns: List[List[int]] = []
+    for i, message in enumerate(messages):
+        if message.get('role') == 'user' or not turns:
+            turns.append([i])
+        else:
+            turns[-1].append(i)
+    return turns
+
+
+@lru_cache
+def get_history_index_cache() -> Optional[HistoryIndexCache]:
+    settings = get_settings()
+    if not settings.HISTORY_RETRIEVAL_ENABLED:
+        return None
+    return HistoryIndexCache(settings.HISTORY_INDEX_MAX_SESSIONS)
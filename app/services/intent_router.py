@@ -0,0 +1,335 @@
+"""
+Local intent router: maps common phrasings straight to a tool call so the
+first (tool-choosing) LLM completion can be skipped.
+
+Two signals are combined:
+  • a single compiled regex with one named group per pattern; each pattern
+    carries a confidence: imperative / possessive phrasings about the user's
+    own portfolio are routed, bare keywords only make a tool a speculation
+    candidate
+  • questions about a concept ("what is an OCF?", "explain …") always go to
+    the LLM
+  • an optional multinomial naive-Bayes classifier over word uni/bi-grams,
+    trained offline from logged turns (see `log_turn` and the CLI below)
+
+Anything below INTENT_ROUTER_THRESHOLD falls back to the LLM.
+
+Training::
+
+    python -m app.services.intent_router train turns.jsonl [-o app/data/intent_model.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.data.load import BASE_DIR
+from app.schema.goals import GOAL_ALLOCATION_MAP
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+NO_TOOL = '__llm__'  # classifier label for turns the LLM answered without a tool
+STRONG = 0.95  # imperative / possessive request about the user's own portfolio
+MEDIUM = 0.85  # clearly about the portfolio, but phrased less directly
+WEAK = 0.6  # bare keyword: a speculation candidate, never routed on its own
+AMBIGUOUS_CONFIDENCE = 0.5
+
+_HOLDINGS = r'(?:portfolio|investments?|funds?|holdings|bonds?|equities|stocks?|shares|pension|isa|sipp)'
+_PERIOD = r'(?:this|last|over\s+the|in\s+the)\s+(?:past\s+|last\s+)?(?:year|month|quarter|ytd|\d+\s+(?:years?|months?))'
+
+# tool name → (phrasing, confidence); the confidence reflects how directly the
+# phrasing asks for the tool on the user's own portfolio
+INTENT_PATTERNS: Dict[str, List[Tuple[str, float]]] = {
+    'find_fee_optimizations': [
+        (r'\b(?:my|our)\s+(?:fund\s+|platform\s+|investment\s+|portfolio\s+|ongoing\s+)?'
+         r'(?:fees?|charges?|costs?|ocfs?|expense\s+ratios?)\b', STRONG),
+        (r'\b(?:show|list|lower|reduce|cut|minimi[sz]e|check)\s+(?:me\s+)?(?:my\s+|our\s+)?'
+         r'(?:fund\s+|investment\s+|portfolio\s+)?(?:fees?|ongoing\s+charges?)\b', STRONG),
+        (r'\bfees?\s+(?:am\s+i|do\s+i|i\s+am|i\'m|are\s+we)\s+paying\b', STRONG),
+        (r'\b(?:am\s+i|are\s+we)\s+(?:over)?paying\s+(?:too\s+much\s+)?(?:in\s+)?(?:fees?|charges?)\b', STRONG),
+        (r'\b(?:cheaper|lower[- ]cost)\s+(?:funds?|alternatives?|share\s+class(?:es)?)\b', MEDIUM),
+        (r'\b(?:fees?|charges?|ongoing\s+charges?|ocf|expense\s+ratios?)\b', WEAK),
+    ],
+    'analyze_performance': [
+        (rf'\bhow\s+(?:did|have|has|is|are)\s+(?:my|our|the)\s+(?:\w+\s+)?{_HOLDINGS}\s+'
+         r'(?:do|doing|done|perform\w*|go|going|gone)\b', STRONG),
+        (r'\bhow\s+(?:did|have|am|are)\s+(?:i|we)\s+(?:do|done|doing|perform\w*)\s+'
+         rf'(?:{_PERIOD}|(?:on|with)\s+(?:my|our)\s+{_HOLDINGS})\b', STRONG),
+        (r'\b(?:my|our)\s+(?:portfolio\s+|fund\s+|investment\s+)?(?:performance|returns?)\b', STRONG),
+        (r'\b(?:show|analy[sz]e|check)\s+(?:me\s+)?(?:my\s+|our\s+|the\s+)?(?:portfolio\s+)?'
+         r'(?:performance|returns?)\b', STRONG),
+        (rf'\b(?:portfolio|fund)\s+(?:performance|returns?)\b', MEDIUM),
+        (r'\b(?:performance|returns?|ytd|year[- ]to[- ]date)\b', WEAK),
+    ],
+    'rebalance_portfolio': [
+        (rf'\brebalanc\w*\s+(?:my|our|the)\s+(?:\w+\s+)?{_HOLDINGS}\b', STRONG),
+        (r'\brebalanc\w*\s+(?:(?:my|our)\s+portfolio\s+)?(?:to|into|towards?)\s+\d', STRONG),
+        (r'\b(?:set|change|move)\s+(?:my|our|the)\s+(?:target\s+)?allocation\b', MEDIUM),
+        (r'\brebalanc\w*\b|\b(?:target|new)\s+allocation\b', WEAK),
+    ],
+}
+
+# "what is an OCF?" / "explain expense ratios": a question about a concept,
+# not a request to run a tool (unless it asks about the user's own numbers)
+_DEFINITION_RE = re.compile(
+    r"^\s*(?:(?:so|and|ok|okay|hi|hey)[\s,]+)?"
+    r"(?:what\s*(?:is|are|'s|'re|does|do)|explain|define|describe|tell\s+me\s+about|meaning\s+of)\b"
+    r"(?!\s+(?:my|our|me\s+my)\b)",
+    re.IGNORECASE,
+)
+
+_ASSET_ALIASES = {
+    'equities': r'equit(?:y|ies)|stocks?|shares',
+    'bonds': r'bonds?|fixed[- ]income',
+    'cash': r'cash',
+}
+_ASSET_RE = '|'.join(f'(?P<{k}>{v})' for k, v in _ASSET_ALIASES.items())
+_PCT_FIRST = re.compile(rf'(\d{{1,3}}(?:\.\d+)?)\s*%?\s*(?:in|into|to|of|for)?\s*(?:{_ASSET_RE})\b')
+_ASSET_FIRST = re.compile(rf'\b(?:{_ASSET_RE})\s*(?:at|to|:|=)?\s*(\d{{1,3}}(?:\.\d+)?)\s*%')
+
+# goals only count when phrased as goals ("saving for a house", "retire in 10
+# years"); a bare word like "home" or "pension" may just name what to rebalance
+_HOME = r'(?:first\s+)?(?:house|home|flat|apartment)'
+_GOAL_PATTERNS = {
+    'saving_for_house': re.compile(
+        rf'\b(?:sav(?:e|ing)(?:\s+up)?\s+for|buy(?:ing)?|purchas(?:e|ing))\s+(?:a|an|my|our|the)\s+{_HOME}\b'
+        rf'|\b(?:house|home|flat|mortgage)\s+deposit\b|\bdeposit\s+(?:for|on)\s+(?:a|my|our)\s+{_HOME}\b'
+    ),
+    'retirement': re.compile(
+        r'\bretir(?:e|ing)\s+(?:in\s+(?:\d+|a\s+few|(?:the\s+)?next\s+\d+)\s+years?|at\s+\d+|early|soon)\b'
+        r'|\b(?:sav(?:e|ing)(?:\s+up)?\s+for|planning\s+for|towards?|for)\s+(?:my\s+|our\s+)?retirement\b'
+    ),
+    'short_term_savings': re.compile(
+        r'\b(?:sav(?:e|ing)(?:\s+up)?\s+for|pay(?:ing)?\s+for)\s+(?:a|an|my|our|the)\s+'
+        r'(?:vacation|holiday|trip|wedding|car)\b'
+        r'|\bshort[- ]term\s+(?:goal|savings?)\b'
+    ),
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9%']+")
+
+
+class IntentMatch(BaseModel):
+    tool_name: str
+    arguments: Dict[str, Any]
+    confidence: float
+    source: str  # "pattern" | "classifier" | "pattern+classifier"
+
+
+# ───────────────────────── argument extraction ─────────────────────────
+def extract_target_allocations(text: str) -> Optional[Dict[str, float]]:
+    """
+    “60% equities, 30% bonds and 10% cash” / “equities 60%, …” or a goal
+    (“saving for a house”) → allocation dict; None when nothing usable is
+    found, or when the user gave percentages that don't add up to 100 – a
+    preset must never override numbers they asked for.
+    """
+    lower = text.lower()
+    found: Dict[str, float] = {}
+    for regex, pct_group in ((_PCT_FIRST, 1), (_ASSET_FIRST, None)):
+        for m in regex.finditer(lower):
+            asset = next(k for k in _ASSET_ALIASES if m.group(k))
+            pct = m.group(pct_group) if pct_group else m.groups()[-1]
+            found.setdefault(asset, float(pct))
+    if found:
+        return found if abs(sum(found.values()) - 100) <= 1 else None
+
+    for goal, pattern in _GOAL_PATTERNS.items():
+        if pattern.search(lower):
+            return dict(GOAL_ALLOCATION_MAP[goal])
+    return None
+
+
+# ───────────────────────── classifier ──────────────────────────────────
+def tokenize(text: str) -> List[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """
+    Multinomial naive Bayes with Laplace smoothing; serialisable to JSON.
+    """
+
+    def __init__(self, priors: Dict[str, float], counts: Dict[str, Dict[str, int]]) -> None:
+        self.priors = priors
+        self.counts = counts
+        self.totals = {label: sum(c.values()) for label, c in counts.items()}
+        self.vocab_size = len({tok for c in counts.values() for tok in c}) or 1
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]]) -> 'NaiveBayesIntentModel':
+        label_docs: Counter = Counter()
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for text, label in samples:
+            label_docs[label] += 1
+            counts[label].update(tokenize(text))
+        n = sum(label_docs.values())
+        priors = {label: math.log(k / n) for label, k in label_docs.items()}
+        return cls(priors, {label: dict(c) for label, c in counts.items()})
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely label and its posterior probability."""
+        tokens = tokenize(text)
+        scores = {}
+        for label, prior in self.priors.items():
+            counts, denom = self.counts[label], self.totals[label] + self.vocab_size
+            scores[label] = prior + sum(math.log((counts.get(t, 0) + 1) / denom) for t in tokens)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1 / norm
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'priors': self.priors, 'counts': self.counts}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'NaiveBayesIntentModel':
+        return cls(data['priors'], data['counts'])
+
+
+# ───────────────────────── router ──────────────────────────────────────
+class IntentRouter:
+    def __init__(
+            self,
+            threshold: float,
+            model: Optional[NaiveBayesIntentModel] = None,
+            patterns: Dict[str, List[Tuple[str, float]]] = INTENT_PATTERNS,
+    ) -> None:
+        self.threshold = threshold
+        self.model = model
+        self._confidence: Dict[str, Tuple[str, float]] = {}  # group name → (tool, confidence)
+        alternatives = []
+        for tool, tool_patterns in patterns.items():
+            for i, (pattern, confidence) in enumerate(tool_patterns):
+                alternatives.append(f'(?P<{tool}__{i}>{pattern})')
+                self._confidence[f'{tool}__{i}'] = (tool, confidence)
+        self._matcher = re.compile('|'.join(alternatives), re.IGNORECASE)
+
+    def route(self, text: str) -> Optional[IntentMatch]:
+        if is_definition_question(text):
+            return None  # the LLM explains; the tool would answer a different question
+
+        tool, confidence, source = self._pattern_vote(text)
+
+        if self.model:
+            label, prob = self.model.predict(text)
+            if tool is None:
+                tool, confidence, source = label, prob, 'classifier'
+            elif label == tool:
+                confidence, source = max(confidence, prob), 'pattern+classifier'
+            elif prob >= self.threshold:
+                # confident disagreement → let the LLM decide
+                confidence = min(confidence, 1 - prob)
+
+        if tool is None or tool == NO_TOOL or confidence < self.threshold:
+            return None
+
+        arguments: Dict[str, Any] = {}
+        if tool == 'rebalance_portfolio':
+            if not (target := extract_target_allocations(text)):
+                return None  # the LLM will ask for the goal
+            arguments['target_allocations'] = target
+
+        return IntentMatch(tool_name=tool, arguments=arguments, confidence=confidence, source=source)
+
+    def candidates(self, text: str, min_confidence: float) -> List[str]:
+        """
+        Every tool the prompt plausibly asks for – a looser signal than
+        `route()`, used to pick tools worth running speculatively.
+        """
+        if is_definition_question(text):
+            return []
+        tools = {tool for tool, confidence in self._pattern_scores(text).items() if confidence >= min_confidence}
+        if self.model:
+            label, prob = self.model.predict(text)
+            if label != NO_TOOL and prob >= min_confidence:
+                tools.add(label)
+        return sorted(tools)
+
+    def _pattern_scores(self, text: str) -> Dict[str, float]:
+        """Tool → confidence of its best-matching pattern."""
+        scores: Dict[str, float] = {}
+        for m in self._matcher.finditer(text):
+            for name, value in m.groupdict().items():
+                if value is not None:
+                    tool, confidence = self._confidence[name]
+                    scores[tool] = max(scores.get(tool, 0.0), confidence)
+        return scores
+
+    def _pattern_vote(self, text: str) -> Tuple[Optional[str], float, str]:
+        scores = self._pattern_scores(text)
+        if not scores:
+            return None, 0.0, 'pattern'
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        tool, confidence = ranked[0]
+        if len(ranked) > 1 and ranked[1][1] >= MEDIUM:
+            return tool, AMBIGUOUS_CONFIDENCE, 'pattern'  # two tools asked for directly
+        return tool, confidence, 'pattern'
+
+
+def is_definition_question(text: str) -> bool:
+    return bool(_DEFINITION_RE.match(text))
+
+
+def _model_path() -> Path:
+    return BASE_DIR / get_settings().INTENT_MODEL_PATH
+
+
+@lru_cache
+def get_intent_router() -> Optional[IntentRouter]:
+    settings = get_settings()
+    if not settings.INTENT_ROUTER_ENABLED:
+        return None
+    model = None
+    path = _model_path()
+    if path.exists():
+        model = NaiveBayesIntentModel.from_json(json.loads(path.read_text()))
+        logger.info('Loaded intent model from %s', path)
+    return IntentRouter(threshold=settings.INTENT_ROUTER_THRESHOLD, model=model)
+
+
+def log_turn(prompt: str, tool_name: Optional[str]) -> None:
+    """
+    Append a (prompt, chosen tool) training sample when INTENT_LOG_PATH is set.
+    """
+    if not (path := get_settings().INTENT_LOG_PATH):
+        return
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'prompt': prompt, 'tool': tool_name or NO_TOOL}) + '\n')
+    except OSError as exc:
+        logger.warning('Could not log turn for intent training: %s', exc)
+
+
+def _train_cli(args: argparse.Namespace) -> None:
+    samples = []
+    with open(args.turns, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                samples.append((row['prompt'], row.get('tool') or NO_TOOL))
+    model = NaiveBayesIntentModel.train(samples)
+    out = Path(args.output) if args.output else _model_path()
+    out.write_text(json.dumps(model.to_json()))
+    print(f'Trained on {len(samples)} turns ({len(model.priors)} labels) → {out}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Intent router utilities')
+    sub = parser.add_subparsers(dest='command', required=True)
+    train = sub.add_parser('train', help='train the classifier from logged turns (JSONL)')
+    train.add_argument('turns')
+    train.add_argument('-o', '--output')
+    train.set_defaults(func=_train_cli)
+    cli_args = parser.parse_args()
+    cli_args.func(cli_args)
@@ -0,0 +1,269 @@
+"""
+Job worker: consumes job items from the Redis Stream (see `app.services.jobs`)
+and runs them through the same `LLMPortfolioAgent` / `ToolDispatcher` code
+as ``/chat``.
+
+  • at most JOB_WORKER_CONCURRENCY items in flight per process; the stream
+    is only read when a slot is free, so unclaimed work stays available to
+    other workers
+  • an item is acknowledged only after its result is stored
+  • entries left unacknowledged for JOB_VISIBILITY_TIMEOUT_SECONDS (worker
+    crashed or hung) are reclaimed with XAUTOCLAIM and run again, up to
+    JOB_MAX_ATTEMPTS deliveries; transient failures (OpenAI unavailable, …)
+    are retried the same way, invalid items fail at once
+  • SIGTERM / SIGINT stop reading and let in-flight items finish
+
+Run one process per core, on as many nodes as needed::
+
+    python -m app.services.job_worker --processes 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import NAMESPACE_URL, uuid5
+
+from app.clients.completion_cache import DEFAULT_SOURCE
+from app.clients.redis import get_session_redis
+from app.data.latest_prices import compute_latest_prices, get_latest_prices
+from app.data.load import (
+    load_portfolio_dir,
+    load_portfolio_snapshot,
+    portfolio_snapshot_version,
+    snapshot_version_of,
+)
+from app.enums import ModelName
+from app.server.schemes.chat import Prompt
+from app.server.schemes.jobs import PORTFOLIO_NAME_PATTERN
+from app.services.agent_manager import build_agent
+from app.services.jobs import Entry, JobItemError, JobQueue, get_job_queue
+from app.settings import get_settings
+from app.tools.registry import get as get_tool
+from app.tools.tool_errors import ToolErrorResult
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_NAME_RE = re.compile(PORTFOLIO_NAME_PATTERN)
+READ_BLOCK_MS = 1_000
+DRAIN_TIMEOUT_SECONDS = 60.0
+MAX_CACHED_PORTFOLIOS = 8
+
+Portfolio = Tuple[dict, dict, str]  # (data, latest prices, snapshot version)
+
+
+class PortfolioStore:
+    """
+    Portfolios jobs can name: subdirectories of JOB_PORTFOLIOS_DIR, each
+    laid out like ``app/data``; no name means the service's own portfolio.
+    The last few are kept parsed (per process), keyed by snapshot version.
+    """
+
+    def __init__(self, root: Optional[Path], max_entries: int = MAX_CACHED_PORTFOLIOS) -> None:
+        self.root = root
+        self.max_entries = max_entries
+        self._loaded: OrderedDict[Tuple[str, str], Portfolio] = OrderedDict()
+
+    async def get(self, name: Optional[str]) -> Portfolio:
+        if name is None:
+            version = portfolio_snapshot_version()
+            return load_portfolio_snapshot(version), get_latest_prices(), version
+
+        data_dir = self._resolve(name)
+        try:
+            version = snapshot_version_of(data_dir)
+        except OSError as exc:
+            raise JobItemError(f'portfolio {name!r} is incomplete: {exc}') from exc
+        key = (name, version)
+        if (portfolio := self._loaded.pop(key, None)) is None:
+            # large portfolios take a while to parse; keep the other items moving
+            data = await asyncio.to_thread(load_portfolio_dir, data_dir)
+            prices = await asyncio.to_thread(compute_latest_prices, data['transactions'])
+            portfolio = (data, prices, version)
+        self._loaded[key] = portfolio
+        while len(self._loaded) > self.max_entries:
+            self._loaded.popitem(last=False)
+        return portfolio
+
+    def _resolve(self, name: str) -> Path:
+        if self.root is None:
+            raise JobItemError('named portfolios need JOB_PORTFOLIOS_DIR')
+        if not PORTFOLIO_NAME_RE.fullmatch(name) or not (self.root / name).is_dir():
+            raise JobItemError(f'unknown portfolio {name!r}')
+        return self.root / name
+
+
+class JobWorker:
+    def __init__(
+            self,
+            queue: JobQueue,
+            portfolios: PortfolioStore,
+            consumer: str,
+            concurrency: int,
+            visibility_timeout: float,
+            max_attempts: int,
+    ) -> None:
+        self.queue = queue
+        self.portfolios = portfolios
+        self.consumer = consumer
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.redis = get_session_redis()  # session storage of the agents
+        self._in_flight: Set[asyncio.Task] = set()
+        self._claim_cursor = '0-0'
+        self._next_claim = 0.0
+        self.processed = 0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        await self.queue.ensure_group()
+        logger.info('Job worker %s started (concurrency %d)', self.consumer, self.concurrency)
+        while not stop.is_set():
+            free = self.concurrency - len(self._in_flight)
+            if free <= 0:
+                await asyncio.wait(self._in_flight, timeout=READ_BLOCK_MS / 1000, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                entries = await self._claim(free) or await self.queue.read(self.consumer, free, READ_BLOCK_MS)
+            except Exception:  # Redis hiccup: back off, keep the in-flight items running
+                logger.exception('Reading the job stream failed')
+                await asyncio.sleep(1.0)
+                continue
+            for entry in entries:
+                task = asyncio.create_task(self._handle(entry))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        await self._drain()
+
+    async def _claim(self, count: int) -> list[Entry]:
+        """Reclaim stuck entries, scanning the pending list at most once per visibility timeout."""
+        now = time.monotonic()
+        if now < self._next_claim:
+            return []
+        self._claim_cursor, entries = await self.queue.claim_stuck(
+            self.consumer, int(self.visibility_timeout * 1000), count, self._claim_cursor,
+        )
+        if self._claim_cursor == '0-0':  # full pass done; look again later
+            self._next_claim = now + self.visibility_timeout / 2
+        if entries:
+            logger.warning('Reclaimed %d stuck job item(s)', len(entries))
+        return entries
+
+    async def _drain(self) -> None:
+        if self._in_flight:
+            logger.info('Waiting for %d job item(s) to finish', len(self._in_flight))
+            await asyncio.wait(self._in_flight, timeout=DRAIN_TIMEOUT_SECONDS)
+        if not self._in_flight:
+            # keep the group's consumer list short across restarts (pids change)
+            await self.queue.remove_consumer(self.consumer)
+
+    async def _handle(self, entry: Entry) -> None:
+        entry_id, fields = entry
+        job_id, index = fields['job'], int(fields['index'])
+        started = time.perf_counter()
+        try:
+            attempt = await self.queue.start_attempt(job_id, index)
+            if attempt > self.max_attempts:
+                result = _failed(index, f'gave up after {self.max_attempts} attempts')
+            else:
+                try:
+                    result = {'index': index, 'status': 'ok', **await self._execute(job_id, index, attempt, fields)}
+                except JobItemError as exc:
+                    result = _failed(index, str(exc))
+                except Exception as exc:
+                    if attempt < self.max_attempts:
+                        # left unacknowledged: reclaimed and retried after the visibility timeout
+                        logger.warning('Job %s item %d failed (attempt %d): %s', job_id, index, attempt, exc)
+                        return
+                    logger.exception('Job %s item %d failed for good', job_id, index)
+                    result = _failed(index, f'{type(exc).__name__}: {exc}')
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            await self.queue.record(job_id, index, result)
+            await self.queue.ack(entry_id)
+            self.processed += 1
+        except Exception:  # Redis failed around the item: it stays pending and is reclaimed
+            logger.exception('Could not record job %s item %d', job_id, index)
+
+    async def _execute(self, job_id: str, index: int, attempt: int, fields: Dict[str, str]) -> Dict[str, Any]:
+        item = json.loads(fields['item'])
+        name = item.get('portfolio')
+        data, prices, version = await self.portfolios.get(name)
+        # a fresh session per attempt: a retry doesn't see the failed attempt's half-written turn
+        session_id = str(uuid5(NAMESPACE_URL, f'job:{job_id}:{index}:{attempt}'))
+        # per-portfolio source: switching between portfolios doesn't invalidate each other's completions
+        source = f'portfolio:{name}' if name else DEFAULT_SOURCE
+        agent = build_agent(self.redis, session_id, ModelName(fields['model']), data, prices, version, source)
+
+        if (prompt := item.get('prompt')) is not None:
+            return {'response': (await agent.process_prompt(Prompt(text=prompt))).response}
+
+        call = item['tool']
+        try:
+            tool = get_tool(call['name'])
+        except KeyError as exc:
+            raise JobItemError(str(exc)) from exc
+        result = await agent.tool_dispatcher.run_tool(call['name'], call.get('arguments') or {})
+        if isinstance(result, ToolErrorResult):
+            raise JobItemError(f'{result.summary}: {result.payload}')
+        payload = result.model_dump()
+        return {'result': payload, 'response': tool.render(payload)}
+
+
+def _failed(index: int, error: str) -> Dict[str, Any]:
+    return {'index': index, 'status': 'failed', 'error': error}
+
+
+async def serve(concurrency: Optional[int] = None) -> None:
+    settings = get_settings()
+    worker = JobWorker(
+        get_job_queue(),
+        PortfolioStore(Path(settings.JOB_PORTFOLIOS_DIR) if settings.JOB_PORTFOLIOS_DIR else None),
+        consumer=f'{socket.gethostname()}-{os.getpid()}',
+        concurrency=concurrency or settings.JOB_WORKER_CONCURRENCY,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await worker.run(stop)
+    logger.info('Job worker %s stopped after %d item(s)', worker.consumer, worker.processed)
+
+
+def _run_process(concurrency: Optional[int]) -> None:
+    logging.basicConfig(
+        level=get_settings().LOGGING_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+    asyncio.run(serve(concurrency))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run job workers (Redis Stream consumers)')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes on this node')
+    parser.add_argument('--concurrency', type=int, help='items in flight per process (JOB_WORKER_CONCURRENCY)')
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        _run_process(args.concurrency)
+    else:
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=_run_process, args=(args.concurrency,)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        # children get Ctrl-C from the terminal themselves; SIGTERM is passed on
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in processes])
+        for process in processes:
+            process.join()
@@ -0,0 +1,201 @@
+"""
+Background jobs on a Redis Stream.
+
+A job is a batch of items; each item is a prompt or a tool call against a
+portfolio.  `JobQueue.submit` records the job and adds one stream entry
+per item.  Worker processes (`app.services.job_worker`, any number, on any
+node) read the entries through one consumer group, acknowledge them once
+the result is stored, and reclaim entries another worker left unacknowledged
+for longer than JOB_VISIBILITY_TIMEOUT_SECONDS (crashed or stuck).
+
+Keys (all but the stream expire after JOB_RESULT_TTL_SECONDS):
+
+  jobs                 stream  one entry per item: job, index, model, item (JSON)
+  job:{id}             hash    total, done, failed, model, created, started, finished
+  job:{id}:results     list    one JSON result per finished item, in completion order
+  job:{id}:finished    hash    item index → 1, so a retried item is counted once
+  job:{id}:attempts    hash    item index → deliveries so far
+"""
+from __future__ import annotations
+
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.clients.redis import get_redis
+from app.settings import get_settings
+
+SUBMIT_CHUNK = 1_000  # stream entries per pipeline when submitting
+
+Entry = Tuple[str, Dict[str, str]]  # (stream entry id, fields)
+
+# KEYS: job, finished, results; ARGV: index, result, counter (done | failed), ttl, now.
+# One script, so the dedup flag and the counters can't get out of step.
+RECORD_SCRIPT = """
+if redis.call('hsetnx', KEYS[2], ARGV[1], 1) == 0 then
+    return 0
+end
+redis.call('rpush', KEYS[3], ARGV[2])
+redis.call('hincrby', KEYS[1], ARGV[3], 1)
+for _, key in ipairs(KEYS) do
+    redis.call('expire', key, ARGV[4])
+end
+local counts = redis.call('hmget', KEYS[1], 'total', 'done', 'failed')
+if counts[1] and tonumber(counts[2] or 0) + tonumber(counts[3] or 0) >= tonumber(counts[1]) then
+    redis.call('hset', KEYS[1], 'finished', ARGV[5])
+end
+return 1
+"""
+
+
+class JobItemError(Exception):
+    """The item can never succeed (unknown portfolio or tool, bad arguments): fail it without retrying."""
+
+
+class JobQueue:
+    def __init__(self, redis: Redis, stream: str, group: str, result_ttl: int) -> None:
+        self.redis = redis  # decode_responses=True
+        self.stream = stream
+        self.group = group
+        self.result_ttl = result_ttl
+
+    # ─ API side ────────────────────────────────────────────────────────────
+    async def submit(self, items: List[Dict[str, Any]], model: str) -> str:
+        job_id = uuid4().hex
+        key = self._job_key(job_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            'total': len(items), 'done': 0, 'failed': 0, 'model': model, 'created': time.time(),
+        })
+        pipe.expire(key, self.result_ttl)
+        for index, item in enumerate(items):
+            pipe.xadd(self.stream, {'job': job_id, 'index': index, 'model': model, 'item': json.dumps(item)})
+            if (index + 1) % SUBMIT_CHUNK == 0:
+                await pipe.execute()
+        await pipe.execute()
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.hgetall(self._job_key(job_id))
+        if 'total' not in raw:  # unknown or expired
+            return None
+        total, done, failed = int(raw['total']), int(raw['done']), int(raw['failed'])
+        if done + failed >= total:
+            state = 'completed'
+        elif 'started' in raw:
+            state = 'running'
+        else:
+            state = 'queued'
+        return {
+            'job_id': job_id,
+            'status': state,
+            'total': total,
+            'done': done,
+            'failed': failed,
+            'model': raw['model'],
+            'created': float(raw['created']),
+            'started': float(raw['started']) if 'started' in raw else None,
+            'finished': float(raw['finished']) if 'finished' in raw else None,
+        }
+
+    async def results(self, job_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` results from position `offset` (completion order)."""
+        if limit <= 0:
+            return []
+        raw = await self.redis.lrange(f'{self._job_key(job_id)}:results', offset, offset + limit - 1)
+        return [json.loads(r) for r in raw]
+
+    async def backlog(self) -> Dict[str, int]:
+        """Entries waiting in the stream and entries delivered but not yet acknowledged."""
+        length = await self.redis.xlen(self.stream)
+        try:
+            pending = (await self.redis.xpending(self.stream, self.group))['pending']
+        except ResponseError:  # no group yet: no worker has ever started
+            pending = 0
+        return {'stream_length': length, 'pending': pending}
+
+    # ─ worker side ─────────────────────────────────────────────────────────
+    async def ensure_group(self) -> None:
+        try:
+            # from the start of the stream: items submitted before any worker existed are read too
+            await self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as exc:
+            if 'BUSYGROUP' not in str(exc):
+                raise
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[Entry]:
+        """New entries for `consumer` (at most `count`), waiting up to `block_ms` for some."""
+        response = await self.redis.xreadgroup(
+            self.group, consumer, {self.stream: '>'}, count=count, block=block_ms,
+        )
+        return [entry for _stream, entries in response or () for entry in entries]
+
+    async def claim_stuck(self, consumer: str, min_idle_ms: int, count: int, cursor: str) -> Tuple[str, List[Entry]]:
+        """
+        Take over entries unacknowledged for `min_idle_ms`, scanning the
+        pending list from `cursor`; returns the next cursor (``0-0`` once
+        the scan wrapped around) and the claimed entries.
+        """
+        response = await self.redis.xautoclaim(
+            self.stream, self.group, consumer, min_idle_ms, start_id=cursor, count=count,
+        )
+        next_cursor, entries = response[0], response[1]
+        # entries deleted from the stream meanwhile come back without fields
+        return next_cursor, [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def start_attempt(self, job_id: str, index: int) -> int:
+        """Count a delivery of item `index`; returns the attempt number (1 = first)."""
+        key = self._job_key(job_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(f'{key}:attempts', index, 1)
+        pipe.expire(f'{key}:attempts', self.result_ttl)
+        pipe.hsetnx(key, 'started', time.time())
+        attempt, _, _ = await pipe.execute()
+        return attempt
+
+    async def record(self, job_id: str, index: int, result: Dict[str, Any]) -> bool:
+        """
+        Store the result of item `index` and advance the job's progress.
+        Returns False (and stores nothing) if the item was already recorded,
+        e.g. by a worker that was presumed stuck but finished after all.
+        """
+        key = self._job_key(job_id)
+        counter = 'failed' if result['status'] == 'failed' else 'done'
+        recorded = await self.redis.eval(
+            RECORD_SCRIPT, 3, key, f'{key}:finished', f'{key}:results',
+            index, json.dumps(result), counter, self.result_ttl, time.time(),
+        )
+        return bool(recorded)
+
+    async def ack(self, entry_id: str) -> None:
+        # acknowledged entries are deleted, so the stream only holds outstanding work
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.xdel(self.stream, entry_id)
+        await pipe.execute()
+
+    async def remove_consumer(self, consumer: str) -> bool:
+        """
+        Drop `consumer` from the group if it holds no pending entries
+        (deleting a consumer discards its pending list, i.e. its retries).
+        """
+        summary = await self.redis.xpending(self.stream, self.group)
+        if any(c['name'] == consumer and int(c['pending']) for c in summary['consumers'] or ()):
+            return False
+        await self.redis.xgroup_delconsumer(self.stream, self.group, consumer)
+        return True
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f'job:{job_id}'
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(get_redis(), settings.JOB_STREAM, settings.JOB_GROUP, settings.JOB_RESULT_TTL_SECONDS)
@@ -1,24 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import List, Dict, Any, Optional
 
 from app import enums
+from app.enums import ResponseMode
+from app.clients.completion_cache import DEFAULT_SOURCE
+from app.clients.deadline import time_budget
+from app.clients.llm_errors import LLMError
 from app.clients.openai_client import safe_chat_completion
 from app.models.tool_memory import ToolCallRecord
 from app.schema.goals import map_goal_to_allocation
-from app.schema.tools import get_tool_schema, system_prompt
+from app.schema.tools import get_tool_schema, rephrase_prompt, system_prompt
 from app.server.schemes.chat import ChatResponse, Prompt
 from app.services.history import ToolMemory, MessageHistory
-from app.services.tool_dispatcher import ToolDispatcher  # ← thin registry-based
+from app.services.history_index import HistoryIndexCache, SessionIndex, select_context
+from app.services.intent_router import get_intent_router, log_turn
+from app.services.speculation import Speculation, speculate
+from app.services.tool_cache import ToolResultCache
+from app.services.tool_dispatcher import ToolDispatcher, local_tool_call  # ← thin registry-based
+from app.settings import get_settings
 from app.tools.registry import get as get_tool  # for goal shortcuts
+from app.tools.registry import response_mode as tool_response_mode
 from app.tools.tool_errors import ToolErrorResult
-from app.utils.token_estimate import count_tokens
+from app.utils.token_estimate import count_message_tokens
+from app.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
 MAX_HISTORY_TOKENS = 3_000
+RECAP_MAX_ITEMS = 20  # most recent tool records listed by “recap”
 
 
 class LLMPortfolioAgent:
@@ -27,7 +40,8 @@ class LLMPortfolioAgent:
       • builds conversational context
       • lets the LLM decide whether to call a tool
       • executes the tool (via ToolDispatcher)
-      • feeds the result back to the LLM for the final answer
+      • turns the result into the final answer (template, cheap rephrase
+        or a second LLM completion – per tool, see ResponseMode)
       • stores message + tool memory in Redis
     """
 
@@ -42,10 +56,16 @@ class LLMPortfolioAgent:
             accounts: list,
             transactions: list,
             latest_prices: dict,
+            snapshot_version: Optional[str] = None,
+            tool_cache: Optional[ToolResultCache] = None,
+            history_index: Optional[HistoryIndexCache] = None,
+            snapshot_source: str = DEFAULT_SOURCE,
     ) -> None:
         self.model = model
+        self.snapshot_source = snapshot_source  # which portfolio `snapshot_version` belongs to
         self.history = history
         self.memory = memory
+        self.history_index = history_index
 
         # domain context kept here so dispatcher can forward it to each tool
         self.tool_dispatcher = ToolDispatcher(
@@ -55,11 +75,14 @@ class LLMPortfolioAgent:
             accounts=accounts,
             transactions=transactions,
             latest_prices=latest_prices,
+            snapshot_version=snapshot_version,
+            cache=tool_cache,
         )
 
         self.predefined_handler = PredefinedPromptHandler(
             agent=self, memory=memory, history=history
         )
+        self.intent_router = get_intent_router()
 
     def set_model(self, model: enums.ModelName) -> None:
         self.model = model.value
@@ -68,43 +91,87 @@ class LLMPortfolioAgent:
         """
         Full turn handler:
           1. intercept “recap / why / reset / goal” commands
+          1b. route recognisable requests straight to a tool (intent router)
           2. send context + tool schemas to OpenAI
           3. (optional) run requested tool
           4. stream / return final content
+
+        All LLM calls share one time budget (CHAT_DEADLINE_SECONDS).
         """
+        with time_budget(get_settings().CHAT_DEADLINE_SECONDS):
+            return await self._process_prompt(user_prompt)
+
+    async def _process_prompt(self, user_prompt: Prompt) -> ChatResponse:
         # try hard-coded / goal-based shortcuts
-        shortcut_resp = await self.predefined_handler.handle(user_prompt.text)
+        with span('shortcut'):
+            shortcut_resp = await self.predefined_handler.handle(user_prompt.text)
         if shortcut_resp:
             return shortcut_resp
 
-        # build context & call LLM
+        # recognisable request → run the tool without asking the LLM
+        with span('intent_route'):
+            match = self.intent_router.route(user_prompt.text) if self.intent_router else None
+        if match:
+            logger.debug('Intent router matched %s (%.2f, %s)', match.tool_name, match.confidence, match.source)
+            with span('persist'):
+                await self.history.append({'role': 'user', 'content': user_prompt.text})
+            return await self._run_tool_call(local_tool_call(match.tool_name, match.arguments))
+
+        # build context & call LLM, running likely argument-free tools meanwhile
         messages = await self._build_message_history(user_prompt.text)
-        first = await safe_chat_completion(
-            model=self.model,
-            messages=messages,
-            tools=get_tool_schema(),
-            tool_choice='auto',
-        )
-        model_msg = first.choices[0].message
-        tool_calls = getattr(model_msg, 'tool_calls', None)
+        speculation = self._speculate(user_prompt.text)
+        try:
+            first = await safe_chat_completion(
+                model=self.model,
+                messages=messages,
+                tools=get_tool_schema(),
+                tool_choice='auto',
+                cache_version=self.tool_dispatcher.snapshot_version,
+                cache_source=self.snapshot_source,
+            )
+            model_msg = first.choices[0].message
+            tool_calls = getattr(model_msg, 'tool_calls', None)
+            precomputed = speculation.take(tool_calls[0]) if speculation and tool_calls else None
+        finally:
+            if speculation:
+                speculation.cancel()
+        log_turn(user_prompt.text, tool_calls[0].function.name if tool_calls else None)
 
         # store user prompt immediately
-        await self.history.append({'role': 'user', 'content': user_prompt.text})
+        with span('persist'):
+            await self.history.append({'role': 'user', 'content': user_prompt.text})
 
         # 3 ─ no tool requested → done
         if not tool_calls:
-            await self.history.append({'role': 'assistant', 'content': model_msg.content})
+            with span('persist'):
+                await self.history.append({'role': 'assistant', 'content': model_msg.content})
             return ChatResponse(response=model_msg.content)
 
         # 3b ─ execute the first (only) tool call
-        call = tool_calls[0]
-        tool_result = await self.tool_dispatcher.dispatch(call)  # returns BaseModel
+        return await self._run_tool_call(tool_calls[0], precomputed)
+
+    def _speculate(self, text: str) -> Optional[Speculation]:
+        settings = get_settings()
+        if not (settings.SPECULATIVE_TOOLS_ENABLED and self.intent_router):
+            return None
+        return speculate(text, self.tool_dispatcher, self.intent_router, settings.SPECULATION_MIN_CONFIDENCE)
+
+    async def _run_tool_call(self, call, precomputed: Optional[asyncio.Task] = None) -> ChatResponse:
+        """
+        Execute a tool call (from the model or the intent router) and answer.
+        `precomputed` is a speculative task already running this exact call.
+        """
+        if precomputed is not None:
+            tool_result = await precomputed
+        else:
+            tool_result = await self.tool_dispatcher.dispatch(call)  # returns BaseModel
         result_dict = tool_result.model_dump()
 
         # custom post-processing examples
         if isinstance(tool_result, ToolErrorResult):
             polite = self._as_polite_reply(tool_result)
-            await self.history.append({"role": "assistant", "content": polite})
+            with span('persist'):
+                await self.history.append({"role": "assistant", "content": polite})
             return ChatResponse(response=polite)
         if call.function.name == 'rebalance_portfolio':
             self._attach_allocation_summary(call, result_dict)
@@ -118,16 +185,17 @@ class LLMPortfolioAgent:
     async def _build_message_history(self, user_prompt: str) -> List[Dict[str, Any]]:
         """
         Combine: system prompt + persisted chat + (optional) last tool
-        then trim to MAX_HISTORY_TOKENS.
+        then fit into MAX_HISTORY_TOKENS – by recency, or, for histories that
+        don't fit and with a history index, by relevance to the prompt.
         """
-        base: List[Dict[str, Any]] = [
-            {'role': 'system', 'content': system_prompt},
-            *(await self.history.get()),
-            {'role': 'user', 'content': user_prompt},
-        ]
-
-        if last := await self.memory.get_last():
-            base.extend(
+        system = {'role': 'system', 'content': system_prompt}
+        with span('history_load'):
+            history = await self.history.get()
+            last = await self.memory.get_last()
+        tail: List[Dict[str, Any]] = [{'role': 'user', 'content': user_prompt}]
+
+        if last:
+            tail.extend(
                 [
                     {
                         'role': 'assistant',
@@ -152,14 +220,56 @@ class LLMPortfolioAgent:
                 ]
             )
 
-        return await self._trim_to_token_limit(base)
+        with span('context_trim'):
+            return await self._fit_to_budget(system, history, tail, user_prompt)
+
+    async def _fit_to_budget(
+            self,
+            system: Dict[str, Any],
+            history: List[Dict[str, Any]],
+            tail: List[Dict[str, Any]],
+            user_prompt: str,
+    ) -> List[Dict[str, Any]]:
+        base = [system, *history, *tail]
+        if self.history_index is None:
+            return await self._trim_to_token_limit(base)
+        costs = [count_message_tokens(m, model=self.model) for m in base]
+        if sum(costs) <= MAX_HISTORY_TOKENS:
+            return base
+
+        settings = get_settings()
+        query = user_prompt or next(
+            (m['content'] for m in reversed(history) if m.get('role') == 'user'), ''
+        )
+        selected = select_context(
+            await self._session_index(history),
+            history,
+            query=query,
+            budget=MAX_HISTORY_TOKENS - costs[0] - sum(costs[len(history) + 1:]),
+            recent_turns=settings.HISTORY_RECENT_TURNS,
+            top_k=settings.HISTORY_RETRIEVAL_TOP_K,
+            count=lambda m: count_message_tokens(m, model=self.model),
+        )
+        return [system, *selected, *tail]
+
+    async def _session_index(self, history: List[Dict[str, Any]]) -> SessionIndex:
+        """This session's index, brought up to date with `history` and tool memory."""
+        index = self.history_index.get(self.history.session_key)
+        generation, total_tools = await asyncio.gather(self.history.generation(), self.memory.length())
+        if generation != index.generation:
+            index.reset(generation)  # session was cleared (on any worker) or expired since the last sync
+        index.sync_messages(history)
+        if total_tools > index.tools_indexed:
+            start = index.tools_indexed
+            index.add_tool_records(start, await self.memory.get_page(start, total_tools - start))
+        return index
 
     async def _trim_to_token_limit(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         total = 0
         kept = 0
         out: List[Dict[str, Any]] = []
         for msg in reversed(messages):
-            tokens = count_tokens(json.dumps(msg), model=self.model)
+            tokens = count_message_tokens(msg, model=self.model)
             if total + tokens > MAX_HISTORY_TOKENS:
                 break
             out.insert(0, msg)
@@ -171,8 +281,49 @@ class LLMPortfolioAgent:
 
     async def _respond_with_tool_result(self, call_obj, result: Dict[str, Any]) -> ChatResponse:
         """
-        Append the tool result as the required tool role message and call LLM
-        again to craft user-facing answer, then persist history + memory.
+        Turn the tool result into the user-facing answer according to the
+        tool’s response mode (template / rephrase / full LLM), then persist
+        history + memory.  Any LLM failure degrades to the template.
+        """
+        name = call_obj.function.name
+        tool = get_tool(name)
+        mode = tool_response_mode(name)
+
+        content = tool.encode_for_llm(result, self.model)  # compact form for the LLM + memory
+
+        final_msg: Optional[str] = None
+        if mode is not ResponseMode.TEMPLATE:
+            try:
+                if mode is ResponseMode.REPHRASE:
+                    final_msg = await self._rephrase(tool.render(result))
+                else:
+                    final_msg = await self._complete_with_tool_result(call_obj, content)
+            except LLMError as exc:
+                # degraded but instant: render the tool result ourselves
+                logger.warning('LLM failed, rendering %s result directly: %s', name, exc)
+        if final_msg is None:
+            final_msg = tool.render(result)
+
+        # persist
+        with span('persist'):
+            await self.history.append({'role': 'assistant', 'content': final_msg})
+            await self.memory.set(
+                [
+                    ToolCallRecord(
+                        tool_call_id=call_obj.id,
+                        name=call_obj.function.name,
+                        arguments=call_obj.function.arguments,
+                        content=content,
+                        summary=result.get('summary') or final_msg,
+                    )
+                ]
+            )
+        return ChatResponse(response=final_msg)
+
+    async def _complete_with_tool_result(self, call_obj, content: str) -> str:
+        """
+        Append the (encoded) tool result as the required tool role message and
+        call LLM again to craft user-facing answer.
         """
         follow_up = [
             {
@@ -193,30 +344,37 @@ class LLMPortfolioAgent:
                 'role': 'tool',
                 'tool_call_id': call_obj.id,
                 'name': call_obj.function.name,
-                'content': json.dumps(result),
+                'content': content,
             },
         ]
 
         msgs = await self._build_message_history('') + follow_up
-        msgs = await self._trim_to_token_limit(msgs)
+        with span('context_trim'):
+            msgs = await self._trim_to_token_limit(msgs)
 
-        second = await safe_chat_completion(model=self.model, messages=msgs)
-        final_msg = second.choices[0].message.content
+        second = await safe_chat_completion(
+            model=self.model,
+            messages=msgs,
+            cache_version=self.tool_dispatcher.snapshot_version,
+            cache_source=self.snapshot_source,
+        )
+        return second.choices[0].message.content
 
-        # persist
-        await self.history.append({'role': 'assistant', 'content': final_msg})
-        await self.memory.set(
-            [
-                ToolCallRecord(
-                    tool_call_id=call_obj.id,
-                    name=call_obj.function.name,
-                    arguments=call_obj.function.arguments,
-                    content=json.dumps(result),
-                    summary=result.get('summary') or final_msg,
-                )
-            ]
+    async def _rephrase(self, rendered: str) -> str:
+        """
+        Polish a templated tool answer with the cheaper REPHRASE_MODEL
+        (no conversation context, no tools).
+        """
+        resp = await safe_chat_completion(
+            model=get_settings().REPHRASE_MODEL,
+            messages=[
+                {'role': 'system', 'content': rephrase_prompt},
+                {'role': 'user', 'content': rendered},
+            ],
+            cache_version=self.tool_dispatcher.snapshot_version,
+            cache_source=self.snapshot_source,
         )
-        return ChatResponse(response=final_msg)
+        return resp.choices[0].message.content
 
     def _attach_allocation_summary(self, call_obj, result: Dict[str, Any]) -> None:
         args = json.loads(call_obj.function.arguments)
@@ -273,28 +431,23 @@ class PredefinedPromptHandler:
         if target_alloc := map_goal_to_allocation(user_input):
             # call the tool directly (bypassing LLM) for a quick suggestion
             tool = get_tool('rebalance_portfolio')
-            result = await tool.run(
-                holdings=self.agent.tool_dispatcher.holdings,
-                cash_accounts=self.agent.tool_dispatcher.cash_balances,
-                fund_metadata=self.agent.tool_dispatcher.fund_metadata,
-                target_allocations=target_alloc,
+            result = await self.agent.tool_dispatcher.run_tool(
+                'rebalance_portfolio', {'target_allocations': target_alloc}
             )
-            moves = '\n'.join(result.payload['movements'])
             return ChatResponse(
-                response=(
-                    'Based on your goal, here’s what I suggest:\n\n'
-                    '🔄 Rebalancing Actions:\n'
-                    f'{moves}\n\n{result.payload["allocation_summary"]}'
-                )
+                response='Based on your goal, here’s what I suggest:\n\n' + tool.render(result.model_dump())
             )
 
         return None
 
     async def _recap(self) -> ChatResponse:
-        records = await self.memory.get_all()
-        if not records:
+        total = await self.memory.length()
+        if not total:
             return ChatResponse(response='There’s nothing to recap yet.')
+        records = await self.memory.get_page(-RECAP_MAX_ITEMS, RECAP_MAX_ITEMS)
         bullets = '\n'.join(f'- {r.summary or r.content}' for r in records)
+        if total > len(records):
+            bullets = f'- …and {total - len(records)} earlier actions\n' + bullets
         return ChatResponse(response='Here’s a recap of what we’ve done:\n' + bullets)
 
     async def _why(self) -> ChatResponse:
@@ -306,4 +459,6 @@ class PredefinedPromptHandler:
     async def _reset(self) -> ChatResponse:
         await self.memory.clear()
         await self.history.clear()
+        if self.agent.history_index:
+            self.agent.history_index.drop(self.history.session_key)
         return ChatResponse(response='Alright, I’ve cleared the session. Let’s start fresh!')
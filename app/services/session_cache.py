@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'session_cache:invalidate'
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class SessionCache:
+    """
+    Bounded in-process (L1) cache of session state in front of Redis.
+
+    • LRU eviction by the approximate byte size of the cached entries.
+    • Every write made through `MessageHistory` / `ToolMemory` publishes the
+      written key on INVALIDATION_CHANNEL; each worker listens on that channel
+      and drops its copy when another worker touched the key.
+    • Reads are only served while the invalidation listener is subscribed –
+      if the subscription drops, the cache is flushed and bypassed until it
+      is re-established, so a worker never serves state it can’t keep coherent.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.worker_id = uuid4().hex
+        self.active = False
+
+        # key → (expires_at, size, value)
+        self._entries: OrderedDict[str, Tuple[float, int, Any]] = OrderedDict()
+        self._size = 0
+        self._epoch = 0  # bumped on every invalidation, guards racing fills
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ───────────────────────── reads / writes ──────────────────────────
+    def epoch(self) -> int:
+        """Token to pass to `put()` – taken *before* reading from Redis."""
+        return self._epoch
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.active:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: str, value: Any, size: int, ttl: float, epoch: Optional[int] = None) -> None:
+        """
+        Cache `value` for `ttl` seconds – on a read, what the Redis key has
+        left (see `remaining_ttl`), so the copy never outlives the key.
+        When `epoch` is given and an invalidation happened since it was
+        taken, the fill is discarded.
+        """
+        if ttl <= 0:
+            return
+        if not self.active or size > self.max_bytes:
+            return
+        if epoch is not None and epoch != self._epoch:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._size += size
+        self._evict()
+
+    def update(self, key: str, apply: Callable[[Any], None], added_size: int, ttl: int) -> None:
+        """
+        Mutate a cached value in place after a write-through (e.g. an append)
+        and refresh its expiry.  No-op when the key isn’t cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        apply(entry[2])
+        self._entries[key] = (time.monotonic() + ttl, entry[1] + added_size, entry[2])
+        self._entries.move_to_end(key)
+        self._size += added_size
+        self._evict()
+
+    def invalidate(self, key: str) -> None:
+        self._epoch += 1
+        self.invalidations += 1
+        self._drop(key)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'bytes': self._size,
+        }
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    # ───────────────────────── coherence ───────────────────────────────
+    def publish_invalidation(self, pipe, key: str) -> None:
+        """Queue an invalidation message on a Redis pipeline."""
+        pipe.publish(INVALIDATION_CHANNEL, f'{self.worker_id} {key}')
+
+    async def listen(self, redis: Redis) -> None:
+        """
+        Long-running task: apply invalidations published by other workers.
+        Reconnects forever; cancel the task to stop it.
+        """
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.clear()
+                self.active = True
+                logger.info('Session cache listening for invalidations (worker %s)', self.worker_id)
+                async for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    data = message['data']
+                    if isinstance(data, bytes):
+                        data = data.decode('utf-8')
+                    worker_id, _, key = data.partition(' ')
+                    if worker_id != self.worker_id:
+                        self.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning('Session cache invalidation listener failed: %s', exc)
+            finally:
+                self.active = False
+                self.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:  # connection already gone
+                    pass
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def remaining_ttl(pttl: int, default: float) -> float:
+    """
+    Seconds a key read from Redis has left, from its PTTL: `default` when
+    it doesn't exist yet (the next write creates it with that TTL) or has
+    no expiry.
+    """
+    return pttl / 1000 if pttl >= 0 else default
+
+
+@lru_cache
+def get_session_cache() -> Optional[SessionCache]:
+    """
+    Process-wide cache, or None when disabled (SESSION_CACHE_MAX_BYTES=0).
+    """
+    max_bytes = get_settings().SESSION_CACHE_MAX_BYTES
+    return SessionCache(max_bytes) if max_bytes > 0 else None
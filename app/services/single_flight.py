@@ -0,0 +1,151 @@
+"""
+Single-flight coalescing: identical work that is already in flight is joined
+instead of being started again.
+
+  • `SingleFlight`            – same-worker duplicates share one asyncio task
+  • `DistributedSingleFlight` – cross-worker duplicates: one worker takes a
+    short Redis lock and computes, the others poll until the result has been
+    published (or the lock disappears, in which case they take over)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.clients.redis import get_session_redis
+from app.utils import codec
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+POLL_SECONDS = 0.05
+# delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# extend the lock's expiry (ARGV[2] ms) only if we still own it
+EXTEND_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    The shared work runs in its own task that every caller (the first one
+    included) awaits through `asyncio.shield`: a cancelled caller, e.g. a
+    discarded speculative tool run, only detaches and the others still get
+    the result.  The task itself is never cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.joined = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.joined += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every caller had detached
+
+
+class DistributedSingleFlight:
+    def __init__(self, redis: Redis, local: SingleFlight) -> None:
+        self.redis = redis
+        self.local = local
+        self.remote_joined = 0
+
+    async def do(
+            self,
+            key: str,
+            compute: Callable[[], Awaitable[T]],
+            load: Callable[[], Awaitable[Optional[T]]],
+            lock_ttl: float,
+    ) -> T:
+        """
+        Return the published result for `key` (`load`) or compute it once
+        across all workers.  `compute` must publish its own result so that
+        `load` can find it; `lock_ttl` bounds how long one computation may
+        hold the key before waiters give up and compute themselves.
+        """
+        return await self.local.do(key, lambda: self._do_shared(key, compute, load, lock_ttl))
+
+    async def do_json(self, key: str, fn: Callable[[], Awaitable[Any]], result_ttl: int, lock_ttl: float) -> Any:
+        """
+        `do()` for JSON-compatible results published under a short-lived
+        ``single_flight:{key}:result`` key (late duplicates within
+        `result_ttl` seconds get the same answer).
+        """
+        result_key = f'single_flight:{key}:result'
+
+        async def load() -> Optional[Any]:
+            raw = await self.redis.get(result_key)
+            return codec.decode(raw) if raw is not None else None
+
+        async def compute() -> Any:
+            value = await fn()
+            await self.redis.set(result_key, codec.encode(value), ex=result_ttl)
+            return value
+
+        return await self.do(key, compute, load, lock_ttl)
+
+    async def _do_shared(self, key, compute, load, lock_ttl: float):
+        lock_key = f'single_flight:{key}:lock'
+        token: Optional[str] = uuid4().hex
+        deadline = time.monotonic() + lock_ttl
+        waited = False
+        while True:
+            if (value := await load()) is not None:
+                if waited:
+                    self.remote_joined += 1
+                return value
+            if await self.redis.set(lock_key, token, nx=True, px=int(lock_ttl * 1000)):
+                break
+            if time.monotonic() >= deadline:
+                logger.warning('Gave up waiting on %s, computing locally', lock_key)
+                token = None
+                break
+            waited = True
+            await asyncio.sleep(POLL_SECONDS)
+
+        try:
+            return await compute()
+        finally:
+            if token is not None:
+                await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'leaders': self.local.leaders,
+            'joined_local': self.local.joined,
+            'joined_remote': self.remote_joined,
+        }
+
+
+@lru_cache
+def get_single_flight() -> DistributedSingleFlight:
+    return DistributedSingleFlight(get_session_redis(), SingleFlight())
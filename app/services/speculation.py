@@ -0,0 +1,89 @@
+"""
+Speculative tool pre-execution.
+
+Argument-less tools the prompt is likely to need are started as background
+tasks while the first (tool-choosing) completion is in flight.  If the model
+then asks for one of them with no arguments, the running task is joined;
+everything else is cancelled.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from app.services.intent_router import IntentRouter
+from app.services.tool_dispatcher import ToolDispatcher, local_tool_call
+from app.tools.registry import all_tools
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculationStats:
+    def __init__(self) -> None:
+        self.launched = 0
+        self.hits = 0  # speculative result used by the turn
+        self.wasted = 0  # started but not asked for (cancelled or discarded)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'launched': self.launched,
+            'hits': self.hits,
+            'wasted': self.wasted,
+            'hit_rate': round(self.hits / self.launched, 3) if self.launched else None,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """Speculative tool tasks belonging to one turn."""
+
+    def __init__(self, tasks: Dict[str, asyncio.Task]) -> None:
+        self.tasks = tasks
+
+    def take(self, call) -> Optional[asyncio.Task]:
+        """
+        Hand over the running task matching `call`, if the model asked for a
+        speculated tool with no arguments.
+        """
+        if json.loads(call.function.arguments or '{}'):
+            return None
+        task = self.tasks.pop(call.function.name, None)
+        if task is not None:
+            speculation_stats.hits += 1
+        return task
+
+    def cancel(self) -> None:
+        """
+        Cancel whatever was not taken.  A task sharing a tool-cache
+        computation with other requests only detaches from it (see
+        `SingleFlight`), so their results are unaffected.
+        """
+        for name, task in self.tasks.items():
+            speculation_stats.wasted += 1
+            task.cancel()
+            logger.debug('Cancelled speculative %s', name)
+        self.tasks = {}
+
+
+def speculate(text: str, dispatcher: ToolDispatcher, router: IntentRouter, min_confidence: float) -> Speculation:
+    tasks: Dict[str, asyncio.Task] = {}
+    tools = all_tools()
+    for name in router.candidates(text, min_confidence):
+        tool = tools.get(name)
+        if tool is None or tool.parameters.get('required'):
+            continue  # only argument-free tools can be run ahead of the model
+        task = asyncio.create_task(dispatcher.dispatch(local_tool_call(name, {})))
+        task.add_done_callback(_retrieve_exception)
+        tasks[name] = task
+        speculation_stats.launched += 1
+    return Speculation(tasks)
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """Keep failures of discarded speculative tasks out of the asyncio log."""
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        logger.debug('Speculative tool failed: %s', exc)
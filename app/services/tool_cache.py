@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from app.clients.redis import get_session_redis
+from app.services.single_flight import DistributedSingleFlight, get_single_flight
+from app.settings import get_settings
+from app.utils import codec
+
+LOCK_TIMEOUT_SECONDS = 10.0  # upper bound for one tool computation
+
+
+def tool_cache_key(tool_name: str, arguments: Dict[str, Any], snapshot_version: str) -> str:
+    """
+    Cache key for one tool invocation: name + canonicalised explicit
+    arguments + portfolio snapshot version (the shared domain context
+    holdings / prices / … is fully described by the version).
+    """
+    canonical = json.dumps(arguments, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+    return f'tool_cache:{snapshot_version}:{tool_name}:{digest}'
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for deterministic tool results.
+
+    • L1: bounded in-process LRU (per worker)
+    • L2: Redis, shared by all workers
+    • stampede protection: one computation per key at a time, across
+      workers (`DistributedSingleFlight`).
+
+    Values are the dumped result dicts; callers re-validate them into the
+    tool’s result model, so cached objects are never shared.
+    """
+
+    def __init__(self, redis: Redis, flight: DistributedSingleFlight, max_local_entries: int) -> None:
+        self.redis = redis
+        self.flight = flight
+        self.max_local_entries = max_local_entries
+        self._local: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get_or_compute(
+            self,
+            key: str,
+            ttl: int,
+            compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        if (value := self._get_local(key)) is not None:
+            self.local_hits += 1
+            return value
+
+        async def load() -> Optional[Dict[str, Any]]:
+            raw = await self.redis.get(key)
+            if raw is None:
+                return None
+            self.redis_hits += 1
+            return codec.decode(raw)
+
+        async def compute_and_store() -> Dict[str, Any]:
+            self.misses += 1
+            result = await compute()
+            await self.redis.set(key, codec.encode(result), ex=ttl)
+            return result
+
+        value = await self.flight.do(key, compute_and_store, load, lock_ttl=LOCK_TIMEOUT_SECONDS)
+        self._put_local(key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'local_entries': len(self._local),
+        }
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry[1]
+
+    def _put_local(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+
+@lru_cache
+def get_tool_cache() -> Optional[ToolResultCache]:
+    settings = get_settings()
+    if not settings.TOOL_CACHE_ENABLED:
+        return None
+    return ToolResultCache(get_session_redis(), get_single_flight(), settings.TOOL_CACHE_LOCAL_ENTRIES)
@@ -3,11 +3,18 @@ from __future__ import annotations
 
 import inspect
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
 
 from app.tools.rebalance_portfolio import ASSET_CLASS_BUCKETS  # for allocation breakdown
+from app.services.tool_cache import ToolResultCache, tool_cache_key
+from app.tools.registry import cache_ttl as tool_cache_ttl
 from app.tools.registry import get as get_tool
 from app.tools.tool_errors import ToolErrorResult
+from app.utils.tracing import span
 
 
 class ToolDispatcher:
@@ -16,6 +23,8 @@ class ToolDispatcher:
 
     • Injects shared domain context (holdings, cash, prices, …) into every call.
     • Filters kwargs so each tool only receives the parameters it expects.
+    • Serves tools with a `cache_ttl` from the two-tier ToolResultCache, keyed
+      by the portfolio snapshot version.
     • Provides a helper for quick “current allocation” breakdown.
     """
 
@@ -28,7 +37,12 @@ class ToolDispatcher:
             accounts: list,
             transactions: list,
             latest_prices: dict,
+            snapshot_version: Optional[str] = None,
+            cache: Optional[ToolResultCache] = None,
     ) -> None:
+        # results are only cacheable when the data they were computed from is versioned
+        self.snapshot_version = snapshot_version
+        self.cache = cache if snapshot_version else None
         self._ctx: Dict[str, Any] = {
             'holdings': holdings,
             'cash_accounts': cash_balances,
@@ -63,8 +77,14 @@ class ToolDispatcher:
         Pydantic model (ToolResult)
         """
 
-        name = tool_call.function.name
         explicit = json.loads(tool_call.function.arguments or '{}')
+        return await self.run_tool(tool_call.function.name, explicit)
+
+    async def run_tool(self, name: str, explicit: Dict[str, Any]) -> Any:
+        """
+        Run tool `name` with the model-supplied `explicit` arguments plus the
+        shared context, serving deterministic tools from the result cache.
+        """
         tool = get_tool(name)
 
         sig = inspect.signature(tool.run)
@@ -79,7 +99,17 @@ class ToolDispatcher:
             )
 
         kwargs = {k: v for k, v in {**self._ctx, **explicit}.items() if k in sig.parameters}
-        return await tool.run(**kwargs)
+
+        ttl = tool_cache_ttl(name)
+        with span(f'tool.{name}'):
+            if not (self.cache and ttl > 0):
+                return await tool.run(**kwargs)
+
+            async def compute() -> Dict[str, Any]:
+                return (await tool.run(**kwargs)).model_dump()
+
+            key = tool_cache_key(name, explicit, self.snapshot_version)
+            return tool.result_model.model_validate(await self.cache.get_or_compute(key, ttl, compute))
 
     def get_allocation_breakdown(self) -> Dict[str, float]:
         """
@@ -107,3 +137,15 @@ class ToolDispatcher:
         }
         allocation_pct['cash'] = round(cash_total / portfolio_value * 100, 2)
         return allocation_pct
+
+
+def local_tool_call(name: str, arguments: Dict[str, Any]) -> ChatCompletionMessageToolCall:
+    """
+    Build a tool call shaped like the ones OpenAI returns, for tools chosen
+    locally (intent router) rather than by the model.
+    """
+    return ChatCompletionMessageToolCall(
+        id=f'call_local_{uuid4().hex[:20]}',
+        type='function',
+        function=Function(name=name, arguments=json.dumps(arguments)),
+    )
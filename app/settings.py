@@ -1,18 +1,100 @@
 from functools import lru_cache
+from typing import Dict, Optional
 
 from pydantic import Field, RedisDsn
 from pydantic_settings import BaseSettings
 
+from app.enums import ResponseMode
+
 
 class Settings(BaseSettings):
     API_URL: str = Field(default="http://localhost:8000")
     REDIS_URL: RedisDsn = Field(default="redis://localhost:6379/0")
 
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: Optional[str] = Field(default=None)  # e.g. a local fake server
+
+    # client-side OpenAI rate limiting (per model)
+    LLM_MAX_IN_FLIGHT: int = Field(default=8)
+    LLM_MAX_QUEUE: int = Field(default=32)
+    LLM_QUEUE_TIMEOUT_SECONDS: float = Field(default=10.0)
+    LLM_BREAKER_FAILURE_THRESHOLD: int = Field(default=5)
+    LLM_BREAKER_RESET_SECONDS: float = Field(default=30.0)
+    CHAT_DEADLINE_SECONDS: float = Field(default=25.0)  # total LLM budget per /chat turn
+    CHAT_DEDUP_SECONDS: int = Field(default=5)  # identical prompts in a session within this window share a turn
+
+    # /chat admission control (per worker) and per-session turn serialisation
+    MAX_CONCURRENT_TURNS: int = Field(default=32)
+    MAX_WAITING_TURNS: int = Field(default=64)
+    ADMISSION_WAIT_SECONDS: float = Field(default=2.0)
+    SESSION_MAX_QUEUED_TURNS: int = Field(default=2)  # turns waiting behind the running one
+    SESSION_LOCK_WAIT_SECONDS: float = Field(default=30.0)
+    SESSION_LOCK_TTL_SECONDS: float = Field(default=15.0)  # renewed while the turn runs; bounds a crashed worker's hold
+
+    # tool name → "template" | "rephrase" | "llm", overrides each tool's default
+    TOOL_RESPONSE_MODES: Dict[str, ResponseMode] = Field(default_factory=dict)
+    REPHRASE_MODEL: str = Field(default="gpt-3.5-turbo")
+
+    # local intent router (skips the tool-choosing completion)
+    INTENT_ROUTER_ENABLED: bool = Field(default=True)
+    INTENT_ROUTER_THRESHOLD: float = Field(default=0.8)
+    INTENT_MODEL_PATH: str = Field(default="data/intent_model.json")  # relative to app/
+    INTENT_LOG_PATH: Optional[str] = Field(default=None)  # JSONL of (prompt, tool) turns
+
+    # run likely argument-free tools while the first completion is in flight
+    SPECULATIVE_TOOLS_ENABLED: bool = Field(default=True)
+    SPECULATION_MIN_CONFIDENCE: float = Field(default=0.3)
+
+    # deterministic tool result cache (in-process LRU + Redis)
+    TOOL_CACHE_ENABLED: bool = Field(default=True)
+    TOOL_CACHE_LOCAL_ENTRIES: int = Field(default=256)
+    TOOL_CACHE_TTLS: Dict[str, int] = Field(default_factory=dict)  # tool name → seconds, overrides defaults
+
+    # cache of whole LLM completions, shared across sessions
+    COMPLETION_CACHE_ENABLED: bool = Field(default=True)
+    COMPLETION_CACHE_NORMALISE: bool = Field(default=True)  # ignore case / whitespace / punctuation
+    COMPLETION_CACHE_TTL_SECONDS: int = Field(default=86_400)
+    COMPLETION_CACHE_MAX_ENTRIES: int = Field(default=10_000)
+    COMPLETION_CACHE_MAX_ENTRY_BYTES: int = Field(default=64_000)
+
+    # opt-in request profiling (speedscope files), see app/utils/profiling.py
+    PROFILING_HEADER_ENABLED: bool = Field(default=False)  # honour "X-Profile: 1"
+    PROFILING_SAMPLE_RATE: float = Field(default=0.0)  # fraction of requests profiled
+    PROFILING_INTERVAL_MS: float = Field(default=2.0)
+    PROFILING_DIR: str = Field(default="profiles")
+
+    # directory with holdings.json, cash_balances.json, accounts.json, fund_metadata.json
+    # and mock_transactions.json; defaults to the bundled app/data
+    PORTFOLIO_DATA_DIR: Optional[str] = Field(default=None)
+
+    WARMUP_MAX_ATTEMPTS: int = Field(default=12)  # startup warm-up tries (5 s apart) before /ready reports failed
 
     ENVIRONMENT: str = Field(default="local")
     LOGGING_LEVEL: str = Field(default="INFO")
 
+    # session storage (message history + tool memory)
+    SESSION_TTL_SECONDS: int = Field(default=3600)
+    SESSION_CODEC: str = Field(default="v2")  # "v2" (compressed), "v1" (older compressed format) or "json"
+    SESSION_CACHE_MAX_BYTES: int = Field(default=0)  # in-process L1 cache, 0 = disabled
+
+    # relevance-based history selection once a session outgrows the token budget
+    HISTORY_RETRIEVAL_ENABLED: bool = Field(default=True)
+    HISTORY_RECENT_TURNS: int = Field(default=3)  # always kept (if they fit)
+    HISTORY_RETRIEVAL_TOP_K: int = Field(default=4)  # older turns / tool summaries added by relevance
+    HISTORY_INDEX_MAX_SESSIONS: int = Field(default=512)  # per-worker LRU of session indexes
+
+    AGENT_CACHE_MAX_SESSIONS: int = Field(default=512)  # per-worker LRU of session agents
+
+    # background jobs (Redis Stream + consumer group), see app/services/jobs.py
+    JOB_STREAM: str = Field(default="jobs")
+    JOB_GROUP: str = Field(default="job-workers")
+    JOB_WORKER_CONCURRENCY: int = Field(default=8)  # items in flight per worker process
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = Field(default=120.0)  # unacknowledged this long → reclaimed
+    JOB_MAX_ATTEMPTS: int = Field(default=3)
+    JOB_MAX_ITEMS: int = Field(default=10_000)  # per submitted job
+    JOB_RESULT_TTL_SECONDS: int = Field(default=86_400)
+    JOB_PORTFOLIOS_DIR: Optional[str] = Field(default=None)  # one subdirectory per portfolio jobs can name
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
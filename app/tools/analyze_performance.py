@@ -37,6 +37,8 @@ def _calc_period_return(
 class AnalyzePerformance(BaseTool):
     name = 'analyze_performance'
     description = 'Return time-period performance metrics and contribution by asset class'
+    result_model = PerformanceResult
+    cache_ttl = 300  # periods are relative to “today”
     parameters = {
         'type': 'object',
         'properties': {},
@@ -84,5 +86,13 @@ class AnalyzePerformance(BaseTool):
         }
         return PerformanceResult(summary=summary, payload=payload)
 
+    def render(self, result: Dict[str, Any]) -> str:
+        contribution = result.get('payload', {}).get('asset_class_contribution_£', {})
+        lines = [result.get('summary', '')]
+        if contribution:
+            lines.append('\nContribution by asset class:')
+            lines.extend(f'- {k}: £{v:+,.2f}' for k, v in contribution.items())
+        return '\n'.join(lines)
+
 
 register(AnalyzePerformance())
\ No newline at end of file
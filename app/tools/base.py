@@ -3,6 +3,11 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Protocol, Any, Dict
 
+from pydantic import BaseModel
+
+from app.enums import ResponseMode
+from app.utils.tool_result_encoder import encode_tool_result
+
 
 class ToolResult(Protocol):
     summary: str  # always shown to the LLM / user
@@ -13,9 +18,36 @@ class BaseTool(ABC):
     name: str
     description: str
     parameters: dict  # JSON-Schema compatible
+    response_mode: ResponseMode = ResponseMode.LLM  # see registry.response_mode()
+    result_model: type[BaseModel]  # concrete result type, used to rebuild cached results
+    cache_ttl: int = 0  # seconds; >0 marks the tool as deterministic/cacheable
+    result_token_budget: int = 400  # max tokens of the result as sent to the LLM
+    llm_omit_fields: tuple[str, ...] = ()  # dotted result paths the LLM doesn’t need
+
+    def encode_for_llm(self, result: Dict[str, Any], model: str) -> str:
+        """Compact, token-budgeted JSON of a (dumped) result for the tool message."""
+        return encode_tool_result(result, self.result_token_budget, model, omit=self.llm_omit_fields)
 
     async def run(self, **kwargs) -> ToolResult: ...
 
+    def render(self, result: Dict[str, Any]) -> str:
+        """
+        Deterministic user-facing text for a (dumped) tool result – used when
+        the answer is not phrased by the LLM, e.g. while OpenAI is unavailable.
+        Tools override this for a nicer layout.
+        """
+        lines = [result.get('summary', '')]
+        for key, value in result.get('payload', {}).items():
+            if isinstance(value, dict):
+                lines.append(f'\n{key}:')
+                lines.extend(f'- {k}: {v}' for k, v in value.items())
+            elif isinstance(value, list):
+                lines.append(f'\n{key}:')
+                lines.extend(str(v) for v in value)
+            else:
+                lines.append(f'{key}: {value}')
+        return '\n'.join(lines).strip()
+
     def openai_schema(self) -> dict:
         """
         Return the full tool spec expected by OpenAI’s `tools=` argument.
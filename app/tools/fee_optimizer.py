@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 
 from pydantic import BaseModel
 
+from app.enums import ResponseMode
 from .base import BaseTool
 from .registry import register
 
@@ -21,6 +22,9 @@ class FeeOptimizationResult(BaseModel):
 class FindFeeOptimizations(BaseTool):
     name = 'find_fee_optimizations'
     description = 'Identify cheaper funds or share classes with equivalent exposure'
+    response_mode = ResponseMode.TEMPLATE  # payload is already user-facing text
+    result_model = FeeOptimizationResult
+    cache_ttl = 3600
     parameters = {
         'type': 'object',
         'properties': {},
@@ -80,5 +84,9 @@ class FindFeeOptimizations(BaseTool):
         }
         return FeeOptimizationResult(summary=summary, payload=payload)
 
+    def render(self, result: Dict[str, Any]) -> str:
+        suggestions = result.get('payload', {}).get('suggestions', [])
+        return '\n'.join([result.get('summary', ''), *suggestions])
+
 
 register(FindFeeOptimizations())
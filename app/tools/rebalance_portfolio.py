@@ -2,6 +2,7 @@ from typing import List, Dict, Any
 
 from pydantic import BaseModel
 
+from app.enums import ResponseMode
 from .base import BaseTool
 from .registry import register
 
@@ -23,6 +24,11 @@ class RebalancePortfolioResult(BaseModel):
 class RebalancePortfolio(BaseTool):
     name = 'rebalance_portfolio'
     description = 'Rebalance holdings toward new target allocations'
+    response_mode = ResponseMode.TEMPLATE  # payload is already user-facing text
+    result_model = RebalancePortfolioResult
+    cache_ttl = 3600
+    # the allocation text repeats current_allocation / target_allocations
+    llm_omit_fields = ('allocation_summary', 'payload.allocation_summary')
     parameters = {
         'type': 'object',
         'properties': {
@@ -119,6 +125,12 @@ class RebalancePortfolio(BaseTool):
         }
         return RebalancePortfolioResult(summary=allocation_summary, payload=payload)
 
+    def render(self, result: Dict[str, Any]) -> str:
+        payload = result.get('payload', {})
+        moves = '\n'.join(payload.get('movements', [])) or 'Your portfolio is already on target.'
+        allocation_summary = result.get('allocation_summary') or payload.get('allocation_summary', '')
+        return f'🔄 Rebalancing Actions:\n{moves}\n\n{allocation_summary}'
+
 
 register(RebalancePortfolio())
 
@@ -6,6 +6,8 @@ import pkgutil
 from types import ModuleType
 from typing import Dict
 
+from app.enums import ResponseMode
+from app.settings import get_settings
 from .base import BaseTool
 
 _registry: Dict[str, BaseTool] = {}  # name → instance
@@ -27,6 +29,24 @@ def all_tools() -> Dict[str, BaseTool]:
     return _registry
 
 
+def response_mode(name: str) -> ResponseMode:
+    """
+    Response mode for tool `name`: the TOOL_RESPONSE_MODES setting wins,
+    otherwise the tool’s own `response_mode` default.
+    """
+    override = get_settings().TOOL_RESPONSE_MODES.get(name)
+    return ResponseMode(override) if override else get(name).response_mode
+
+
+def cache_ttl(name: str) -> int:
+    """
+    Result-cache TTL (seconds) for tool `name`; 0 disables caching.
+    The TOOL_CACHE_TTLS setting wins over the tool’s own `cache_ttl`.
+    """
+    override = get_settings().TOOL_CACHE_TTLS.get(name)
+    return override if override is not None else get(name).cache_ttl
+
+
 def register(tool: BaseTool) -> None:
     if tool.name in _registry:
         raise ValueError(f'Tool {tool.name!r} already registered')
@@ -10,17 +10,68 @@ st.title("🧠 Portfolio Assistant")
 BASE_URL = get_settings().API_URL
 
 DEFAULT_TIMEOUT = 30 # seconds
+PAGE_SIZE = 20  # messages fetched per history page
+
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    # one connection pool for the Streamlit server, kept across reruns instead of a connection per message
+    return httpx.Client(base_url=BASE_URL, timeout=DEFAULT_TIMEOUT)
+
+
+def fetch_history(session_id: str, cursor=None) -> dict:
+    """One page of the session's history (oldest first) and the cursor of the page before it."""
+    params = {"limit": PAGE_SIZE}
+    if cursor is not None:
+        params["cursor"] = cursor
+    res = get_client().get("/history", params=params, headers={"session-id": session_id})
+    res.raise_for_status()
+    return res.json()
+
+
+def new_session() -> None:
+    st.session_state.session_id = str(uuid4())
+
+
+def show_backend_error(e: httpx.HTTPError) -> None:
+    if isinstance(e, httpx.HTTPStatusError):
+        st.error(f"Backend returned error: {e.response.status_code}")
+    else:
+        st.error(f"Error contacting backend: {e}")
 
-if 'chat' not in st.session_state:
-    st.session_state.chat = []
 
 session_id = st.text_input("Session ID:", key="session_id", placeholder="Enter session ID to continue previous chat")
 
-generate_session = st.button("Generate New Session ID")
-if generate_session:
-    session_id = str(uuid4())
+if st.button("Generate New Session ID", on_click=new_session):
     st.text(f"New session ID generated.\n{session_id}\nYou can use this to continue the chat later.")
 
+# only the pages loaded so far are kept (and rendered); a resumed session starts with its latest page
+if st.session_state.get("chat_session") != session_id:
+    st.session_state.chat_session = session_id
+    st.session_state.chat = []
+    st.session_state.older_cursor = None
+    if session_id:
+        try:
+            page = fetch_history(session_id)
+            st.session_state.chat = [(m["role"], m["content"] or "") for m in page["messages"]]
+            st.session_state.older_cursor = page["next_cursor"]
+        except httpx.HTTPError as e:
+            show_backend_error(e)
+
+if st.session_state.older_cursor is not None and st.button("Load older messages"):
+    try:
+        page = fetch_history(session_id, st.session_state.older_cursor)
+        st.session_state.chat[:0] = [(m["role"], m["content"] or "") for m in page["messages"]]
+        st.session_state.older_cursor = page["next_cursor"]
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 409:
+            show_backend_error(e)
+        else:
+            # the session was reset or expired since it was loaded: start over from its latest page
+            st.session_state.chat_session = None
+            st.rerun()
+    except httpx.HTTPError as e:
+        show_backend_error(e)
 
 user_input = st.text_input("You:", key="user_input")
 
@@ -29,11 +80,10 @@ if st.button("Send") and user_input:
 
     with st.spinner("Thinking..."):
         try:
-            res = httpx.post(
-                url=f'{BASE_URL}/chat',
+            res = get_client().post(
+                "/chat",
                 json={"text": user_input},
                 headers={"session-id": session_id} if session_id else {},
-                timeout=30.0  # seconds
             )
             res.raise_for_status()
             data = res.json()
@@ -42,10 +92,8 @@ if st.button("Send") and user_input:
             if tool_result.get("summary"):
                 reply += f"\n\n📊 Tool Summary:\n{tool_result['summary']}"
             st.session_state.chat.append(("assistant", reply))
-        except httpx.RequestError as e:
-            st.error(f"Error contacting backend: {e}")
-        except httpx.HTTPStatusError as e:
-            st.error(f"Backend returned error: {e.response.status_code}")
+        except httpx.HTTPError as e:
+            show_backend_error(e)
 
 for role, msg in st.session_state.chat:
     st.markdown(f"**{role.capitalize()}**: {msg}")
@@ -0,0 +1,156 @@
+"""
+Compact, versioned encoding for session data stored in Redis.
+
+Every encoded value starts with a one-byte format marker:
+
+  • ``{`` / ``[``  – legacy plain JSON (written before the codec existed)
+  • ``\\x00``       – plain compact JSON (``SESSION_CODEC=json``, any value)
+  • ``\\x01``       – v1: compact JSON, deflated with the v1 zlib dictionary
+  • ``\\x02``       – v2: compact JSON, deflated with the v2 zlib dictionary
+
+Each dictionary is a frozen literal of fragments that recur in every session
+(message envelopes, tool names, payload keys, rendered markdown).  It must
+never be edited in place – add a new version marker with a new dictionary
+instead, otherwise existing entries can no longer be decoded.
+
+The v1 dictionary spelled non-ASCII characters as ``\\uXXXX`` escapes and
+JSON with ``", "`` separators, neither of which `encode` ever produces, so
+most of it could not match.  v2 is built from the bytes actually stored:
+compact separators, literal ``£``/emoji, and tool content as the escaped
+string it is inside a `ToolCallRecord`.  v1 is still decoded, and can still
+be written (``SESSION_CODEC=v1``) while older processes are being rolled.
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any
+
+from app.settings import get_settings
+
+FORMAT_JSON = 'json'
+FORMAT_V1 = 'v1'
+FORMAT_V2 = 'v2'
+
+_JSON = b'\x00'
+_V1 = b'\x01'
+_V2 = b'\x02'
+_LEGACY_PREFIXES = (b'{', b'[')
+
+_ZDICT_V1 = (
+    '{"role":"user","content":"'
+    '{"role":"assistant","content":"'
+    '{"tool_call_id":"call_","name":"rebalance_portfolio","name":"find_fee_optimizations",'
+    '"name":"analyze_performance","arguments":"{}","arguments":"{\\"target_allocations\\": {'
+    '"content":"{\\"summary\\": \\"","summary":"\\", \\"payload\\": {\\"'
+    'period_returns_%\\": {\\"1M\\": , \\"3M\\": , \\"YTD\\": , \\"1Y\\": '
+    'asset_class_contribution_\\u00a3\\": {\\"equity - global\\": \\"performance_summary\\": '
+    '\\"suggestions\\": [\\"- Switch **\\"total_estimated_savings\\": '
+    '\\"current_allocation\\": {\\"equities\\": , \\"bonds\\": , \\"cash\\": '
+    '\\"target_allocations\\": {\\"movements\\": [\\"allocation_summary\\": \\"'
+    '\\n\\ud83d\\udcca Current Allocation:\\n- Equities: \\n\\n\\ud83c\\udfaf Target Allocation:'
+    '\\ud83d\\udd3b **Sell / Reduce Exposure:**\\n- Reduce exposure to  by \\u00a3'
+    '\\ud83d\\udcb0 **Invest Available Cash:**\\n- Invest \\u00a3 into '
+    'Performance snapshot: 1M: %, 3M: %, YTD: %, 1Y: %'
+    'Found  cheaper alternatives worth ≈ £ in annual savings. No fee optimizations found. '
+    '📊 Current Allocation:\n- Equities: %\n- Bonds: %\n- Cash: %\n\n🎯 Target Allocation:\n'
+    '🔻 **Sell / Reduce Exposure:**\n- Reduce exposure to  by £'
+    '🔄 **Reallocate from Surplus Holdings:**\n- Reallocate £ to '
+    '💰 **Invest Available Cash:**\n- Invest £ into '
+    'Based on your goal, here’s what I suggest: your portfolio allocation equities bonds cash '
+).encode('utf-8')
+
+# Least common fragments first: zlib reaches the end of the dictionary with the
+# shortest back-references.
+_ZDICT_V2 = (
+    # cached completions
+    '{"id":"chatcmpl-","choices":[{"finish_reason":"stop","finish_reason":"tool_calls",'
+    '"index":0,"logprobs":null,"message":{"content":null,"refusal":null,"role":"assistant",'
+    '"annotations":null,"audio":null,"function_call":null,"tool_calls":[{"id":"call_",'
+    '"function":{"arguments":"{}","name":"'
+    '"},"type":"function"}]}}],"created":,"model":"gpt-4o","object":"chat.completion",'
+    '"service_tier":null,"system_fingerprint":null,"usage":{"completion_tokens":,"prompt_tokens":,'
+    '"total_tokens":,"completion_tokens_details":null,"prompt_tokens_details":null}}'
+    # cached tool results (plain JSON)
+    '{"summary":"","payload":{"period_returns_%":{"1M":,"3M":,"YTD":,"1Y":},'
+    '"asset_class_contribution_£":{"Equity - US":,"Equity - Global":,"Equity - Emerging Markets":,'
+    '"other":},"suggestions":[],"total_estimated_savings":0.0}}'
+    '"current_allocation":{"equities":,"bonds":,"other":,"cash":},"target_allocations":{'
+    '"movements":["Sell / Reduce Exposure:\n- Reduce exposure to  by £.00.",'
+    '"Reallocate from Surplus Holdings:\n- Reallocate £.00 to equities.",'
+    '"Invest Available Cash:\n- Invest £.00 into  fund ()"]'
+    # tool records: content is escaped JSON inside the record
+    '{"tool_call_id":"call_","name":"find_fee_optimizations","name":"analyze_performance",'
+    '"name":"rebalance_portfolio","arguments":"{}","arguments":"{\\"target_allocations\\": {\\"equities\\": '
+    ', \\"bonds\\": , \\"cash\\": }}",'
+    '"content":"{\\"summary\\":\\"No fee optimizations found.\\",\\"payload\\":{\\"suggestions\\":[],'
+    '\\"total_estimated_savings\\":0.0}}","summary":"No fee optimizations found."}'
+    '\\"period_returns_%\\":{\\"1M\\":-,\\"3M\\":-,\\"YTD\\":-,\\"1Y\\":-},'
+    '\\"asset_class_contribution_£\\":{\\"Equity - US\\":-,\\"Equity - Global\\":'
+    ',\\"Equity - Emerging Markets\\":-,\\"other\\":-}}}'
+    '\\"current_allocation\\":{\\"equities\\":,\\"bonds\\":,\\"other\\":,\\"cash\\":},'
+    '\\"target_allocations\\":{\\"equities\\":,\\"bonds\\":,\\"cash\\":},\\"movements\\":['
+    '\\"Sell / Reduce Exposure:\\\\n- Reduce exposure to cash by £.00.\\\\n- Reduce exposure to other by £.00.\\",'
+    '\\"Reallocate from Surplus Holdings:\\\\n- Reallocate £.00 to equities.\\",'
+    '\\"Invest Available Cash:\\\\n- Invest £.00 into equities fund (equities)\\"]}}'
+    '"content":"{\\"summary\\":\\"Current Allocation:\\\\n- Equities: .0%\\\\n- Bonds: .0%'
+    '\\\\n- Other: .0%\\\\n- Cash: .0%\\\\nTarget Allocation:\\\\n- Equities: %\\\\n- Bonds: %'
+    '\\\\n- Cash: %\\",\\"payload\\":{'
+    '"content":"{\\"summary\\":\\"Performance snapshot: 1M: -%, 3M: -%, YTD: -%, 1Y: -%\\",\\"payload\\":{'
+    '","summary":"Performance snapshot: 1M: -%, 3M: -%, YTD: -%, 1Y: -%"}'
+    # rendered assistant replies
+    'Found  cheaper alternatives worth ≈ £ in annual savings.\n- Switch ** '
+    'Based on your goal, here’s what I suggest: your portfolio allocation '
+    'Performance snapshot: 1M: -%, 3M: -%, YTD: -%, 1Y: -%\n\nContribution by asset class:\n'
+    '- Equity - US: £-,\n- other: £-,\n- Equity - Global: £+,\n- Equity - Emerging Markets: £-,'
+    '🔄 Rebalancing Actions:\n🔻 **Sell / Reduce Exposure:**\n- Reduce exposure to cash by £.00.\n'
+    '- Reduce exposure to other by £.00.\n- Reduce exposure to bonds by £.00.\n'
+    '🔄 **Reallocate from Surplus Holdings:**\n- Reallocate £.00 to equities.\n'
+    '💰 **Invest Available Cash:**\n- Invest £.00 into bonds fund (bonds)\n'
+    '- Invest £.00 into equities fund (equities)\n\n\n📊 Current Allocation:\n- Equities: .0%\n'
+    '- Bonds: .0%\n- Other: .0%\n- Cash: .0%\n\n🎯 Target Allocation:\n- Equities: %\n- Bonds: %\n- Cash: %'
+    # message envelopes
+    '{"role":"assistant","content":"'
+    '{"role":"user","content":"'
+).encode('utf-8')
+
+_ZDICTS = {_V1: _ZDICT_V1, _V2: _ZDICT_V2}
+_MARKERS = {FORMAT_V1: _V1, FORMAT_V2: _V2}
+
+
+def encode(value: Any, fmt: str | None = None) -> bytes:
+    """
+    Serialise `value` (any JSON-compatible object) for storage.
+    `fmt` defaults to ``Settings.SESSION_CODEC``.
+    """
+    raw = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    fmt = fmt or get_settings().SESSION_CODEC
+    if fmt == FORMAT_JSON:
+        return _JSON + raw
+    marker = _MARKERS.get(fmt)
+    if marker is None:
+        raise ValueError(f'Unknown session codec {fmt!r}')
+    compressor = zlib.compressobj(level=6, zdict=_ZDICTS[marker])
+    return marker + compressor.compress(raw) + compressor.flush()
+
+
+def decode_bytes(data: bytes | str) -> bytes:
+    """
+    Return the UTF-8 JSON document held in `data`, whatever its format.
+    """
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    marker = data[:1]
+    if marker in _LEGACY_PREFIXES:
+        return data
+    if marker == _JSON:
+        return data[1:]
+    zdict = _ZDICTS.get(marker)
+    if zdict is not None:
+        decompressor = zlib.decompressobj(zdict=zdict)
+        return decompressor.decompress(data[1:]) + decompressor.flush()
+    raise ValueError(f'Unknown session codec marker {data[:1]!r}')
+
+
+def decode(data: bytes | str) -> Any:
+    return json.loads(decode_bytes(data))
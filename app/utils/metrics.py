@@ -0,0 +1,150 @@
+"""
+Minimal Prometheus metrics (counters + histograms) rendered in the text
+exposition format on ``GET /metrics``.
+
+Label values must come from small, fixed sets (stage, model, tool, route);
+per-session data belongs in logs / the Server-Timing header, not in labels.
+Values that already live elsewhere (cache hit counters, …) are exported at
+scrape time through `REGISTRY.register_collector`.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Sample(NamedTuple):
+    labels: Dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str  # "counter" | "gauge" | "histogram"
+    help: str
+    samples: List[Tuple[str, Sample]]  # (sample name, sample)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_values(self.labelnames, labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> MetricFamily:
+        samples = [
+            (f'{self.name}_total', Sample(dict(zip(self.labelnames, key)), value))
+            for key, value in self._values.items()
+        ]
+        return MetricFamily(self.name, 'counter', self.help, samples)
+
+
+class Histogram:
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values → (per-bucket counts (+Inf last), sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_values(self.labelnames, labels)
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def collect(self) -> MetricFamily:
+        samples: List[Tuple[str, Sample]] = []
+        for key, (counts, total) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', Sample({**labels, 'le': _format_bound(bound)}, cumulative)))
+            samples.append((f'{self.name}_sum', Sample(labels, total[0])))
+            samples.append((f'{self.name}_count', Sample(labels, cumulative)))
+        return MetricFamily(self.name, 'histogram', self.help, samples)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Counter | Histogram] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, help, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [m.collect() for m in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines: List[str] = []
+        for family in families:
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.type}')
+            for name, sample in family.samples:
+                lines.append(f'{name}{_format_labels(sample.labels)} {_format_value(sample.value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label_values(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> LabelValues:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else repr(float(bound))
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'chat_stage_duration_seconds', 'Time spent in each stage of a chat turn', ['stage', 'model'],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ['method', 'route', 'status'],
+)
+LLM_TOKENS = REGISTRY.counter(
+    'llm_tokens', 'Tokens reported by OpenAI responses', ['model', 'kind'],
+)
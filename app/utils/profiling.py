@@ -0,0 +1,259 @@
+"""
+Opt-in per-request profiling with speedscope output.
+
+A request is profiled when it carries ``X-Profile: 1`` (and
+PROFILING_HEADER_ENABLED is on) or is picked by PROFILING_SAMPLE_RATE.
+For a profiled request:
+
+  • a sampler thread snapshots the event-loop thread's Python stack every
+    PROFILING_INTERVAL_MS (``sys._current_frames``) and keeps the samples
+    taken while one of the request's asyncio tasks was running – this is
+    the CPU side (tool maths, pydantic, JSON, tiktoken, …)
+  • `await_span()` records wall-clock intervals spent awaiting Redis and
+    OpenAI, which never show up in stack samples
+
+Both are written to ``{PROFILING_DIR}/{request_id}.speedscope.json``
+(open it in https://www.speedscope.app): one sampled CPU profile plus one
+evented profile per lane of (possibly overlapping) awaits.
+
+When no request is being profiled the cost is one ContextVar lookup per
+span and no thread runs.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+from uuid import uuid4
+
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'x-profile'
+REQUEST_ID_HEADER = 'x-request-id'
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+MAX_STACK_DEPTH = 128
+
+FrameKey = Tuple[str, str, int]  # (function, file, first line)
+
+_active: ContextVar[Optional['Profile']] = ContextVar('profile', default=None)
+
+
+class Profile:
+    def __init__(self, request_id: str, loop: asyncio.AbstractEventLoop, interval: float) -> None:
+        self.request_id = request_id
+        self.loop = loop
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.stacks: Dict[Tuple[FrameKey, ...], float] = {}  # root-first stack → seconds
+        self.awaits: List[Tuple[str, float, float]] = []  # (what, start, end), perf_counter seconds
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(self.stacks.values())
+
+    def add_sample(self, frame, seconds: float) -> None:
+        """Attribute `seconds` (time since the previous sample) to `frame`'s stack."""
+        stack: List[FrameKey] = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        key = tuple(reversed(stack))
+        self.stacks[key] = self.stacks.get(key, 0.0) + seconds
+
+    def summary(self) -> Dict[str, float]:
+        out = {
+            'wall_ms': round(((self.finished or time.perf_counter()) - self.started) * 1000, 1),
+            'cpu_sampled_ms': round(self.cpu_seconds * 1000, 1),
+        }
+        for what, start, end in self.awaits:
+            key = f'await_{what.split(".")[0]}_ms'
+            out[key] = round(out.get(key, 0.0) + (end - start) * 1000, 1)
+        return out
+
+    def to_speedscope(self) -> dict:
+        frames: List[dict] = []
+        index: Dict[FrameKey, int] = {}
+
+        def frame_id(key: FrameKey) -> int:
+            if key not in index:
+                index[key] = len(frames)
+                name, file, line = key
+                frames.append({'name': name, 'file': file, 'line': line})
+            return index[key]
+
+        end_ms = ((self.finished or time.perf_counter()) - self.started) * 1000
+        stacks = list(self.stacks.items())
+        profiles = [{
+            'type': 'sampled',
+            'name': 'CPU (event loop thread, sampled)',
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(self.cpu_seconds * 1000, 3),
+            'samples': [[frame_id(k) for k in stack] for stack, _seconds in stacks],
+            'weights': [round(seconds * 1000, 3) for _stack, seconds in stacks],
+        }]
+        for lane_no, lane in enumerate(_lanes(self.awaits), start=1):
+            events = []
+            for what, start, end in lane:
+                fid = frame_id((what, '<await>', 0))
+                events.append({'type': 'O', 'frame': fid, 'at': round((start - self.started) * 1000, 3)})
+                events.append({'type': 'C', 'frame': fid, 'at': round((end - self.started) * 1000, 3)})
+            profiles.append({
+                'type': 'evented',
+                'name': f'Awaits (wall clock, lane {lane_no})',
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(end_ms, 3),
+                'events': events,
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.request_id,
+            'exporter': 'fin-assistant',
+            'shared': {'frames': frames},
+            'profiles': profiles,
+        }
+
+
+class _Sampler:
+    """One daemon thread sampling the event-loop thread while profiles are active."""
+
+    def __init__(self) -> None:
+        self._profiles: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._target_thread = 0
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            self._target_thread = threading.get_ident()  # called on the loop thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        # weight each sample by the real time since the previous one: with the
+        # GIL busy, wake-ups come later than the nominal interval
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            interval = min(p.interval for p in profiles)
+            time.sleep(interval)
+
+            frame = sys._current_frames().get(self._target_thread)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            if frame is None:
+                continue
+            owner = _profile_of_running_task(profiles[0].loop, fallback=profiles)
+            if owner in profiles:
+                owner.add_sample(frame, elapsed)
+
+
+_sampler = _Sampler()
+
+
+def _profile_of_running_task(loop: asyncio.AbstractEventLoop, fallback: List[Profile]) -> Optional[Profile]:
+    """
+    Profile of the task running on `loop` right now, read from the sampler
+    thread via the task's context.  Where this Python build doesn't expose
+    the running task / its context, samples go to the only active profile
+    (and are dropped while several requests are profiled at once).
+    """
+    current_tasks = getattr(asyncio.tasks, '_current_tasks', None)
+    if not isinstance(current_tasks, dict):
+        return fallback[0] if len(fallback) == 1 else None
+    task = current_tasks.get(loop)
+    if task is None:
+        return None  # loop is idle or running plain callbacks
+    get_context = getattr(task, 'get_context', None)  # 3.12+
+    context = get_context() if get_context else getattr(task, '_context', None)
+    if context is None:
+        return fallback[0] if len(fallback) == 1 else None
+    return context.get(_active)
+
+
+def _lanes(awaits: List[Tuple[str, float, float]]) -> List[List[Tuple[str, float, float]]]:
+    """Split intervals into lanes of non-overlapping ones (speedscope needs nesting)."""
+    lanes: List[List[Tuple[str, float, float]]] = []
+    for event in sorted(awaits, key=lambda e: e[1]):
+        for lane in lanes:
+            if lane[-1][2] <= event[1]:
+                lane.append(event)
+                break
+        else:
+            lanes.append([event])
+    return lanes
+
+
+def should_profile(headers: Mapping[str, str]) -> bool:
+    settings = get_settings()
+    if settings.PROFILING_HEADER_ENABLED and headers.get(PROFILE_HEADER) == '1':
+        return True
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def request_id(headers: Mapping[str, str]) -> str:
+    """The client's X-Request-Id when it is safe to use as a file name, else a new id."""
+    candidate = headers.get(REQUEST_ID_HEADER, '')
+    return candidate if _REQUEST_ID_RE.fullmatch(candidate) else uuid4().hex
+
+
+@contextlib.contextmanager
+def profile_request(request_id: str) -> Iterator[Profile]:
+    """Profile everything run in this context (and tasks it spawns) until exit."""
+    settings = get_settings()
+    profile = Profile(request_id, asyncio.get_running_loop(), settings.PROFILING_INTERVAL_MS / 1000)
+    token = _active.set(profile)
+    _sampler.add(profile)
+    try:
+        yield profile
+    finally:
+        _sampler.remove(profile)
+        _active.reset(token)
+        profile.finished = time.perf_counter()
+        path = _write(profile, Path(settings.PROFILING_DIR))
+        logger.info('Profile %s written to %s %s', request_id, path, profile.summary())
+
+
+@contextlib.contextmanager
+def await_span(what: str) -> Iterator[None]:
+    """Record wall-clock time awaiting `what` (e.g. ``redis.GET``) in the active profile."""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.awaits.append((what, started, time.perf_counter()))
+
+
+def _write(profile: Profile, directory: Path) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{profile.request_id}.speedscope.json'
+    path.write_text(json.dumps(profile.to_speedscope()))
+    return path
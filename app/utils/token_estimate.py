@@ -1,5 +1,24 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict
+
 import tiktoken
 
+FALLBACK_ENCODING = "cl100k_base"
+
+
+@lru_cache
+def get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:  # model unknown to this tiktoken version
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
 def count_tokens(text: str, model: str = "gpt-4") -> int:
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
\ No newline at end of file
+    return len(get_encoding(model).encode(text))
+
+
+def count_message_tokens(message: Dict[str, Any], model: str = "gpt-4") -> int:
+    """Approximate prompt cost of one chat message (its compact JSON form)."""
+    return count_tokens(json.dumps(message, separators=(",", ":"), ensure_ascii=False), model)
@@ -0,0 +1,138 @@
+"""
+Compact encoding of tool results for the LLM (and for tool memory, which is
+replayed on later turns).
+
+  • markdown emphasis, emoji and blank lines are stripped from text
+  • repeated field values are dropped (e.g. ``performance_summary`` ==
+    ``summary``); list items are never deduplicated, so the model always sees
+    every item a list has (or an explicit ``…+N more``)
+  • lists of uniform dicts become ``{"cols": [...], "rows": [[...], ...]}``
+  • floats are rounded, JSON is written without whitespace / ASCII escapes
+  • if the result is still above the tool’s token budget, the longest list
+    is halved repeatedly and ends with an ``…+N more`` marker
+"""
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.token_estimate import count_tokens
+
+FLOAT_DIGITS = 4
+MIN_DEDUP_CHARS = 16  # shorter strings (labels, "cash") may legitimately repeat
+
+_MARKDOWN_RE = re.compile(r'\*\*|__|`')
+_DROP = object()
+
+
+class _Elision(str):
+    """Trailing list marker standing in for `count` dropped items."""
+
+    def __new__(cls, count: int) -> '_Elision':
+        obj = super().__new__(cls, f'…+{count} more')
+        obj.count = count
+        return obj
+
+
+def encode_tool_result(
+        result: Dict[str, Any],
+        budget: int,
+        model: str = 'gpt-4',
+        omit: Iterable[str] = (),
+) -> str:
+    """
+    Compact JSON for `result` within roughly `budget` tokens.  `omit` lists
+    dotted field paths (``payload.allocation_summary``) the LLM doesn’t need.
+    `result` itself is not modified.
+    """
+    compact = _compact(_without(result, set(omit)), seen=set())
+    text = _dumps(compact)
+    while count_tokens(text, model) > budget and _halve_longest_list(compact):
+        text = _dumps(compact)
+    return text
+
+
+def _without(value: Dict[str, Any], paths: set[str], prefix: str = '') -> Dict[str, Any]:
+    out = {}
+    for key, item in value.items():
+        path = f'{prefix}{key}'
+        if path in paths:
+            continue
+        out[key] = _without(item, paths, f'{path}.') if isinstance(item, dict) else item
+    return out
+
+
+def _compact(value: Any, seen: Optional[set[str]], field: bool = False) -> Any:
+    """`seen`: long strings already emitted as field values (None inside lists: no dedup)."""
+    if isinstance(value, str):
+        text = _plain_text(value)
+        if field and seen is not None and len(text) >= MIN_DEDUP_CHARS:
+            if text in seen:
+                return _DROP
+            seen.add(text)
+        return text
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    if isinstance(value, dict):
+        items = ((k, _compact(v, seen, field=True)) for k, v in value.items())
+        return {k: v for k, v in items if v is not _DROP}
+    if isinstance(value, (list, tuple)):
+        if table := _as_table(value):
+            return table
+        return [_compact(item, None) for item in value]
+    return value
+
+
+def _as_table(items) -> Optional[Dict[str, List[Any]]]:
+    if len(items) < 2 or not all(isinstance(i, dict) for i in items):
+        return None
+    cols = list(items[0])
+    if any(list(i) != cols for i in items):
+        return None
+    rows = [[_compact(i[c], None) for c in cols] for i in items]  # cells may repeat
+    return {'cols': cols, 'rows': rows}
+
+
+def _plain_text(text: str) -> str:
+    text = _MARKDOWN_RE.sub('', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) not in ('So', 'Cs'))
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _halve_longest_list(value: Any) -> bool:
+    """Truncate the longest list in `value` in place; False if nothing is left to cut."""
+    longest: Optional[List[Any]] = None
+    for lst in _lists(value):
+        if _real_len(lst) > 1 and (longest is None or _real_len(lst) > _real_len(longest)):
+            longest = lst
+    if longest is None:
+        return False
+
+    dropped = longest[-1].count if longest and isinstance(longest[-1], _Elision) else 0
+    items = longest[:_real_len(longest)]
+    keep = (len(items) + 1) // 2
+    longest[:] = [*items[:keep], _Elision(dropped + len(items) - keep)]
+    return True
+
+
+def _lists(value: Any) -> Iterable[List[Any]]:
+    if isinstance(value, list):
+        yield value
+        for item in value:
+            yield from _lists(item)
+    elif isinstance(value, dict) and value.keys() == {'cols', 'rows'}:
+        yield value['rows']  # drop whole rows, never columns
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _lists(item)
+
+
+def _real_len(lst: List[Any]) -> int:
+    return len(lst) - (1 if lst and isinstance(lst[-1], _Elision) else 0)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
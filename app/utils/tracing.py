@@ -0,0 +1,83 @@
+"""
+Per-request timing spans.
+
+A `Trace` is started per HTTP request (middleware) and carried in a
+ContextVar, so `span()` anywhere below – including in asyncio tasks spawned
+by the request – records into it.  Every span is also observed in the
+``chat_stage_duration_seconds`` histogram (labels: stage, model).  The
+trace is returned to the client as a ``Server-Timing`` header and logged
+with the session id.
+
+`span()` outside a request is a no-op.
+"""
+from __future__ import annotations
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.utils.metrics import STAGE_SECONDS
+
+_current: ContextVar[Optional['Trace']] = ContextVar('trace', default=None)
+
+
+class Trace:
+    def __init__(self, **labels: str) -> None:
+        self.labels: Dict[str, str] = dict(labels)
+        self.spans: List[Tuple[str, float]] = []  # (stage, seconds), in completion order
+        self.started = time.perf_counter()
+
+    def totals(self) -> Dict[str, Tuple[int, float]]:
+        """stage → (count, total seconds), in first-seen order."""
+        out: Dict[str, Tuple[int, float]] = {}
+        for stage, seconds in self.spans:
+            count, total = out.get(stage, (0, 0.0))
+            out[stage] = (count + 1, total + seconds)
+        return out
+
+    def server_timing(self) -> str:
+        parts = [f'{stage};dur={total * 1000:.1f}' for stage, (_count, total) in self.totals().items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(parts)
+
+    def log_line(self) -> str:
+        labels = ' '.join(f'{k}={v}' for k, v in self.labels.items())
+        stages = ' '.join(f'{stage}={total * 1000:.1f}ms' for stage, (_c, total) in self.totals().items())
+        return f'{labels} {stages}'.strip()
+
+
+@contextlib.contextmanager
+def start_trace(**labels: str) -> Iterator[Trace]:
+    trace = Trace(**labels)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def set_labels(**labels: str) -> None:
+    """Attach labels (e.g. the session's model) to the current trace."""
+    if trace := _current.get():
+        trace.labels.update(labels)
+
+
+@contextlib.contextmanager
+def span(stage: str, model: Optional[str] = None) -> Iterator[None]:
+    """Time the block as `stage`; `model` overrides the trace's model label."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        trace.spans.append((stage, elapsed))
+        STAGE_SECONDS.observe(elapsed, stage=stage, model=model or trace.labels.get('model', ''))
@@ -0,0 +1,245 @@
+"""
+Fake OpenAI-compatible chat completions server for benchmarks.
+
+  • ``POST /v1/chat/completions`` – answers after a configurable latency
+    (base + jitter + per output token); streams SSE chunks when
+    ``stream=true``
+  • scripted replies: the last user message is matched against a list of
+    rules (regex → tool call or text); after a ``tool`` message it always
+    answers in text, like the real model does
+  • returns ``usage`` and ``x-ratelimit-*`` headers so the client-side rate
+    limiter behaves as in production
+  • ``GET /v1/models`` (used by the warm-up) and ``GET /stats``
+
+    python -m bench.fake_openai --port 8600 --latency-ms 400 --per-token-ms 15
+    python -m bench.fake_openai --script rules.json
+
+A script is a JSON list of rules, first match wins::
+
+    [{"match": "diversif", "tool": "analyze_performance", "arguments": {}},
+     {"match": "hello", "content": "Hi! How can I help with your portfolio?"}]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_SCRIPT: List[Dict[str, Any]] = [
+    {'match': r'diversif|spread|concentrat', 'tool': 'analyze_performance', 'arguments': {}},
+    {'match': r'cost|expensive|saving money', 'tool': 'find_fee_optimizations', 'arguments': {}},
+    {
+        'match': r'safer|less risk|cautious',
+        'tool': 'rebalance_portfolio',
+        'arguments': {'target_allocations': {'equities': 40, 'bonds': 50, 'cash': 10}},
+    },
+]
+DEFAULT_ANSWER = (
+    'Here is a short, general answer: keep costs low, stay diversified across asset classes '
+    'and rebalance when your allocation drifts more than a few percent from its target.'
+)
+TOOL_ANSWER = (
+    'Based on the numbers above, your portfolio is broadly on track. The main points are '
+    'summarised in the result; let me know if you would like to act on any of them.'
+)
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency_ms: float = 300.0  # time to first token
+    jitter_ms: float = 100.0  # uniform ± around latency_ms
+    per_token_ms: float = 10.0  # per output token (also the SSE chunk interval)
+    error_rate: float = 0.0  # fraction of requests answered with a 500
+    script: List[Dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_SCRIPT))
+
+    def __post_init__(self) -> None:
+        self._rules = [(re.compile(rule['match'], re.IGNORECASE), rule) for rule in self.script]
+
+    def reply_for(self, messages: List[Dict[str, Any]], tools_offered: bool) -> Dict[str, Any]:
+        """The scripted assistant message for `messages`."""
+        if messages and messages[-1].get('role') == 'tool':
+            return {'role': 'assistant', 'content': TOOL_ANSWER}
+        prompt = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+        for pattern, rule in self._rules:
+            if not pattern.search(prompt):
+                continue
+            if 'tool' in rule and tools_offered:
+                return {
+                    'role': 'assistant',
+                    'content': None,
+                    'tool_calls': [{
+                        'id': f'call_{uuid4().hex[:24]}',
+                        'type': 'function',
+                        'function': {'name': rule['tool'], 'arguments': json.dumps(rule.get('arguments', {}))},
+                    }],
+                }
+            if 'content' in rule:
+                return {'role': 'assistant', 'content': rule['content']}
+        return {'role': 'assistant', 'content': DEFAULT_ANSWER}
+
+
+def create_app(config: Optional[FakeOpenAIConfig] = None) -> FastAPI:
+    config = config or FakeOpenAIConfig()
+    app = FastAPI(title='fake-openai')
+    app.state.config = config
+    app.state.calls = Counter()
+
+    @app.get('/v1/models')
+    async def models() -> dict:
+        return {'object': 'list', 'data': [{'id': 'gpt-4', 'object': 'model', 'owned_by': 'bench'}]}
+
+    @app.get('/stats')
+    async def stats() -> dict:
+        return dict(app.state.calls)
+
+    @app.post('/v1/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get('model', 'gpt-4')
+        messages = body.get('messages', [])
+        headers = _rate_limit_headers()
+
+        await asyncio.sleep(_first_token_delay(config))
+        if random.random() < config.error_rate:
+            app.state.calls['error'] += 1
+            return JSONResponse(
+                {'error': {'message': 'injected failure', 'type': 'server_error'}},
+                status_code=500,
+                headers=headers,
+            )
+
+        message = config.reply_for(messages, tools_offered=bool(body.get('tools')))
+        app.state.calls['tool_call' if message.get('tool_calls') else 'text'] += 1
+        usage = _usage(messages, message)
+
+        if body.get('stream'):
+            app.state.calls['stream'] += 1
+            return StreamingResponse(
+                _stream(model, message, usage, config),
+                media_type='text/event-stream',
+                headers=headers,
+            )
+
+        await asyncio.sleep(usage['completion_tokens'] * config.per_token_ms / 1000)
+        return JSONResponse(
+            {
+                'id': f'chatcmpl-{uuid4().hex}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': message,
+                    'finish_reason': 'tool_calls' if message.get('tool_calls') else 'stop',
+                }],
+                'usage': usage,
+            },
+            headers=headers,
+        )
+
+    return app
+
+
+async def _stream(model: str, message: Dict[str, Any], usage: Dict[str, int], config: FakeOpenAIConfig) -> AsyncIterator[str]:
+    chunk_id = f'chatcmpl-{uuid4().hex}'
+    created = int(time.time())
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            'id': chunk_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+        return f'data: {json.dumps(payload)}\n\n'
+
+    yield chunk({'role': 'assistant', 'content': ''})
+    if tool_calls := message.get('tool_calls'):
+        for index, call in enumerate(tool_calls):
+            yield chunk({'tool_calls': [{'index': index, **call}]})
+        finish = 'tool_calls'
+    else:
+        for token in _tokens(message['content']):
+            await asyncio.sleep(config.per_token_ms / 1000)
+            yield chunk({'content': token})
+        finish = 'stop'
+    yield chunk({}, finish_reason=finish)
+    yield 'data: [DONE]\n\n'
+
+
+def _first_token_delay(config: FakeOpenAIConfig) -> float:
+    return max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+
+
+def _tokens(text: str) -> List[str]:
+    """Rough tokenisation: words with their leading space."""
+    return re.findall(r'\s*\S+', text or '')
+
+
+def _usage(messages: List[Dict[str, Any]], message: Dict[str, Any]) -> Dict[str, int]:
+    prompt = len(json.dumps(messages)) // 4
+    if message.get('tool_calls'):
+        completion = len(json.dumps(message['tool_calls'])) // 4
+    else:
+        completion = len(_tokens(message['content']))
+    return {'prompt_tokens': prompt, 'completion_tokens': completion, 'total_tokens': prompt + completion}
+
+
+def _rate_limit_headers() -> Dict[str, str]:
+    # a generous, never-exhausted budget: the bench measures the service, not quota waits
+    return {
+        'x-ratelimit-limit-requests': '10000',
+        'x-ratelimit-remaining-requests': '9999',
+        'x-ratelimit-reset-requests': '6ms',
+        'x-ratelimit-limit-tokens': '10000000',
+        'x-ratelimit-remaining-tokens': '9999000',
+        'x-ratelimit-reset-tokens': '6ms',
+    }
+
+
+def load_script(path: Path) -> List[Dict[str, Any]]:
+    rules = json.loads(path.read_text())
+    for rule in rules:
+        if 'match' not in rule or not ({'tool', 'content'} & rule.keys()):
+            raise ValueError(f'script rule needs "match" and "tool" or "content": {rule}')
+    return rules
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency-ms', type=float, default=300.0, help='time to first token')
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--per-token-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--script', type=Path, help='JSON list of reply rules')
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        per_token_ms=args.per_token_ms,
+        error_rate=args.error_rate,
+        script=load_script(args.script) if args.script else list(DEFAULT_SCRIPT),
+    )
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible server for benchmarks')
+    parser.add_argument('--port', type=int, default=8600)
+    add_arguments(parser)
+    cli_args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(cli_args)), host='127.0.0.1', port=cli_args.port, log_level='warning')
@@ -0,0 +1,616 @@
+"""
+Minimal in-memory Redis stand-in speaking RESP2, for benchmarks.
+
+Implements exactly the commands the service uses (strings, lists, hashes,
+sorted sets, streams with consumer groups, key expiry, MULTI/EXEC
+pipelines, pub/sub, and EVAL of the known lock-release script) and counts
+every command it executes, so a benchmark can report Redis round trips /
+ops per request.
+
+    python -m bench.fake_redis --port 6390
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import logging
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.jobs import RECORD_SCRIPT
+from app.services.single_flight import EXTEND_LOCK_SCRIPT, RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+_SCRIPTS = {
+    ' '.join(RELEASE_LOCK_SCRIPT.split()): 'release_lock',
+    ' '.join(EXTEND_LOCK_SCRIPT.split()): 'extend_lock',
+    ' '.join(RECORD_SCRIPT.split()): 'record_job_result',
+}
+
+
+class RespError(Exception):
+    pass
+
+
+class Status(str):
+    """Simple-string reply (``+OK``)."""
+
+
+class Store:
+    def __init__(self) -> None:
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+
+    def get(self, key: bytes, kind: type, create: bool = False) -> Any:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.delete(key)
+        value = self.data.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = self.data[key] = kind()
+        elif not isinstance(value, kind):
+            raise RespError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def set(self, key: bytes, value: Any, ttl: Optional[float] = None) -> None:
+        self.data[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + ttl
+
+    def delete(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def exists(self, key: bytes) -> bool:
+        return self.get(key, object) is not None
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store = Store()
+        self.ops: Counter[str] = Counter()
+        self.connections = 0
+        self._subscribers: Dict[bytes, Set['_Connection']] = defaultdict(set)
+        self._stream_added = asyncio.Event()  # replaced after every XADD; wakes blocked readers
+
+    # ─ server ──────────────────────────────────────────────────────────────
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        conn = _Connection(self, writer)
+        try:
+            while True:
+                try:
+                    args = await _read_command(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                reply = conn.dispatch(args)
+                if asyncio.iscoroutine(reply):  # blocking read (XREADGROUP … BLOCK)
+                    reply = await reply
+                writer.write(_encode(reply))
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass  # event loop shutting down with the client still connected
+        finally:
+            for channel in conn.channels:
+                self._subscribers[channel].discard(conn)
+            writer.close()
+
+    def reset_stats(self) -> None:
+        self.ops.clear()
+
+    # ─ commands ────────────────────────────────────────────────────────────
+    def execute(self, conn: '_Connection', name: str, args: List[bytes]) -> Any:
+        self.ops[name] += 1
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            raise RespError(f"ERR unknown command '{name}'")
+        return handler(conn, *args)
+
+    def cmd_ping(self, _conn, message: bytes = b'PONG'):
+        return Status(message.decode())
+
+    def cmd_client(self, _conn, *_args):
+        return Status('OK')
+
+    def cmd_select(self, _conn, _db):
+        return Status('OK')
+
+    def cmd_flushall(self, _conn, *_args):
+        self.store = Store()
+        return Status('OK')
+
+    cmd_flushdb = cmd_flushall
+
+    def cmd_info(self, _conn, *_args):
+        return b'# Server\r\nredis_version:7.2.0-fake\r\n'
+
+    def cmd_get(self, _conn, key):
+        return self.store.get(key, bytes)
+
+    def cmd_set(self, _conn, key, value, *options):
+        opts = [o.upper() for o in options]
+        ttl = None
+        for flag, scale in ((b'EX', 1.0), (b'PX', 0.001)):
+            if flag in opts:
+                ttl = float(options[opts.index(flag) + 1]) * scale
+        exists = self.store.exists(key)
+        if (b'NX' in opts and exists) or (b'XX' in opts and not exists):
+            return None
+        self.store.set(key, value, ttl)
+        return Status('OK')
+
+    def cmd_getset(self, _conn, key, value):
+        old = self.store.get(key, bytes)
+        self.store.set(key, value)
+        return old
+
+    def cmd_del(self, _conn, *keys):
+        return sum(self.store.delete(k) for k in keys)
+
+    def cmd_exists(self, _conn, *keys):
+        return sum(self.store.exists(k) for k in keys)
+
+    def cmd_expire(self, _conn, key, seconds, *_flags):
+        if not self.store.exists(key):
+            return 0
+        self.store.expires[key] = time.monotonic() + float(seconds)
+        return 1
+
+    def cmd_pexpire(self, conn, key, ms, *flags):
+        return self.cmd_expire(conn, key, float(ms) / 1000, *flags)
+
+    def cmd_ttl(self, _conn, key):
+        if not self.store.exists(key):
+            return -2
+        deadline = self.store.expires.get(key)
+        return -1 if deadline is None else max(0, round(deadline - time.monotonic()))
+
+    def cmd_pttl(self, _conn, key):
+        if not self.store.exists(key):
+            return -2
+        deadline = self.store.expires.get(key)
+        return -1 if deadline is None else max(0, round((deadline - time.monotonic()) * 1000))
+
+    def cmd_keys(self, _conn, pattern):
+        return [k for k in list(self.store.data) if self.store.exists(k) and fnmatch.fnmatchcase(k, pattern)]
+
+    # lists
+    def cmd_rpush(self, _conn, key, *values):
+        lst = self.store.get(key, list, create=True)
+        lst.extend(values)
+        return len(lst)
+
+    def cmd_llen(self, _conn, key):
+        return len(self.store.get(key, list) or [])
+
+    def cmd_lindex(self, _conn, key, index):
+        lst = self.store.get(key, list) or []
+        i = int(index)
+        return lst[i] if -len(lst) <= i < len(lst) else None
+
+    def cmd_lrange(self, _conn, key, start, stop):
+        lst = self.store.get(key, list) or []
+        return lst[slice(*_range(len(lst), int(start), int(stop)))]
+
+    # hashes
+    def cmd_hset(self, _conn, key, *pairs):
+        h = self.store.get(key, dict, create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in h
+            h[field] = value
+        return added
+
+    def cmd_hget(self, _conn, key, field):
+        return (self.store.get(key, dict) or {}).get(field)
+
+    def cmd_hgetall(self, _conn, key):
+        return [item for pair in (self.store.get(key, dict) or {}).items() for item in pair]
+
+    def cmd_hdel(self, _conn, key, *fields):
+        h = self.store.get(key, dict) or {}
+        return sum(h.pop(f, None) is not None for f in fields)
+
+    def cmd_hsetnx(self, _conn, key, field, value):
+        h = self.store.get(key, dict, create=True)
+        if field in h:
+            return 0
+        h[field] = value
+        return 1
+
+    def cmd_hmget(self, _conn, key, *fields):
+        h = self.store.get(key, dict) or {}
+        return [h.get(f) for f in fields]
+
+    def cmd_hincrby(self, _conn, key, field, amount):
+        h = self.store.get(key, dict, create=True)
+        h[field] = str(int(h.get(field, b'0')) + int(amount)).encode()
+        return int(h[field])
+
+    # sorted sets (member → score)
+    def cmd_zadd(self, _conn, key, *pairs):
+        z = self.store.get(key, _ZSet, create=True)
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in z
+            z[member] = float(score)
+        return added
+
+    def cmd_zcard(self, _conn, key):
+        return len(self.store.get(key, _ZSet) or {})
+
+    def cmd_zrange(self, _conn, key, start, stop, *_options):
+        z = self.store.get(key, _ZSet) or _ZSet()
+        ordered = z.ordered()
+        return ordered[slice(*_range(len(ordered), int(start), int(stop)))]
+
+    def cmd_zpopmin(self, _conn, key, count=b'1'):
+        z = self.store.get(key, _ZSet) or _ZSet()
+        out = []
+        for member in z.ordered()[:int(count)]:
+            out.extend([member, _score(z.pop(member))])
+        return out
+
+    # streams
+    def cmd_xadd(self, _conn, key, *args):
+        i, maxlen = 0, None
+        if args[i].upper() == b'NOMKSTREAM':
+            i += 1
+        if args[i].upper() == b'MAXLEN':
+            i += 2 if args[i + 1] in (b'~', b'=') else 1
+            maxlen, i = int(args[i]), i + 1
+        stream = self.store.get(key, _Stream, create=True)
+        entry_id = stream.add(args[i], list(args[i + 1:]))
+        if maxlen is not None:
+            while len(stream.entries) > maxlen:
+                stream.entries.popitem(last=False)
+        self._stream_added.set()
+        self._stream_added = asyncio.Event()
+        return _format_id(entry_id)
+
+    def cmd_xlen(self, _conn, key):
+        return len((self.store.get(key, _Stream) or _Stream()).entries)
+
+    def cmd_xdel(self, _conn, key, *ids):
+        stream = self.store.get(key, _Stream) or _Stream()
+        return sum(stream.entries.pop(_parse_id(i), None) is not None for i in ids)
+
+    def cmd_xgroup(self, _conn, sub, key, group, *args):
+        sub = sub.upper()
+        stream = self.store.get(key, _Stream, create=sub == b'CREATE' and b'MKSTREAM' in [a.upper() for a in args])
+        if stream is None:
+            raise RespError('ERR The XGROUP subcommand requires the key to exist')
+        if sub == b'CREATE':
+            if group in stream.groups:
+                raise RespError('BUSYGROUP Consumer Group name already exists')
+            stream.groups[group] = _Group(stream.last_id if args[0] == b'$' else _parse_id(args[0]))
+            return Status('OK')
+        if sub == b'DESTROY':
+            return int(stream.groups.pop(group, None) is not None)
+        g = self._group(stream, group)
+        if sub == b'CREATECONSUMER':
+            return _add(g.consumers, args[0])
+        if sub == b'DELCONSUMER':
+            dropped = [i for i, p in g.pending.items() if p[0] == args[0]]
+            for i in dropped:
+                del g.pending[i]
+            g.consumers.discard(args[0])
+            return len(dropped)
+        raise RespError(f'ERR unknown XGROUP subcommand {sub.decode()}')
+
+    def cmd_xreadgroup(self, _conn, *args):
+        opts = [a.upper() for a in args]
+        group, consumer = args[1], args[2]
+        count = int(args[opts.index(b'COUNT') + 1]) if b'COUNT' in opts else None
+        block = int(args[opts.index(b'BLOCK') + 1]) if b'BLOCK' in opts else None
+        streams_at = opts.index(b'STREAMS') + 1
+        keys_and_ids = args[streams_at:]
+        half = len(keys_and_ids) // 2
+        requests = list(zip(keys_and_ids[:half], keys_and_ids[half:]))
+
+        def read():
+            out = []
+            for key, start in requests:
+                stream = self.store.get(key, _Stream)
+                if stream is None:
+                    raise RespError('NOGROUP No such key or consumer group')
+                entries = self._group(stream, group).read(stream, consumer, start, count)
+                if entries or start != b'>':
+                    out.append([key, [[_format_id(i), fields] for i, fields in entries]])
+            return out or None
+
+        reply = read()
+        if reply is not None or block is None:
+            return reply
+
+        async def wait():
+            try:
+                await asyncio.wait_for(self._stream_added.wait(), block / 1000 if block else None)
+            except asyncio.TimeoutError:
+                return None
+            return read()
+        return wait()
+
+    def cmd_xack(self, _conn, key, group, *ids):
+        stream = self.store.get(key, _Stream) or _Stream()
+        g = stream.groups.get(group)
+        return sum(g.pending.pop(_parse_id(i), None) is not None for i in ids) if g else 0
+
+    def cmd_xpending(self, _conn, key, group, *args):
+        stream = self.store.get(key, _Stream)
+        if stream is None:
+            raise RespError('NOGROUP No such key or consumer group')
+        g = self._group(stream, group)
+        if args:
+            raise RespError('ERR fake redis only supports the XPENDING summary form')
+        if not g.pending:
+            return [0, None, None, None]
+        per_consumer = Counter(p[0] for p in g.pending.values())
+        ids = sorted(g.pending)
+        return [len(ids), _format_id(ids[0]), _format_id(ids[-1]),
+                [[c, str(n).encode()] for c, n in sorted(per_consumer.items())]]
+
+    def cmd_xautoclaim(self, _conn, key, group, consumer, min_idle, start, *args):
+        opts = [a.upper() for a in args]
+        count = int(args[opts.index(b'COUNT') + 1]) if b'COUNT' in opts else 100
+        justid = b'JUSTID' in opts
+        stream = self.store.get(key, _Stream)
+        if stream is None:
+            raise RespError('NOGROUP No such key or consumer group')
+        g = self._group(stream, group)
+        now = time.monotonic()
+        claimed, deleted, cursor = [], [], (0, 0)
+        candidates = sorted(i for i in g.pending if i >= _parse_id(start))
+        for entry_id in candidates:
+            if len(claimed) + len(deleted) >= count:
+                cursor = entry_id
+                break
+            owner, delivered_at, deliveries = g.pending[entry_id]
+            if (now - delivered_at) * 1000 < int(min_idle):
+                continue
+            if entry_id not in stream.entries:
+                del g.pending[entry_id]
+                deleted.append(_format_id(entry_id))
+                continue
+            g.pending[entry_id] = [consumer, now, deliveries + (0 if justid else 1)]
+            g.consumers.add(consumer)
+            claimed.append(_format_id(entry_id) if justid else [_format_id(entry_id), stream.entries[entry_id]])
+        return [_format_id(cursor), claimed, deleted]
+
+    def _group(self, stream: '_Stream', group: bytes) -> '_Group':
+        if group not in stream.groups:
+            raise RespError('NOGROUP No such key or consumer group')
+        return stream.groups[group]
+
+    # scripting
+    def cmd_eval(self, _conn, script, numkeys, *rest):
+        keys, argv = rest[:int(numkeys)], rest[int(numkeys):]
+        name = _SCRIPTS.get(' '.join(script.decode().split()))
+        if name == 'release_lock':
+            if self.store.get(keys[0], bytes) == argv[0]:
+                return int(self.store.delete(keys[0]))
+            return 0
+        if name == 'extend_lock':
+            if self.store.get(keys[0], bytes) == argv[0]:
+                return self.cmd_pexpire(_conn, keys[0], argv[1])
+            return 0
+        if name == 'record_job_result':
+            job, finished, results = keys
+            index, result, counter, ttl, now = argv
+            if not self.cmd_hsetnx(_conn, finished, index, b'1'):
+                return 0
+            self.cmd_rpush(_conn, results, result)
+            self.cmd_hincrby(_conn, job, counter, b'1')
+            for key in keys:
+                self.cmd_expire(_conn, key, ttl)
+            total, done, failed = self.cmd_hmget(_conn, job, b'total', b'done', b'failed')
+            if total is not None and int(done or 0) + int(failed or 0) >= int(total):
+                self.cmd_hset(_conn, job, b'finished', now)
+            return 1
+        raise RespError('ERR fake redis only runs the scripts it knows')
+
+    # pub/sub
+    def cmd_publish(self, _conn, channel, message):
+        receivers = list(self._subscribers.get(channel, ()))
+        for receiver in receivers:
+            receiver.push([b'message', channel, message])
+        return len(receivers)
+
+    def cmd_subscribe(self, conn, *channels):
+        replies = []
+        for channel in channels:
+            conn.channels.add(channel)
+            self._subscribers[channel].add(conn)
+            replies.append([b'subscribe', channel, len(conn.channels)])
+        return _Multi(replies)
+
+    def cmd_unsubscribe(self, conn, *channels):
+        replies = []
+        for channel in channels or list(conn.channels):
+            conn.channels.discard(channel)
+            self._subscribers[channel].discard(conn)
+            replies.append([b'unsubscribe', channel, len(conn.channels)])
+        return _Multi(replies)
+
+
+class _Stream:
+    def __init__(self) -> None:
+        self.entries: 'OrderedDict[Tuple[int, int], List[bytes]]' = OrderedDict()
+        self.last_id: Tuple[int, int] = (0, 0)
+        self.groups: Dict[bytes, _Group] = {}
+
+    def add(self, requested: bytes, fields: List[bytes]) -> Tuple[int, int]:
+        if requested == b'*':
+            ms = int(time.time() * 1000)
+            entry_id = (ms, 0) if ms > self.last_id[0] else (self.last_id[0], self.last_id[1] + 1)
+        else:
+            entry_id = _parse_id(requested)
+            if entry_id <= self.last_id:
+                raise RespError('ERR The ID specified in XADD is equal or smaller than the target stream top item')
+        self.entries[entry_id] = fields
+        self.last_id = entry_id
+        return entry_id
+
+
+class _Group:
+    def __init__(self, last_delivered: Tuple[int, int]) -> None:
+        self.last_delivered = last_delivered
+        self.pending: Dict[Tuple[int, int], list] = {}  # id → [consumer, delivered at, deliveries]
+        self.consumers: Set[bytes] = set()
+
+    def read(self, stream: _Stream, consumer: bytes, start: bytes, count: Optional[int]) -> list:
+        self.consumers.add(consumer)
+        if start != b'>':  # the consumer's own pending entries after `start`
+            after = _parse_id(start)
+            ids = sorted(i for i, p in self.pending.items() if p[0] == consumer and i > after)[:count]
+            return [(i, stream.entries.get(i)) for i in ids]
+        out = []
+        for entry_id, fields in stream.entries.items():
+            if entry_id <= self.last_delivered:
+                continue
+            if count is not None and len(out) >= count:
+                break
+            out.append((entry_id, fields))
+            self.pending[entry_id] = [consumer, time.monotonic(), 1]
+            self.last_delivered = entry_id
+        return out
+
+
+class _ZSet(dict):
+    def ordered(self) -> List[bytes]:
+        return [m for m, _ in sorted(self.items(), key=lambda item: (item[1], item[0]))]
+
+
+class _Multi(list):
+    """Several top-level replies for one command (SUBSCRIBE a b …)."""
+
+
+class _Connection:
+    def __init__(self, server: FakeRedis, writer: asyncio.StreamWriter) -> None:
+        self.server = server
+        self.writer = writer
+        self.channels: Set[bytes] = set()
+        self.queued: Optional[List[List[bytes]]] = None  # inside MULTI
+
+    def dispatch(self, args: List[bytes]) -> Any:
+        name = args[0].decode().upper()
+        try:
+            if name == 'MULTI':
+                self.queued = []
+                return Status('OK')
+            if name == 'EXEC':
+                queued, self.queued = self.queued or [], None
+                return [self._safe(cmd[0].decode().upper(), cmd[1:]) for cmd in queued]
+            if name == 'DISCARD':
+                self.queued = None
+                return Status('OK')
+            if name == 'WATCH' or name == 'UNWATCH':
+                return Status('OK')
+            if self.queued is not None:
+                self.queued.append(args)
+                return Status('QUEUED')
+            if self.channels and name == 'PING':
+                return [b'pong', b'']
+            return self.server.execute(self, name, args[1:])
+        except RespError as exc:
+            return exc
+        except (TypeError, ValueError, IndexError) as exc:
+            return RespError(f'ERR wrong arguments for {name}: {exc}')
+
+    def _safe(self, name: str, args: List[bytes]) -> Any:
+        try:
+            return self.server.execute(self, name, args)
+        except RespError as exc:
+            return exc
+
+    def push(self, message: List[bytes]) -> None:
+        self.writer.write(_encode(message))
+
+
+async def _read_command(reader: asyncio.StreamReader) -> List[bytes]:
+    line = await reader.readuntil(b'\r\n')
+    if not line.startswith(b'*'):  # inline command (redis-cli / telnet)
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readuntil(b'\r\n')
+        size = int(header[1:-2])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, _Multi):
+        return b''.join(_encode(v) for v in value)
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return f'-{value}\r\n'.encode()
+    if isinstance(value, Status):
+        return f'+{value}\r\n'.encode()
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return f':{value}\r\n'.encode()
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        return b'*%d\r\n' % len(value) + b''.join(_encode(v) for v in value)
+    raise TypeError(f'cannot encode {type(value).__name__}')
+
+
+def _range(length: int, start: int, stop: int) -> tuple:
+    """Redis inclusive (possibly negative) range → Python slice bounds."""
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop = length + stop
+    return start, stop + 1
+
+
+def _parse_id(raw: bytes) -> Tuple[int, int]:
+    if raw in (b'-', b'0'):
+        return 0, 0
+    ms, _, seq = raw.partition(b'-')
+    return int(ms), int(seq or 0)
+
+
+def _format_id(entry_id: Tuple[int, int]) -> bytes:
+    return f'{entry_id[0]}-{entry_id[1]}'.encode()
+
+
+def _add(members: Set[bytes], member: bytes) -> int:
+    added = member not in members
+    members.add(member)
+    return int(added)
+
+
+def _score(value: float) -> bytes:
+    return repr(value).encode() if not value.is_integer() else str(int(value)).encode()
+
+
+async def _main(port: int) -> None:
+    fake = FakeRedis()
+    server = await fake.start(port=port)
+    logger.info('Fake Redis listening on %s', server.sockets[0].getsockname())
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='In-memory Redis stand-in for benchmarks')
+    parser.add_argument('--port', type=int, default=6390)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args().port))
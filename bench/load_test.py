@@ -0,0 +1,332 @@
+"""
+End-to-end load test: the real FastAPI app against a fake OpenAI server and
+an in-memory Redis stand-in, driven by multi-turn chat sessions.
+
+    python -m bench.load_test --rps 20 --duration 60
+    python -m bench.load_test --rps 50 --workers 4 --latency-ms 800 --json out.json
+    python -m bench.load_test --mix chat=40,fees=20,recap=10 --app-env COMPLETION_CACHE_ENABLED=false
+
+The app runs as a ``uvicorn`` subprocess pointed (via env) at both fakes,
+which run in this process so their counters can be read directly.  Turns
+are sent open-loop at `--rps` (the schedule doesn't slow down when the
+service does); each arrival goes to an idle session, and turns within a
+session are sequential, as from a real user.  Latency is measured from the
+scheduled send time, so client-side waits show up in the percentiles
+rather than hiding them.
+
+Reported: p50/p95/p99 overall and per scenario, throughput, HTTP status
+counts, OpenAI calls by kind and Redis commands (total, per turn, busiest).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+import uvicorn
+
+from bench.fake_openai import add_arguments, config_from_args, create_app
+from bench.fake_redis import FakeRedis
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# scenario → prompts (one is picked per turn); the comment says which path it exercises
+SCENARIOS: Dict[str, List[str]] = {
+    'recap': ['recap', 'give me a recap'],  # shortcut, reads tool memory
+    'why': ['why?', 'explain'],  # shortcut, reads the last tool record
+    'goal': [  # shortcut, goal → rebalance tool
+        'I am saving for a house in 3 years',
+        'I want to retire in 20 years',
+        'short-term savings for a holiday',
+    ],
+    'fees': ['What fees am I paying?', 'any cheaper funds?'],  # intent router → tool → LLM answer
+    'performance': ['How is my portfolio doing?', 'show my returns this year'],  # intent router → tool
+    'rebalance': ['Rebalance to 60% equities, 30% bonds, 10% cash', 'rebalance my portfolio'],
+    'llm_tool': ['Am I diversified enough?', 'Is my portfolio too expensive?'],  # LLM picks a tool
+    'chat': [  # LLM answers in text
+        'What is the difference between an ETF and an index fund?',
+        'Should I worry about inflation?',
+        'Explain dollar cost averaging to me',
+    ],
+}
+DEFAULT_MIX = {
+    'chat': 25, 'llm_tool': 15, 'fees': 15, 'performance': 15,
+    'rebalance': 10, 'recap': 10, 'goal': 5, 'why': 5,
+}
+FIRST_TURN = ('chat', 'fees', 'performance', 'llm_tool', 'goal')  # recap / why need history
+
+
+@dataclass
+class Result:
+    scenario: str
+    status: int  # 0 = transport error
+    latency: float  # seconds, from the scheduled send time
+    server_timing: str = ''
+
+
+@dataclass
+class Session:
+    id: str = field(default_factory=lambda: str(uuid4()))
+    turns: int = 0
+    busy: bool = False
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, mix: Dict[str, float], max_sessions: int, timeout: float) -> None:
+        self.base_url = base_url
+        self.mix = mix
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self.sessions: List[Session] = []
+        self.results: List[Result] = []
+        self.dropped = 0  # arrivals with every session busy
+
+    async def run(self, rps: float, duration: float) -> float:
+        """Send turns at `rps` for `duration` seconds; return the wall time until the last reply."""
+        limits = httpx.Limits(max_connections=self.max_sessions, max_keepalive_connections=self.max_sessions)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            tasks = []
+            for n in range(int(rps * duration)):
+                scheduled = started + n / rps
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                session = self._idle_session()
+                if session is None:
+                    self.dropped += 1
+                    continue
+                tasks.append(asyncio.create_task(self._turn(client, session, scheduled)))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - started
+
+    def _idle_session(self) -> Optional[Session]:
+        idle = [s for s in self.sessions if not s.busy]
+        if idle:
+            return random.choice(idle)
+        if len(self.sessions) < self.max_sessions:
+            self.sessions.append(Session())
+            return self.sessions[-1]
+        return None
+
+    def _pick_scenario(self, session: Session) -> str:
+        names = [n for n in self.mix if session.turns or n in FIRST_TURN]
+        return random.choices(names, weights=[self.mix[n] for n in names])[0]
+
+    async def _turn(self, client: httpx.AsyncClient, session: Session, scheduled: float) -> None:
+        session.busy = True
+        scenario = self._pick_scenario(session)
+        prompt = random.choice(SCENARIOS[scenario])
+        try:
+            response = await client.post('/chat', json={'text': prompt}, headers={'session-id': session.id})
+            status, timing = response.status_code, response.headers.get('server-timing', '')
+        except httpx.HTTPError:
+            status, timing = 0, ''
+        finally:
+            session.turns += 1
+            session.busy = False
+        self.results.append(Result(scenario, status, time.perf_counter() - scheduled, timing))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+def summarise(results: List[Result]) -> Dict[str, float]:
+    latencies = [r.latency * 1000 for r in results if r.status == 200]
+    return {
+        'count': len(results),
+        'ok': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(max(latencies, default=0.0), 1),
+    }
+
+
+def stage_means(results: List[Result]) -> Dict[str, float]:
+    """Mean Server-Timing duration per stage over successful turns."""
+    totals: Dict[str, List[float]] = defaultdict(list)
+    for r in results:
+        if r.status != 200:
+            continue
+        for part in filter(None, (p.strip() for p in r.server_timing.split(','))):
+            name, _, dur = part.partition(';dur=')
+            if dur:
+                totals[name].append(float(dur))
+    return {name: round(sum(v) / len(v), 1) for name, v in totals.items()}
+
+
+def build_report(
+        generator: LoadGenerator,
+        elapsed: float,
+        redis_ops: Counter,
+        openai_calls: Counter,
+) -> dict:
+    results = generator.results
+    by_scenario: Dict[str, List[Result]] = defaultdict(list)
+    for r in results:
+        by_scenario[r.scenario].append(r)
+    turns = max(len(results), 1)
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(sum(r.status == 200 for r in results) / elapsed, 2) if elapsed else 0.0,
+        'sessions': len(generator.sessions),
+        'dropped': generator.dropped,
+        'status': dict(sorted(Counter(r.status for r in results).items())),
+        'overall': summarise(results),
+        'scenarios': {name: summarise(rs) for name, rs in sorted(by_scenario.items())},
+        'stages_mean_ms': stage_means(results),
+        'openai_calls': dict(openai_calls),
+        'redis': {
+            'ops': sum(redis_ops.values()),
+            'ops_per_turn': round(sum(redis_ops.values()) / turns, 1),
+            'commands': dict(redis_ops.most_common()),
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['overall']['count']} turns in {report['elapsed_s']}s over {report['sessions']} sessions "
+          f"→ {report['throughput_rps']} ok/s (dropped {report['dropped']}), status {report['status']}")
+    print(f"\n{'scenario':<12}{'count':>7}{'ok':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, s in [('ALL', report['overall']), *report['scenarios'].items()]:
+        print(f"{name:<12}{s['count']:>7}{s['ok']:>6}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    print('\nmean stage time (ms):', ', '.join(f'{k}={v}' for k, v in report['stages_mean_ms'].items()))
+    print('openai calls:', report['openai_calls'])
+    redis = report['redis']
+    top = ', '.join(f'{k}={v}' for k, v in list(redis['commands'].items())[:10])
+    print(f"redis ops: {redis['ops']} ({redis['ops_per_turn']}/turn) – {top}")
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f'unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix[name] = float(weight or 1)
+    if not any(name in FIRST_TURN for name in mix):
+        raise SystemExit(f'the mix needs at least one of {", ".join(FIRST_TURN)} to open a session')
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _start_fake_openai(app) -> Tuple[uvicorn.Server, asyncio.Task, int]:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task, port
+
+
+def _start_app(args: argparse.Namespace, port: int, openai_port: int, redis_port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{openai_port}/v1',
+        'REDIS_URL': f'redis://127.0.0.1:{redis_port}/0',
+        'LOGGING_LEVEL': 'WARNING',
+    }
+    for item in args.app_env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    cmd = [
+        sys.executable, '-m', 'uvicorn', 'app.server.main:app',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log',
+    ]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+async def _wait_ready(base_url: str, app: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if app.poll() is not None:
+                raise SystemExit(f'app exited with code {app.returncode} before becoming ready')
+            try:
+                if (await client.get('/ready')).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit(f'app not ready after {timeout:.0f}s')
+
+
+async def main(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    fake_redis = FakeRedis()
+    redis_server = await fake_redis.start()
+    redis_port = redis_server.sockets[0].getsockname()[1]
+    fake_openai = create_app(config_from_args(args))
+    openai_server, openai_task, openai_port = await _start_fake_openai(fake_openai)
+
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    app = _start_app(args, port, openai_port, redis_port)
+    try:
+        await _wait_ready(base_url, app, args.ready_timeout)
+        fake_redis.reset_stats()  # warm-up traffic isn't part of the measurement
+        openai_calls = fake_openai.state.calls
+        openai_calls.clear()
+
+        generator = LoadGenerator(base_url, parse_mix(args.mix), args.sessions, args.timeout)
+        print(f'Sending {args.rps} turns/s for {args.duration}s to {base_url} ({args.workers} worker(s))…')
+        elapsed = await generator.run(args.rps, args.duration)
+        return build_report(generator, elapsed, Counter(fake_redis.ops), Counter(openai_calls))
+    finally:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        openai_server.should_exit = True
+        await openai_task
+        redis_server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the chat service against fake OpenAI + Redis')
+    parser.add_argument('--rps', type=float, default=10.0, help='turns sent per second (open loop)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to send for')
+    parser.add_argument('--sessions', type=int, default=200, help='max concurrent sessions')
+    parser.add_argument('--mix', help='scenario weights, e.g. chat=30,fees=20,recap=10')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers for the app')
+    parser.add_argument('--app-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app (repeatable)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='client timeout per turn')
+    parser.add_argument('--ready-timeout', type=float, default=120.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, help='also write the report here')
+    add_arguments(parser)  # fake OpenAI latency / script options
+    cli_args = parser.parse_args()
+
+    report = asyncio.run(main(cli_args))
+    print_report(report)
+    if cli_args.json:
+        cli_args.json.write_text(json.dumps(report, indent=2))
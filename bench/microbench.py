@@ -0,0 +1,271 @@
+"""
+Microbenchmarks for the portfolio tools, the data loader and history
+trimming, on generated portfolios (see `bench.synthetic_portfolio`).
+
+    python -m bench.microbench --preset medium --json medium-before.json
+    python -m bench.microbench --preset medium --compare medium-before.json
+    python -m bench.microbench --data-dir /tmp/portfolio-1m --only loader,analyze_performance
+
+Presets are generated once into ``bench/.data/<preset>-seed<seed>`` and
+reused.  Each case is run once to warm up, then `--repeat` times for
+timing (min / median / max), then once more under ``tracemalloc`` for its
+peak memory.  `--compare` prints the change against an earlier ``--json``
+file and exits non-zero when a median slows down by more than
+`--threshold` percent.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from bench.synthetic_portfolio import PortfolioSpec, generate
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_CACHE = Path(__file__).resolve().parent / '.data'
+
+PRESETS: Dict[str, PortfolioSpec] = {
+    'small': PortfolioSpec(funds=1_000, holdings=50, transactions=10_000, traded_funds=200),
+    'medium': PortfolioSpec(funds=10_000, holdings=200, transactions=1_000_000, traded_funds=2_000),
+    'large': PortfolioSpec(funds=100_000, holdings=1_000, transactions=10_000_000, traded_funds=20_000),
+}
+REBALANCE_TARGET = {'equities': 60, 'bonds': 30, 'cash': 10}
+HISTORY_WORDS = (
+    'fees performance rebalance bonds equities cash allocation returns house retirement pension '
+    'inflation isa sipp fund etf cheaper drift target risk volatility dividends'
+).split()
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]  # may return an awaitable
+
+
+def timed(case: Case, loop: asyncio.AbstractEventLoop, repeat: int, memory: bool) -> Dict[str, float]:
+    def call() -> Any:
+        result = case.run()
+        return loop.run_until_complete(result) if inspect.isawaitable(result) else result
+
+    call()  # warm-up: imports, lazy caches, tokenizer
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - started) * 1000)
+    out = {
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'max_ms': round(max(times), 3),
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            call()
+            out['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return out
+
+
+async def _history_fixture(history_turns: int, seed: int):
+    """A session with `history_turns` turns (every third one a tool call) in a fake Redis."""
+    from redis.asyncio import Redis
+
+    from app.models.tool_memory import ToolCallRecord
+    from app.services.history import MessageHistory, ToolMemory
+    from bench.fake_redis import FakeRedis
+
+    server = await FakeRedis().start()
+    redis = Redis(port=server.sockets[0].getsockname()[1])
+    rng = random.Random(seed)
+    history, memory = MessageHistory(redis, 'bench'), ToolMemory(redis, 'bench')
+
+    def sentence(words: int) -> str:
+        return ' '.join(rng.choices(HISTORY_WORDS, k=words)).capitalize() + '.'
+
+    messages: List[Dict[str, Any]] = []
+    for turn in range(history_turns):
+        messages.append({'role': 'user', 'content': sentence(12)})
+        messages.append({'role': 'assistant', 'content': ' '.join(sentence(15) for _ in range(4))})
+        if turn % 3 == 0:
+            await memory.set([ToolCallRecord(
+                tool_call_id=f'call_{turn}',
+                name=rng.choice(['analyze_performance', 'find_fee_optimizations', 'rebalance_portfolio']),
+                arguments='{}',
+                content=json.dumps({'summary': sentence(20)}),
+                summary=sentence(20),
+            )])
+    return server, history, memory, messages
+
+
+def build_cases(loop: asyncio.AbstractEventLoop, history_turns: int, seed: int) -> List[Case]:
+    # imported here: PORTFOLIO_DATA_DIR must be set before the first `get_settings()`
+    from app.data.latest_prices import compute_latest_prices
+    from app.data.load import load_portfolio_snapshot, portfolio_snapshot_version
+    from app.schema.tools import system_prompt
+    from app.services.history_index import HistoryIndexCache
+    from app.services.llm_agent import LLMPortfolioAgent
+
+    version = portfolio_snapshot_version()
+    portfolio = load_portfolio_snapshot(version)
+    latest_prices = compute_latest_prices(portfolio['transactions'])
+    _server, history, memory, messages = loop.run_until_complete(_history_fixture(history_turns, seed))
+
+    def agent(history_index: Optional[HistoryIndexCache]) -> LLMPortfolioAgent:
+        return LLMPortfolioAgent(
+            model='gpt-4',
+            history=history,
+            memory=memory,
+            holdings=portfolio['holdings'],
+            cash_balances=portfolio['cash_balances'],
+            accounts=portfolio['accounts'],
+            fund_metadata=portfolio['fund_metadata'],
+            transactions=portfolio['transactions'],
+            latest_prices=latest_prices,
+            history_index=history_index,  # no snapshot version → tool results aren't cached
+        )
+
+    recency, retrieval = agent(None), agent(HistoryIndexCache(max_sessions=1))
+    dispatcher = recency.tool_dispatcher
+    system = {'role': 'system', 'content': system_prompt}
+    prompt = 'How did my bonds perform compared to the fees I pay?'
+    tail = [{'role': 'user', 'content': prompt}]
+
+    return [
+        Case('loader', lambda: load_portfolio_snapshot.__wrapped__(version)),
+        Case('latest_prices', lambda: compute_latest_prices(portfolio['transactions'])),
+        Case('analyze_performance', lambda: dispatcher.run_tool('analyze_performance', {})),
+        Case('find_fee_optimizations', lambda: dispatcher.run_tool('find_fee_optimizations', {})),
+        Case('rebalance_portfolio', lambda: dispatcher.run_tool(
+            'rebalance_portfolio', {'target_allocations': REBALANCE_TARGET},
+        )),
+        Case('allocation_breakdown', dispatcher.get_allocation_breakdown),
+        Case('history_trim_recency', lambda: recency._fit_to_budget(system, messages, tail, prompt)),
+        Case('history_trim_retrieval', lambda: retrieval._fit_to_budget(system, messages, tail, prompt)),
+    ]
+
+
+def resolve_data_dir(args: argparse.Namespace) -> Path:
+    if args.data_dir:
+        return args.data_dir
+    spec = replace(PRESETS[args.preset], seed=args.seed)
+    data_dir = DATA_CACHE / f'{args.preset}-seed{args.seed}'
+    if not (data_dir / 'manifest.json').exists():
+        print(f'Generating the {args.preset} portfolio into {data_dir} (once)…', file=sys.stderr)
+        generate(data_dir, spec)
+    return data_dir
+
+
+def run(args: argparse.Namespace) -> dict:
+    data_dir = resolve_data_dir(args)
+    os.environ['PORTFOLIO_DATA_DIR'] = str(data_dir)
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')  # required setting; nothing is sent
+
+    loop = asyncio.new_event_loop()
+    try:
+        cases = build_cases(loop, args.history_turns, args.seed)
+        if args.only:
+            wanted = set(args.only.split(','))
+            cases = [c for c in cases if c.name in wanted]
+        results = {}
+        for case in cases:
+            results[case.name] = timed(case, loop, args.repeat, memory=not args.no_memory)
+            print(f'{case.name:<26}{_format(results[case.name])}', file=sys.stderr)
+    finally:
+        loop.close()
+
+    manifest = data_dir / 'manifest.json'
+    return {
+        'meta': {
+            'data_dir': str(data_dir),
+            'spec': json.loads(manifest.read_text()) if manifest.exists() else None,
+            'history_turns': args.history_turns,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'commit': _git_commit(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print current vs baseline per case; return True if any median regressed beyond `threshold` %."""
+    if current['meta'].get('spec') != baseline['meta'].get('spec'):
+        print('warning: the runs used different portfolios, numbers are not comparable')
+    regressed = False
+    print(f"\n{'case':<26}{'base ms':>11}{'now ms':>11}{'Δ':>9}{'base KB':>12}{'now KB':>12}{'Δ':>9}")
+    for name, now in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f'{name:<26}{"(new)":>11}{now["median_ms"]:>11}')
+            continue
+        time_delta = _pct(base['median_ms'], now['median_ms'])
+        mem_delta = _pct(base.get('peak_kb'), now.get('peak_kb'))
+        flag = ''
+        if time_delta is not None and time_delta > threshold:
+            regressed, flag = True, '  ← slower'
+        print(f"{name:<26}{base['median_ms']:>11}{now['median_ms']:>11}{_format_pct(time_delta):>9}"
+              f"{base.get('peak_kb', '-'):>12}{now.get('peak_kb', '-'):>12}{_format_pct(mem_delta):>9}{flag}")
+    return regressed
+
+
+def _pct(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def _format_pct(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value:+.1f}%'
+
+
+def _format(result: Dict[str, float]) -> str:
+    out = f"median {result['median_ms']:>10.2f} ms  (min {result['min_ms']:.2f}, max {result['max_ms']:.2f})"
+    if 'peak_kb' in result:
+        out += f"  peak {result['peak_kb'] / 1024:.1f} MB"
+    return out
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark tools, loader and history trimming')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--preset', choices=PRESETS, default='small')
+    source.add_argument('--data-dir', type=Path, help='an existing generated portfolio')
+    parser.add_argument('--seed', type=int, default=0, help='seed for preset data and history')
+    parser.add_argument('--history-turns', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='comma-separated case names')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--json', type=Path, help='write results here')
+    parser.add_argument('--compare', type=Path, help='earlier --json results to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed median slowdown, %%')
+    cli_args = parser.parse_args()
+
+    report = run(cli_args)
+    if cli_args.json:
+        cli_args.json.write_text(json.dumps(report, indent=2) + '\n')
+    if cli_args.compare and compare(report, json.loads(cli_args.compare.read_text()), cli_args.threshold):
+        sys.exit(1)
@@ -0,0 +1,247 @@
+"""
+Seeded synthetic portfolio generator for benchmarks.
+
+Writes the five files the app loads (see `app.data.load.PORTFOLIO_FILES`),
+in the same schema as the bundled ``app/data``, at any size:
+
+    python -m bench.synthetic_portfolio /tmp/portfolio-1m --funds 10000 --transactions 1000000
+    PORTFOLIO_DATA_DIR=/tmp/portfolio-1m poetry run uvicorn app.server.main:app
+
+The same seed and sizes always produce the same files, except that the
+transaction dates end at `--end` (today by default).  Files are streamed
+record by record, so 10M transactions need little memory.  Alongside the
+data, ``manifest.json`` records the parameters used.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import string
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from app.data.load import PORTFOLIO_FILES
+
+# asset class (as in fund_metadata) → (weight in the universe, region choices)
+ASSET_CLASSES: Dict[str, tuple] = {
+    'Equity - Global': (20, ['Global']),
+    'Equity - US': (15, ['North America']),
+    'Equity - Developed Markets': (12, ['Developed', 'Europe', 'Japan']),
+    'Equity - Emerging Markets': (8, ['Emerging Markets', 'Asia Pacific']),
+    'Equity - Thematic': (5, ['Global']),
+    'Bond - Global Aggregate': (15, ['Global']),
+    'Bond - Short Term': (10, ['Global', 'UK']),
+    'Cash': (5, ['UK']),
+}
+ISSUERS = ['Vanguard', 'iShares', 'HSBC', 'SPDR', 'Xtrackers', 'Invesco', 'Amundi', 'L&G', 'Fidelity', 'JPMorgan']
+INDICES = ['FTSE All-World', 'MSCI World', 'S&P 500', 'MSCI EM', 'Core Global Aggregate', 'Short Duration',
+           'Clean Energy', 'Quality Mix', 'Property Yield', 'Sterling Liquidity']
+PROVIDERS = ['AJ Bell', 'Vanguard', 'Hargreaves Lansdown', 'Interactive Investor', 'Revolut', 'Trading 212']
+ACCOUNT_TYPES = ['ISA', 'GIA', 'SIPP', 'LISA']
+CASH_ACCOUNT_TYPES = ['personal', 'current', 'brokerage', 'savings']
+ISIN_COUNTRIES = ['IE', 'LU', 'GB']
+
+
+@dataclass
+class PortfolioSpec:
+    funds: int = 1_000
+    holdings: int = 50
+    transactions: int = 100_000
+    traded_funds: int = 500  # funds the transactions are spread over (held funds first)
+    accounts: int = 4
+    years: float = 5.0  # transaction history length
+    end: str = ''  # last transaction date (ISO), '' = today
+    seed: int = 0
+
+
+@dataclass
+class _Fund:
+    isin: str
+    name: str
+    asset_class: str
+    region: str
+    ongoing_charge: float
+    price: float  # price at the start of the history
+    drift: float  # annual log-return
+    wobble: float  # amplitude of the periodic component
+    phase: float
+
+    def price_on(self, years: float) -> float:
+        return round(self.price * math.exp(self.drift * years + self.wobble * math.sin(6 * years + self.phase)), 2)
+
+
+def generate(out_dir: Path, spec: PortfolioSpec) -> Dict[str, int]:
+    """Write a portfolio for `spec` into `out_dir`; return bytes written per file."""
+    if spec.holdings > spec.funds:
+        raise ValueError('cannot hold more funds than the universe has')
+    rng = random.Random(spec.seed)
+    end = date.fromisoformat(spec.end) if spec.end else date.today()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    funds = _fund_universe(rng, spec.funds)
+    accounts = [
+        {'provider': provider, 'account_type': rng.choice(ACCOUNT_TYPES)}
+        for provider in _pick(rng, PROVIDERS, spec.accounts)
+    ]
+    held = rng.sample(funds, spec.holdings)
+    holdings = [
+        {
+            'isin': fund.isin,
+            'name': fund.name,
+            'value': round(rng.lognormvariate(9, 1), 2),
+            'provider': rng.choice(accounts)['provider'],
+        }
+        for fund in held
+    ]
+    cash_balances = [
+        {
+            'provider': account['provider'],
+            'currency': 'GBP',
+            'balance': round(rng.uniform(500, 20_000), 2),
+            'account_type': rng.choice(CASH_ACCOUNT_TYPES),
+        }
+        for account in accounts
+    ]
+    held_isins = {fund.isin for fund in held}
+    others = [fund for fund in funds if fund.isin not in held_isins]
+    traded = held + rng.sample(others, max(0, min(spec.traded_funds - len(held), len(others))))
+
+    files = PORTFOLIO_FILES
+    return {
+        files['holdings']: _write_array(out_dir / files['holdings'], map(json.dumps, holdings)),
+        files['cash_balances']: _write_array(out_dir / files['cash_balances'], map(json.dumps, cash_balances)),
+        files['accounts']: _write_array(out_dir / files['accounts'], map(json.dumps, accounts)),
+        files['fund_metadata']: _write_array(out_dir / files['fund_metadata'], (
+            json.dumps({
+                'isin': f.isin,
+                'name': f.name,
+                'ongoing_charge': f.ongoing_charge,
+                'asset_class': f.asset_class,
+                'region': f.region,
+            })
+            for f in funds
+        )),
+        files['transactions']: _write_array(
+            out_dir / files['transactions'], _transactions(rng, traded, spec, end),
+        ),
+        'manifest.json': _write_manifest(out_dir / 'manifest.json', spec, end),
+    }
+
+
+def _fund_universe(rng: random.Random, count: int) -> List[_Fund]:
+    classes = list(ASSET_CLASSES)
+    weights = [ASSET_CLASSES[c][0] for c in classes]
+    codes = rng.sample(range(36 ** 9), count)  # distinct ISIN bodies
+    funds = []
+    for code in codes:
+        asset_class = rng.choices(classes, weights)[0]
+        is_cash = asset_class == 'Cash'
+        issuer, index = rng.choice(ISSUERS), rng.choice(INDICES)
+        ticker = ''.join(rng.choices(string.ascii_uppercase, k=4))
+        funds.append(_Fund(
+            isin=_isin(rng.choice(ISIN_COUNTRIES), code),
+            name=f'{issuer} {index} UCITS ETF ({ticker})',
+            asset_class=asset_class,
+            region=rng.choice(ASSET_CLASSES[asset_class][1]),
+            ongoing_charge=round(rng.uniform(0.03, 1.2), 2),
+            price=round(rng.uniform(1, 5) if is_cash else rng.uniform(20, 300), 2),
+            drift=0.03 if is_cash else rng.gauss(0.05, 0.06),
+            wobble=0.0 if is_cash else rng.uniform(0.01, 0.15),
+            phase=rng.uniform(0, 2 * math.pi),
+        ))
+    return funds
+
+
+def _transactions(rng: random.Random, traded: List[_Fund], spec: PortfolioSpec, end: date) -> Iterable[str]:
+    # name / asset class are JSON-escaped once per fund; each row is then a plain f-string
+    fields = [(f, json.dumps(f.isin), json.dumps(f.name), json.dumps(f.asset_class.lower()))
+              for f in traded]
+    days = max(1, int(spec.years * 365))
+    start = end - timedelta(days=days)
+    for _ in range(spec.transactions):
+        fund, isin, name, asset_class = rng.choice(fields)
+        day = rng.randrange(days + 1)
+        price = fund.price_on(day / 365)
+        quantity = round(rng.uniform(0.1, 50), 2)
+        kind = 'buy' if rng.random() < 0.6 else 'sell'
+        yield (
+            f'{{"isin": {isin}, "name": {name}, "asset_class": {asset_class}, "type": "{kind}", '
+            f'"quantity": {quantity}, "price": {price}, "amount": {round(quantity * price, 2)}, '
+            f'"timestamp": "{(start + timedelta(days=day)).isoformat()}T00:00:00"}}'
+        )
+
+
+def _write_array(path: Path, rows: Iterable[str]) -> int:
+    """Stream JSON-encoded `rows` into `path` as a JSON array, one row per line."""
+    written = 0
+    with open(path, 'w') as f:
+        separator = '[\n  '
+        for row in rows:
+            written += f.write(separator) + f.write(row)
+            separator = ',\n  '
+        written += f.write('\n]\n' if written else '[]\n')
+    return written
+
+
+def _write_manifest(path: Path, spec: PortfolioSpec, end: date) -> int:
+    return path.write_text(json.dumps({**asdict(spec), 'end': end.isoformat()}, indent=2) + '\n')
+
+
+def _pick(rng: random.Random, choices: List[str], count: int) -> List[str]:
+    """`count` names, distinct while `choices` last."""
+    picked = rng.sample(choices, min(count, len(choices)))
+    return picked + [f'{rng.choice(choices)} {n}' for n in range(2, count - len(picked) + 2)]
+
+
+def _isin(country: str, code: int) -> str:
+    body = country + _base36(code).rjust(9, '0')
+    return body + str(_isin_check_digit(body))
+
+
+def _base36(value: int) -> str:
+    digits = string.digits + string.ascii_uppercase
+    out = ''
+    while value:
+        value, rem = divmod(value, 36)
+        out = digits[rem] + out
+    return out or '0'
+
+
+def _isin_check_digit(body: str) -> int:
+    """Luhn check digit over the ISIN's letters expanded to numbers (A=10 … Z=35)."""
+    digits = ''.join(str(int(c, 36)) for c in body)
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        n = int(d) * (2 if i % 2 == 0 else 1)
+        total += n - 9 if n > 9 else n
+    return (10 - total % 10) % 10
+
+
+def spec_from_args(args: argparse.Namespace) -> PortfolioSpec:
+    return PortfolioSpec(**{k: getattr(args, k) for k in PortfolioSpec.__dataclass_fields__})
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = PortfolioSpec()
+    parser.add_argument('--funds', type=int, default=defaults.funds, help='fund universe size')
+    parser.add_argument('--holdings', type=int, default=defaults.holdings)
+    parser.add_argument('--transactions', type=int, default=defaults.transactions)
+    parser.add_argument('--traded-funds', type=int, default=defaults.traded_funds)
+    parser.add_argument('--accounts', type=int, default=defaults.accounts)
+    parser.add_argument('--years', type=float, default=defaults.years)
+    parser.add_argument('--end', default=defaults.end, help='last transaction date (YYYY-MM-DD), default today')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic portfolio in the app/data schema')
+    parser.add_argument('out_dir', type=Path)
+    add_arguments(parser)
+    cli_args = parser.parse_args()
+    sizes = generate(cli_args.out_dir, spec_from_args(cli_args))
+    for name, size in sizes.items():
+        print(f'{name:<24}{size / 1e6:>10.1f} MB')
@@ -0,0 +1,73 @@
+"""
+Import-time budget report.
+
+Imports a module in a fresh interpreter with ``python -X importtime`` and
+lists what each module costs at startup (self and cumulative time).  Exits
+non-zero when the total exceeds ``--budget-ms`` (usable in CI).
+
+    python scripts/import_budget.py                      # app.server.main
+    python scripts/import_budget.py app.services.agent_manager --top 15 --budget-ms 800
+    python scripts/import_budget.py --only app.           # project modules only
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent
+_LINE_RE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class ImportCost(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(module: str) -> List[ImportCost]:
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f'importing {module} failed:\n{proc.stderr[-2000:]}')
+    costs = []
+    for line in proc.stderr.splitlines():
+        if match := _LINE_RE.match(line):
+            self_us, cumulative_us, indent, name = match.groups()
+            costs.append(ImportCost(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return costs
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('module', nargs='?', default='app.server.main')
+    parser.add_argument('--top', type=int, default=25, help='rows to show')
+    parser.add_argument('--only', default='', help='module prefix filter, e.g. "app."')
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail above this total')
+    args = parser.parse_args(argv)
+
+    costs = measure(args.module)
+    total_ms = sum(c.self_us for c in costs) / 1000
+    shown = [c for c in costs if c.module.startswith(args.only)]
+
+    print(f'{args.module}: {total_ms:.1f} ms total across {len(costs)} modules\n')
+    print(f'{"cumulative ms":>14} {"self ms":>9}  module')
+    for cost in sorted(shown, key=lambda c: c.cumulative_us, reverse=True)[:args.top]:
+        print(f'{cost.cumulative_us / 1000:>14.1f} {cost.self_us / 1000:>9.1f}  {"  " * cost.depth}{cost.module}')
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f'\nover budget: {total_ms:.1f} ms > {args.budget_ms:.1f} ms')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
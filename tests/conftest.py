@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+# Settings requires a key; tests never reach OpenAI
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+
+@pytest.fixture
+async def fake_redis():
+    """The in-memory Redis stand-in from the benchmarks (`bench.fake_redis`)."""
+    from bench.fake_redis import FakeRedis
+
+    server = FakeRedis()
+    listener = await server.start()
+    yield server, listener.sockets[0].getsockname()[1]
+    listener.close()
+
+
+@pytest.fixture
+async def redis(fake_redis):
+    """Binary client, like `get_session_redis()`."""
+    from redis.asyncio import Redis
+
+    client = Redis(port=fake_redis[1])
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def text_redis(fake_redis):
+    """decode_responses=True client, like `get_redis()`."""
+    from redis.asyncio import Redis
+
+    client = Redis(port=fake_redis[1], decode_responses=True)
+    yield client
+    await client.aclose()
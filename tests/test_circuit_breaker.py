@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.clients.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.clients.llm_errors import CircuitOpenError
+
+
+def breaker(reset_seconds: float = 0.1) -> CircuitBreaker:
+    return CircuitBreaker('gpt-test', failure_threshold=3, reset_seconds=reset_seconds)
+
+
+def open_breaker(cb: CircuitBreaker) -> None:
+    for _ in range(cb.failure_threshold):
+        cb.before_call()
+        cb.record_failure()
+
+
+def test_opens_after_consecutive_failures_only():
+    cb = breaker()
+    cb.record_failure()
+    cb.record_failure()
+    cb.record_success()  # resets the streak
+    cb.record_failure()
+    cb.record_failure()
+    assert cb.state == CLOSED
+
+    cb.record_failure()
+    assert cb.state == OPEN
+
+
+def test_open_breaker_fails_fast_with_retry_after():
+    cb = breaker(reset_seconds=30)
+    open_breaker(cb)
+    with pytest.raises(CircuitOpenError) as info:
+        cb.before_call()
+    assert 29 < info.value.retry_after <= 30
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    cb = breaker()
+    open_breaker(cb)
+    time.sleep(0.15)
+
+    cb.before_call()  # the probe
+    assert cb.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        cb.before_call()  # everyone else still fails fast
+
+    cb.record_success()
+    assert cb.state == CLOSED and cb.failures == 0
+    cb.before_call()
+
+
+def test_failed_probe_reopens():
+    cb = breaker()
+    open_breaker(cb)
+    time.sleep(0.15)
+
+    cb.before_call()
+    cb.record_failure()
+    assert cb.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        cb.before_call()
+
+
+def test_released_probe_allows_another():
+    cb = breaker()
+    open_breaker(cb)
+    time.sleep(0.15)
+
+    cb.before_call()
+    cb.release_probe()  # e.g. the probe was cancelled or got a 400
+    assert cb.state == HALF_OPEN
+    cb.before_call()
@@ -0,0 +1,72 @@
+import json
+import zlib
+
+import pytest
+
+from app.models.tool_memory import ToolCallRecord
+from app.utils import codec
+
+VALUES = [
+    {'role': 'user', 'content': 'How much is £5,000 in 🎯 equities?'},
+    [1, 'two', None],
+    'a plain string',
+    42,
+    3.5,
+    True,
+    None,
+]
+
+
+@pytest.mark.parametrize('fmt', [codec.FORMAT_JSON, codec.FORMAT_V1, codec.FORMAT_V2])
+@pytest.mark.parametrize('value', VALUES)
+def test_every_format_round_trips_any_json_value(fmt, value):
+    assert codec.decode(codec.encode(value, fmt)) == value
+
+
+def test_json_format_has_its_own_marker():
+    encoded = codec.encode('5', codec.FORMAT_JSON)
+    assert encoded == b'\x00"5"'
+    assert codec.decode(codec.encode(5, codec.FORMAT_JSON)) == 5  # not read back as a marker byte
+
+
+def test_legacy_plain_json_still_decodes():
+    assert codec.decode(b'{"role":"user","content":"hi"}') == {'role': 'user', 'content': 'hi'}
+    assert codec.decode(b'[1,2]') == [1, 2]
+
+
+def test_v1_entries_still_decode():
+    value = {'role': 'assistant', 'content': '📊 Current Allocation:\n- Equities: 44.0%'}
+    compressor = zlib.compressobj(level=6, zdict=codec._ZDICT_V1)
+    stored = b'\x01' + compressor.compress(json.dumps(value).encode()) + compressor.flush()
+    assert codec.decode(stored) == value
+
+
+def test_v2_is_the_default():
+    assert codec.encode({'role': 'user', 'content': 'hi'})[:1] == b'\x02'
+
+
+def test_unknown_format_and_marker_are_rejected():
+    with pytest.raises(ValueError):
+        codec.encode({}, 'v9')
+    with pytest.raises(ValueError):
+        codec.decode(b'\x7fwhatever')
+
+
+def test_v2_dictionary_matches_stored_tool_records():
+    content = json.dumps(
+        {
+            'summary': 'Performance snapshot: 1M: -10.22%, 3M: -10.22%, YTD: -10.22%, 1Y: -10.22%',
+            'payload': {
+                'period_returns_%': {'1M': -10.22, '3M': -10.22, 'YTD': -10.22, '1Y': -10.22},
+                'asset_class_contribution_£': {'Equity - US': -3181.88, 'other': -7173.79},
+            },
+        },
+        separators=(',', ':'),
+        ensure_ascii=False,
+    )
+    record = ToolCallRecord(
+        tool_call_id='call_1', name='analyze_performance', arguments='{}', content=content, summary='ok',
+    ).model_dump()
+    v1 = codec.encode(record, codec.FORMAT_V1)
+    v2 = codec.encode(record, codec.FORMAT_V2)
+    assert len(v2) < len(v1)
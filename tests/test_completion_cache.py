@@ -0,0 +1,40 @@
+from openai.types.chat import ChatCompletion
+
+from app.clients.completion_cache import DEFAULT_SOURCE, CompletionCache
+
+
+def completion(text: str) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        'id': 'c', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': text}}],
+    })
+
+
+def request(text: str) -> dict:
+    return {'model': 'gpt-4', 'messages': [{'role': 'user', 'content': text}]}
+
+
+async def test_sources_keep_their_own_versions(redis):
+    cache = CompletionCache(redis, ttl=60, max_entries=100, max_entry_bytes=100_000, normalise=False)
+    app_key = cache.key(request('fees?'), 'app-v1')
+    await cache.put(app_key, 'app-v1', completion('app'))
+
+    # a job worker alternating between named portfolios
+    for version, source in [('a-v1', 'portfolio:a'), ('b-v1', 'portfolio:b'), ('a-v1', 'portfolio:a')]:
+        await cache.put(cache.key(request('fees?'), version), version, completion(source), source=source)
+
+    assert (await cache.get(app_key)).choices[0].message.content == 'app'
+    assert await cache.get(cache.key(request('fees?'), 'b-v1')) is not None
+
+
+async def test_new_version_drops_the_sources_previous_entries(redis):
+    cache = CompletionCache(redis, ttl=60, max_entries=100, max_entry_bytes=100_000, normalise=False)
+    old_key = cache.key(request('fees?'), 'v1')
+    await cache.put(old_key, 'v1', completion('old'), source=DEFAULT_SOURCE)
+    other_key = cache.key(request('fees?'), 'x-v1')
+    await cache.put(other_key, 'x-v1', completion('other'), source='portfolio:x')
+
+    await cache.put(cache.key(request('fees?'), 'v2'), 'v2', completion('new'), source=DEFAULT_SOURCE)
+
+    assert await cache.get(old_key) is None
+    assert await cache.get(other_key) is not None
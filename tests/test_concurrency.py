@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.services.concurrency import AdmissionController, SessionBusyError, SessionTurnLock, admit_turn
+
+
+def worker(redis, lock_ttl: float = 0.3, wait_timeout: float = 0.5) -> SessionTurnLock:
+    return SessionTurnLock(redis, max_waiters=2, wait_timeout=wait_timeout, lock_ttl=lock_ttl)
+
+
+async def test_lock_is_renewed_while_a_long_turn_runs(redis):
+    first, second = worker(redis), worker(redis)  # two workers
+    async with first.hold('s'):
+        await asyncio.sleep(0.8)  # well past the lock TTL
+        with pytest.raises(SessionBusyError):
+            async with second.hold('s'):
+                pass
+    async with second.hold('s'):  # released at the end of the turn
+        pass
+
+
+async def test_lock_of_a_dead_worker_expires(redis):
+    await redis.set('session_lock:s', b'crashed-worker', px=300)  # never renewed
+    async with worker(redis, wait_timeout=2.0).hold('s'):
+        assert await redis.get('session_lock:s') != b'crashed-worker'
+
+
+async def test_turns_queued_on_a_session_hold_no_worker_slot(redis):
+    turn_lock = worker(redis, lock_ttl=5, wait_timeout=2.0)
+    admission = AdmissionController(max_concurrent=2, max_waiting=0, wait_timeout=0.1)
+    release = asyncio.Event()
+
+    async def chatty_turn():
+        async with admit_turn('chatty', turn_lock, admission):
+            await release.wait()
+
+    turns = [asyncio.create_task(chatty_turn()) for _ in range(3)]  # one runs, two queue on the session
+    await asyncio.sleep(0.1)
+    assert admission.active == 1 and turn_lock.stats()['queue_depth'] == {'chatty': 2}
+
+    async with admit_turn('other', turn_lock, admission):  # not a 503
+        assert admission.active == 2
+
+    release.set()
+    await asyncio.gather(*turns)
+    assert admission.rejected == 0 and admission.admitted == 4
@@ -0,0 +1,62 @@
+import pytest
+
+from app.models.tool_memory import ToolCallRecord
+from app.services.history import MessageHistory, ToolMemory
+from app.services.history_index import HistoryIndexCache
+from app.services.llm_agent import LLMPortfolioAgent
+
+
+def make_agent(redis, index_cache: HistoryIndexCache) -> LLMPortfolioAgent:
+    return LLMPortfolioAgent(
+        model='gpt-4',
+        history=MessageHistory(redis, 's'),
+        memory=ToolMemory(redis, 's'),
+        holdings=[],
+        cash_balances=[],
+        fund_metadata=[],
+        accounts=[],
+        transactions=[],
+        latest_prices={},
+        history_index=index_cache,
+    )
+
+
+async def fill(agent: LLMPortfolioAgent, topic: str, turns: int) -> None:
+    for turn in range(turns):
+        await agent.history.append({'role': 'user', 'content': f'{topic} question {turn}'})
+        await agent.history.append({'role': 'assistant', 'content': f'{topic} answer {turn}'})
+    await agent.memory.set([ToolCallRecord(
+        tool_call_id=f'call_{topic}', name='analyze_performance', arguments='{}', content='{}', summary=topic,
+    )])
+
+
+@pytest.mark.parametrize('reset_here', [True, False])  # reset on this worker / on another one
+async def test_reset_session_is_reindexed_even_after_growing_back(redis, reset_here):
+    index_cache = HistoryIndexCache(max_sessions=10)
+    agent = make_agent(redis, index_cache)
+    await fill(agent, 'bonds', turns=2)
+    index = await agent._session_index(await agent.history.get())
+    assert index.tool_summaries == {0: 'bonds'}
+
+    if reset_here:
+        await agent.predefined_handler._reset()
+    else:
+        await agent.memory.clear()
+        await agent.history.clear()
+    await fill(agent, 'pension', turns=4)  # more messages and tool records than were indexed
+
+    index = await agent._session_index(await agent.history.get())
+    assert index.tool_summaries == {0: 'pension'}
+    assert not index.bm25.search('bonds', k=5)
+    assert index.generation == await agent.history.generation()
+
+
+async def test_unchanged_session_is_extended_incrementally(redis):
+    agent = make_agent(redis, HistoryIndexCache(max_sessions=10))
+    await fill(agent, 'bonds', turns=1)
+    first = await agent._session_index(await agent.history.get())
+    await fill(agent, 'fees', turns=1)
+
+    index = await agent._session_index(await agent.history.get())
+    assert index is first and index.messages_indexed == 4
+    assert index.bm25.search('bonds', k=5)
@@ -0,0 +1,101 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.server.routes import chat as chat_routes
+from app.services.history import MessageHistory, StaleCursorError
+from app.services.session_cache import SessionCache
+
+
+def cached() -> SessionCache:
+    cache = SessionCache(max_bytes=1_000_000)
+    cache.active = True  # as if the invalidation listener were subscribed
+    return cache
+
+
+@pytest.fixture(params=['redis', 'cache'])
+async def history(request, redis):
+    """Ten messages, read back through Redis or through a warm session cache."""
+    writer = MessageHistory(redis, 's')
+    for i in range(10):
+        await writer.append({'role': 'user', 'content': str(i)})
+    if request.param == 'redis':
+        return MessageHistory(redis, 's')
+    reader = MessageHistory(redis, 's', cache=cached())
+    await reader.get()  # fills the cache
+    return reader
+
+
+def contents(page):
+    return [m['content'] for m in page]
+
+
+async def test_pages_walk_back_to_the_start(history):
+    generation, start, page = await history.get_page(None, 4)
+    assert generation == await history.generation()
+    assert (start, contents(page)) == (6, ['6', '7', '8', '9'])
+
+    _, start, page = await history.get_page(start, 4, generation)
+    assert (start, contents(page)) == (2, ['2', '3', '4', '5'])
+    _, start, page = await history.get_page(2, 4, generation)  # before < count
+    assert (start, contents(page)) == (0, ['0', '1'])
+    assert (await history.get_page(0, 4, generation))[1:] == (0, [])
+    if history.cache:
+        assert history.cache.hits == 4  # every page came from the cached list
+
+
+async def test_first_page_of_a_short_history_is_all_of_it(history):
+    _, start, page = await history.get_page(None, 50)
+    assert start == 0 and len(page) == 10
+
+
+@pytest.mark.parametrize('cache', [None, 'cache'])
+async def test_cursor_from_before_a_reset_is_stale(redis, cache):
+    history = MessageHistory(redis, 's', cache=cached() if cache else None)
+    for i in range(6):
+        await history.append({'role': 'user', 'content': f'old {i}'})
+    generation, start, _ = await history.get_page(None, 3)
+
+    await history.clear()  # `reset`, or the TTL ran out
+    for i in range(6):
+        await history.append({'role': 'user', 'content': f'new {i}'})
+    await history.get()
+
+    with pytest.raises(StaleCursorError):
+        await history.get_page(start, 3, generation)
+
+
+async def test_cursor_of_an_expired_session_is_stale(redis):
+    history = MessageHistory(redis, 's')
+    for i in range(6):
+        await history.append({'role': 'user', 'content': str(i)})
+    generation, start, _ = await history.get_page(None, 3)
+    await redis.delete('message_history:s', 'message_history:s:generation')
+
+    with pytest.raises(StaleCursorError):
+        await history.get_page(start, 3, generation)
+
+
+async def test_history_route_returns_409_for_a_stale_cursor(redis, monkeypatch):
+    monkeypatch.setattr(chat_routes, 'get_session_redis', lambda: redis)
+    monkeypatch.setattr(chat_routes, 'get_session_cache', lambda: None)
+    app = FastAPI()
+    app.include_router(chat_routes.router)
+    session_id = str(uuid4())
+    history = MessageHistory(redis, session_id)
+    for i in range(5):
+        await history.append({'role': 'user', 'content': str(i)})
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        headers = {'session-id': session_id}
+        latest = (await client.get('/history', params={'limit': 2}, headers=headers)).json()
+        assert [m['index'] for m in latest['messages']] == [3, 4]
+        older = (await client.get('/history', params={'cursor': latest['next_cursor']}, headers=headers)).json()
+        assert [m['index'] for m in older['messages']] == [0, 1, 2] and older['next_cursor'] is None
+
+        await history.clear()
+        await history.append({'role': 'user', 'content': 'new'})
+        stale = await client.get('/history', params={'cursor': latest['next_cursor']}, headers=headers)
+        assert stale.status_code == 409
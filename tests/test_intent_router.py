@@ -0,0 +1,92 @@
+import pytest
+
+from app.services.intent_router import IntentRouter, is_definition_question
+
+THRESHOLD = 0.8  # INTENT_ROUTER_THRESHOLD default
+
+
+@pytest.fixture
+def router() -> IntentRouter:
+    return IntentRouter(threshold=THRESHOLD)
+
+
+@pytest.mark.parametrize('text, tool', [
+    ('show my fees', 'find_fee_optimizations'),
+    ('What are my fees?', 'find_fee_optimizations'),
+    ('what fees am I paying', 'find_fee_optimizations'),
+    ('Am I paying too much in fees?', 'find_fee_optimizations'),
+    ('are there cheaper funds I could switch to?', 'find_fee_optimizations'),
+    ('how did I do this year', 'analyze_performance'),
+    ('how are my bonds doing?', 'analyze_performance'),
+    ('How is my portfolio performing?', 'analyze_performance'),
+    ("what's my portfolio performance", 'analyze_performance'),
+    ('How have my investments done over the last 3 years?', 'analyze_performance'),
+    ('rebalance to 60% equities, 30% bonds, 10% cash', 'rebalance_portfolio'),
+    ('Can you rebalance my portfolio for a house deposit?', 'rebalance_portfolio'),
+    ("rebalance my portfolio, I'm saving for a house", 'rebalance_portfolio'),
+    ('rebalance my investments, I want to retire in 10 years', 'rebalance_portfolio'),
+])
+def test_routes_direct_requests(router, text, tool):
+    match = router.route(text)
+    assert match is not None and match.tool_name == tool
+
+
+# prompts that mention a tool's keywords but don't ask for the tool
+@pytest.mark.parametrize('text', [
+    'how is it going',
+    'how are we doing on time',
+    'how has the weather been doing',
+    'what is YTD',
+    'Are returns taxed in an ISA?',
+    'What are ongoing charges?',
+    'Explain what an expense ratio is',
+    'any charges for withdrawing cash?',
+    'my bank charges me too much',
+    'rebalance my home insurance',
+    'what does rebalancing mean?',
+    # no goal and no complete target: the LLM asks instead of inventing one
+    'rebalance my pension',
+    'should I rebalance my home portfolio',
+    'rebalance my portfolio, I want to retire early but keep 80% equities',
+])
+def test_leaves_other_prompts_to_the_llm(router, text):
+    assert router.route(text) is None
+
+
+def test_rebalance_needs_a_target(router):
+    assert router.route('rebalance my portfolio') is None  # the LLM asks for the goal
+    match = router.route('rebalance my portfolio to 70% equities, 20% bonds and 10% cash')
+    assert match.arguments == {'target_allocations': {'equities': 70.0, 'bonds': 20.0, 'cash': 10.0}}
+
+
+@pytest.mark.parametrize('text, target', [
+    ('Can you rebalance my portfolio for a house deposit?', {'equities': 20, 'bonds': 40, 'cash': 40}),
+    ('rebalance my ISA, I plan to retire in 15 years', {'equities': 60, 'bonds': 30, 'cash': 10}),
+    ('rebalance my portfolio, saving for a holiday', {'equities': 10, 'bonds': 40, 'cash': 50}),
+    ('rebalance my portfolio to 50% equities, 30% bonds, 20% cash for my retirement',
+     {'equities': 50.0, 'bonds': 30.0, 'cash': 20.0}),
+])
+def test_goal_phrasings_map_to_presets(router, text, target):
+    assert router.route(text).arguments == {'target_allocations': target}
+
+
+def test_bare_keywords_are_only_speculation_candidates(router):
+    assert router.route('any charges for withdrawing cash?') is None
+    assert router.candidates('any charges for withdrawing cash?', min_confidence=0.3) == ['find_fee_optimizations']
+    assert router.candidates('any charges for withdrawing cash?', min_confidence=0.8) == []
+
+
+def test_two_direct_requests_are_ambiguous(router):
+    assert router.route('show my fees and my performance') is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('What is an OCF?', True),
+    ('explain expense ratios', True),
+    ("what's YTD", True),
+    ('What are my fees?', False),
+    ('explain my fees', False),
+    ('show my fees', False),
+])
+def test_definition_questions(text, expected):
+    assert is_definition_question(text) is expected
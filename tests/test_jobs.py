@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.jobs import JobQueue
+
+
+@pytest.fixture
+async def queue(text_redis) -> JobQueue:
+    queue = JobQueue(text_redis, stream='jobs', group='workers', result_ttl=60)
+    await queue.ensure_group()
+    return queue
+
+
+async def test_items_flow_from_submit_to_results(queue):
+    job_id = await queue.submit([{'prompt': 'a'}, {'prompt': 'b'}], 'gpt-4')
+    entries = await queue.read('w1', count=10, block_ms=10)
+    assert [fields['index'] for _, fields in entries] == ['0', '1']
+
+    for entry_id, fields in entries:
+        await queue.start_attempt(job_id, int(fields['index']))
+        status = 'failed' if fields['index'] == '1' else 'ok'
+        assert await queue.record(job_id, int(fields['index']), {'index': int(fields['index']), 'status': status})
+        await queue.ack(entry_id)
+
+    status = await queue.status(job_id)
+    assert (status['status'], status['done'], status['failed']) == ('completed', 1, 1)
+    assert status['finished'] is not None
+    assert [r['index'] for r in await queue.results(job_id, 0, 10)] == [0, 1]
+    assert await queue.backlog() == {'stream_length': 0, 'pending': 0}
+
+
+async def test_an_item_is_counted_once(queue):
+    job_id = await queue.submit([{'prompt': 'a'}, {'prompt': 'b'}], 'gpt-4')
+    assert await queue.record(job_id, 0, {'index': 0, 'status': 'ok'})
+    # a worker presumed stuck finishes after the item was retried elsewhere
+    assert not await queue.record(job_id, 0, {'index': 0, 'status': 'ok'})
+
+    status = await queue.status(job_id)
+    assert (status['status'], status['done']) == ('queued', 1)
+    assert len(await queue.results(job_id, 0, 10)) == 1
+
+
+async def test_stuck_entries_are_reclaimed(queue):
+    await queue.submit([{'prompt': 'a'}], 'gpt-4')
+    [(entry_id, _)] = await queue.read('crashed', count=1, block_ms=10)
+
+    cursor, claimed = await queue.claim_stuck('w2', min_idle_ms=0, count=10, cursor='0-0')
+    assert cursor == '0-0' and [e for e, _ in claimed] == [entry_id]
+    assert not await queue.remove_consumer('w2')  # still holds the entry
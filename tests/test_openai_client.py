@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.clients import openai_client
+from app.clients.circuit_breaker import CLOSED, get_circuit_breaker
+from app.clients.llm_errors import LLMError, LLMRequestError, LLMUnavailableError
+from app.clients.rate_limiter import get_rate_limiter
+
+
+def _fake_client(monkeypatch, error: Exception) -> list:
+    calls = []
+
+    async def create(*_args, **kwargs):
+        calls.append(kwargs)
+        raise error
+
+    completions = SimpleNamespace(with_raw_response=SimpleNamespace(create=create))
+    monkeypatch.setattr(openai_client, 'client', SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return calls
+
+
+def _status_error(cls, status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions'))
+    return cls(f'status {status}', response=response, body=None)
+
+
+async def test_rejected_request_is_typed_and_not_retried(monkeypatch):
+    model = 'test-bad-request'
+    calls = _fake_client(monkeypatch, _status_error(openai.BadRequestError, 400))
+
+    with pytest.raises(LLMRequestError) as info:
+        await openai_client.safe_chat_completion(model=model, messages=[{'role': 'user', 'content': 'hi'}])
+
+    assert info.value.status_code == 400
+    assert isinstance(info.value.__cause__, openai.BadRequestError)
+    assert len(calls) == 1
+    assert get_circuit_breaker(model).state == CLOSED and get_circuit_breaker(model).failures == 0
+    assert get_rate_limiter(model).in_flight == 0
+
+
+async def test_auth_failure_is_an_llm_error_too(monkeypatch):
+    _fake_client(monkeypatch, _status_error(openai.AuthenticationError, 401))
+
+    with pytest.raises(LLMError) as info:
+        await openai_client.safe_chat_completion(model='test-auth', messages=[])
+
+    assert not isinstance(info.value, LLMUnavailableError)  # not a 503: retrying later won’t help
+
+
+async def test_transient_errors_still_surface_as_unavailable(monkeypatch):
+    monkeypatch.setattr(openai_client, 'wait_exponential', lambda **_: lambda _state: 0)
+    calls = _fake_client(monkeypatch, _status_error(openai.InternalServerError, 500))
+
+    with pytest.raises(LLMUnavailableError):
+        await openai_client.safe_chat_completion(model='test-transient', messages=[])
+
+    assert len(calls) == 3
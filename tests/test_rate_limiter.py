@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from app.clients.llm_errors import LLMOverloadedError
+from app.clients.rate_limiter import ModelRateLimiter, parse_reset
+
+
+def limiter(max_in_flight: int = 2, max_queue: int = 10) -> ModelRateLimiter:
+    return ModelRateLimiter('gpt-test', max_in_flight=max_in_flight, max_queue=max_queue)
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('1s', 1.0), ('6m0s', 360.0), ('250ms', 0.25), ('1h2m', 3720.0), ('0.5', 0.5), ('', None), ('soon', None),
+])
+def test_parse_reset(value, seconds):
+    assert parse_reset(value) == seconds
+
+
+async def test_waits_for_a_free_slot():
+    rl = limiter(max_in_flight=1)
+    await rl.acquire(10, timeout=1)
+    second = asyncio.create_task(rl.acquire(10, timeout=1))
+    await asyncio.sleep(0.05)
+    assert not second.done() and rl.stats()['queue_depth'] == 1
+
+    await rl.release()
+    await second
+    assert rl.in_flight == 1 and rl.queued == 0
+
+
+async def test_full_queue_is_shed_immediately():
+    rl = limiter(max_in_flight=1, max_queue=1)
+    await rl.acquire(10, timeout=1)
+    waiting = asyncio.create_task(rl.acquire(10, timeout=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMOverloadedError):
+        await rl.acquire(10, timeout=1)
+    assert rl.rejected == 1
+
+    await rl.release()
+    await waiting
+
+
+async def test_queue_deadline_raises_overloaded():
+    rl = limiter(max_in_flight=1)
+    await rl.acquire(10, timeout=1)
+    started = time.monotonic()
+    with pytest.raises(LLMOverloadedError):
+        await rl.acquire(10, timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    assert rl.queued == 0 and rl.rejected == 1
+
+
+async def test_429_halves_the_limit_and_successes_grow_it_back():
+    rl = limiter(max_in_flight=4)
+    await rl.acquire(10, timeout=1)
+    await rl.release({'retry-after-ms': '100'}, throttled=True)
+    assert rl.limit == 2 and rl.throttled == 1
+
+    started = time.monotonic()
+    await rl.acquire(10, timeout=1)  # paused until retry-after passes
+    assert time.monotonic() - started >= 0.09
+
+    await rl.release({})
+    assert rl.limit == 3
+    for _ in range(3):
+        await rl.acquire(10, timeout=1)
+        await rl.release({})
+    assert rl.limit == 4  # never beyond max_in_flight
+
+
+async def test_exhausted_header_budget_holds_requests_until_reset():
+    rl = limiter()
+    await rl.acquire(10, timeout=1)
+    await rl.release({
+        'x-ratelimit-remaining-requests': '0',
+        'x-ratelimit-reset-requests': '200ms',
+        'x-ratelimit-remaining-tokens': '1000',
+        'x-ratelimit-reset-tokens': '1s',
+    })
+    assert rl.stats()['remaining_requests'] == 0
+
+    started = time.monotonic()
+    await rl.acquire(10, timeout=1)
+    assert time.monotonic() - started >= 0.15
+    assert rl.remaining_tokens == 990
+
+
+async def test_token_budget_shorter_than_request_waits_or_times_out():
+    rl = limiter()
+    await rl.acquire(10, timeout=1)
+    await rl.release({'x-ratelimit-remaining-tokens': '50', 'x-ratelimit-reset-tokens': '10s'})
+
+    await rl.acquire(40, timeout=1)  # fits the remaining budget
+    with pytest.raises(LLMOverloadedError) as info:
+        await rl.acquire(40, timeout=0.1)
+    assert info.value.retry_after > 5  # tells the client when the budget resets
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models.tool_memory import ToolCallRecord
+from app.services.history import MessageHistory, ToolMemory
+from app.services.session_cache import SessionCache, remaining_ttl
+
+
+@pytest.fixture
+def cache() -> SessionCache:
+    cache = SessionCache(max_bytes=1_000_000)
+    cache.active = True  # as if the invalidation listener were subscribed
+    return cache
+
+
+async def test_read_fill_expires_with_the_redis_key(redis, cache):
+    history = MessageHistory(redis, 's', ttl=1, cache=cache)
+    await history.append({'role': 'user', 'content': 'old'})
+    cache.clear()  # e.g. another worker served the session so far
+
+    await asyncio.sleep(0.5)
+    assert await history.get() == [{'role': 'user', 'content': 'old'}]  # filled with ~0.5 s left
+
+    await asyncio.sleep(0.6)  # Redis expired the session
+    assert await history.get() == []
+    await history.append({'role': 'user', 'content': 'new'})
+    assert await history.get() == [{'role': 'user', 'content': 'new'}]
+    assert len(await redis.lrange('message_history:s', 0, -1)) == 1
+
+
+async def test_tool_memory_fill_uses_the_key_ttl(redis, cache):
+    memory = ToolMemory(redis, 's', ttl=60, cache=cache)
+    await memory.set([ToolCallRecord(
+        tool_call_id='call_1', name='analyze_performance', arguments='{}', content='{}', summary='ok',
+    )])
+    await redis.expire('tool_memory:s:latest', 2)  # the shorter-lived of the two keys wins
+    cache.clear()
+
+    assert (await memory.get_last()).name == 'analyze_performance'
+    expires_at = cache._entries['tool_memory:s'][0]
+    assert 0 < expires_at - time.monotonic() <= 2
+
+
+def test_remaining_ttl():
+    assert remaining_ttl(1500, 60) == 1.5
+    assert remaining_ttl(-1, 60) == 60  # no expiry
+    assert remaining_ttl(-2, 60) == 60  # missing: the next write sets the TTL
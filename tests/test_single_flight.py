@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.single_flight import DistributedSingleFlight, SingleFlight
+
+
+def worker(redis) -> DistributedSingleFlight:
+    """One app worker: its own local single-flight, Redis shared with the others."""
+    return DistributedSingleFlight(redis, SingleFlight())
+
+
+async def test_remote_joiner_reads_the_published_result(redis):
+    a, b = worker(redis), worker(redis)
+    started, finish = asyncio.Event(), asyncio.Event()
+    calls = []
+
+    async def compute(name):
+        calls.append(name)
+        started.set()
+        await finish.wait()
+        return {'answer': name}
+
+    leader = asyncio.create_task(a.do_json('k', lambda: compute('a'), result_ttl=60, lock_ttl=5))
+    await started.wait()
+    joiner = asyncio.create_task(b.do_json('k', lambda: compute('b'), result_ttl=60, lock_ttl=5))
+    await asyncio.sleep(0.2)  # b is polling on a's lock
+    finish.set()
+
+    assert await leader == {'answer': 'a'}
+    assert await joiner == {'answer': 'a'}
+    assert calls == ['a']
+    assert b.stats()['joined_remote'] == 1
+    assert await redis.get('single_flight:k:lock') is None
+
+
+async def test_leader_failure_reaches_local_joiners_and_frees_the_lock(redis):
+    a, b = worker(redis), worker(redis)
+    started, fail = asyncio.Event(), asyncio.Event()
+
+    async def broken():
+        started.set()
+        await fail.wait()
+        raise RuntimeError('boom')
+
+    async def works():
+        return 'b'
+
+    leader = asyncio.create_task(a.do_json('k', broken, result_ttl=60, lock_ttl=5))
+    await started.wait()
+    local_joiner = asyncio.create_task(a.do_json('k', broken, result_ttl=60, lock_ttl=5))
+    remote = asyncio.create_task(b.do_json('k', works, result_ttl=60, lock_ttl=5))
+    await asyncio.sleep(0.1)
+    fail.set()
+
+    for task in (leader, local_joiner):
+        with pytest.raises(RuntimeError, match='boom'):
+            await task
+    started_at = time.monotonic()
+    assert await remote == 'b'  # took over as soon as the lock was released
+    assert time.monotonic() - started_at < 1
+    assert a.stats()['joined_local'] == 1
+
+
+async def test_cancelled_leader_does_not_cancel_live_joiners(redis):
+    a = worker(redis)
+    started, finish = asyncio.Event(), asyncio.Event()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await finish.wait()
+        return 'done'
+
+    leader = asyncio.create_task(a.do_json('k', compute, result_ttl=60, lock_ttl=5))
+    await started.wait()
+    joiner = asyncio.create_task(a.do_json('k', compute, result_ttl=60, lock_ttl=5))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    finish.set()
+
+    assert await joiner == 'done'
+    assert calls == 1
+    assert await redis.get('single_flight:k:lock') is None
+
+
+async def test_expired_lock_of_a_dead_worker_is_taken_over(redis):
+    await redis.set('single_flight:k:lock', b'crashed-worker', px=300)  # never released
+
+    async def compute():
+        return 'b'
+
+    started_at = time.monotonic()
+    assert await worker(redis).do_json('k', compute, result_ttl=60, lock_ttl=5) == 'b'
+    assert 0.25 < time.monotonic() - started_at < 2  # waited for the expiry, not the full lock_ttl
+
+
+async def test_waiter_computes_locally_when_the_lock_outlives_lock_ttl(redis):
+    await redis.set('single_flight:k:lock', b'stuck-worker', px=60_000)
+
+    async def compute():
+        return 'b'
+
+    assert await worker(redis).do_json('k', compute, result_ttl=60, lock_ttl=0.3) == 'b'
+    assert await redis.get('single_flight:k:lock') == b'stuck-worker'  # someone else's, left alone
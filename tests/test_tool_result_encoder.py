@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from app.utils import tool_result_encoder
+from app.utils.tool_result_encoder import encode_tool_result
+
+
+@pytest.fixture(autouse=True)
+def offline_token_count(monkeypatch):
+    # tiktoken downloads its vocabularies; ~4 characters per token is close enough here
+    monkeypatch.setattr(tool_result_encoder, 'count_tokens', lambda text, _model: len(text) // 4)
+
+
+def test_repeated_field_values_are_dropped():
+    text = 'You could save £120 a year on fees'
+    out = json.loads(encode_tool_result({'summary': text, 'payload': {'performance_summary': text}}, budget=1000))
+    assert out == {'summary': text, 'payload': {}}
+
+
+def test_list_items_are_never_deduplicated():
+    suggestion = 'Switch to a cheaper global tracker'
+    result = {
+        'summary': suggestion,
+        'suggestions': [suggestion, suggestion, 'Consolidate your ISA accounts'],
+        'movements': [{'fund': 'A', 'reason': 'Lower ongoing charge'}, {'fund': 'B', 'why': 'Lower ongoing charge'}],
+    }
+    out = json.loads(encode_tool_result(result, budget=1000))
+    assert out['suggestions'] == [suggestion, suggestion, 'Consolidate your ISA accounts']
+    assert out['movements'][1] == {'fund': 'B', 'why': 'Lower ongoing charge'}
+
+
+def test_over_budget_lists_end_with_a_count():
+    result = {'suggestions': [f'Suggestion number {i} for your portfolio' for i in range(40)]}
+    out = json.loads(encode_tool_result(result, budget=100))
+    kept, marker = out['suggestions'][:-1], out['suggestions'][-1]
+    assert marker == f'…+{40 - len(kept)} more'
+
+
+def test_uniform_dicts_become_a_table():
+    rows = [{'isin': 'IE00B4L5Y983', 'value': 1.234567}, {'isin': 'IE00B4L5Y983', 'value': 2.0}]
+    out = json.loads(encode_tool_result({'holdings': rows}, budget=1000))
+    assert out['holdings'] == {'cols': ['isin', 'value'], 'rows': [['IE00B4L5Y983', 1.2346], ['IE00B4L5Y983', 2.0]]}
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+
+from app.server import warmup
+from app.settings import get_settings
+
+
+@pytest.fixture
+def readiness(monkeypatch):
+    fresh = warmup.Readiness()
+    monkeypatch.setattr(warmup, 'readiness', fresh)
+    monkeypatch.setattr(warmup, 'RETRY_SECONDS', 0.01)
+    monkeypatch.setattr(warmup, '_connect_redis', _noop)
+    monkeypatch.setattr(warmup, '_connect_openai', _noop)
+    monkeypatch.setattr(warmup, '_discover_tools', _noop)
+    return fresh
+
+
+async def _noop() -> None:
+    pass
+
+
+async def test_blocking_steps_leave_the_event_loop_free(readiness, monkeypatch):
+    monkeypatch.setattr(warmup, 'load_portfolio_data', lambda: time.sleep(0.3))
+    monkeypatch.setattr(warmup, 'get_latest_prices', lambda: None)
+    monkeypatch.setattr(warmup, '_load_encoding', lambda model: time.sleep(0.3))
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await warmup.warm_up()
+    task.cancel()
+
+    assert readiness.ready
+    assert ticks > 20  # a blocked loop would have ticked once or twice
+
+
+async def test_gives_up_after_max_attempts_and_reports_it(readiness, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'WARMUP_MAX_ATTEMPTS', 3)
+    calls = 0
+
+    def offline(_model):
+        nonlocal calls
+        calls += 1
+        raise OSError('no network')
+
+    monkeypatch.setattr(warmup, 'load_portfolio_data', lambda: None)
+    monkeypatch.setattr(warmup, 'get_latest_prices', lambda: None)
+    monkeypatch.setattr(warmup, '_load_encoding', offline)
+
+    await warmup.warm_up()
+
+    snapshot = readiness.snapshot()
+    assert not snapshot['ready'] and snapshot['failed'] and snapshot['attempts'] == 3
+    assert 'no network' in snapshot['errors']['tokenizers']
+    assert calls == 3